@@ -0,0 +1,63 @@
+"""Formula conversion in place and in a process pool by the number of unique formulas.
+
+Converts a growing number of generated formulas serially, in a pool started
+for them (as a one-shot CLI run would) and in a pool that has already
+converted other formulas (as a long-lived process would). Every measurement
+runs in a new process, so cached formulas and compiled stylesheets of the
+previous ones don't count. The break-even of a running pool is
+latex_math._POOL_MIN_EQUATIONS.
+
+    python benchmarks/equation_pool.py [workers [formulas ...]]
+"""
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from md2gost import latex_math
+
+
+def _formulas(count: int, offset: int = 0) -> list[str]:
+    return [f"\\frac{{x^{{{i}}} + \\sqrt{{y_{{{i}}}}}}}{{\\sum_{{k=0}}^{{{i}}} k^2}} = \\int_0^{{{i}}} t\\,dt"
+            for i in range(offset, offset + count)]
+
+
+def _convert(formulas: list[str], pool: ProcessPoolExecutor, workers: int):
+    list(pool.map(latex_math._latex_to_omml_string, formulas, chunksize=max(1, len(formulas) // (workers * 4))))
+
+
+def _measure(mode: str, count: int, workers: int) -> float:
+    formulas = _formulas(count)
+    if mode == "serial":
+        start = time.perf_counter()
+        list(map(latex_math._latex_to_omml_string, formulas))
+        return time.perf_counter() - start
+
+    if mode == "cold":
+        start = time.perf_counter()
+        with ProcessPoolExecutor(workers, mp_context=get_context("spawn")) as pool:
+            _convert(formulas, pool, workers)
+            return time.perf_counter() - start
+
+    with ProcessPoolExecutor(workers, mp_context=get_context("spawn")) as pool:
+        # every worker compiles the stylesheet on other formulas first
+        _convert(_formulas(workers * 8, offset=count), pool, workers)
+        start = time.perf_counter()
+        _convert(formulas, pool, workers)
+        return time.perf_counter() - start
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    counts = [int(count) for count in sys.argv[2:]] or [4, 8, 16, 32, 64, 128, 256]
+    # the measurements start pools, so they run in processes that may have children
+    with ProcessPoolExecutor(1, mp_context=get_context("spawn"), max_tasks_per_child=1) as runner:
+        for count in counts:
+            times = [runner.submit(_measure, mode, count, workers).result() * 1000
+                     for mode in ("serial", "cold", "warm")]
+            print(f"{count:>4} formulas: serial {times[0]:7.1f} ms, new pool {times[1]:7.1f} ms, "
+                  f"running pool {times[2]:7.1f} ms", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Microbenchmark of LayoutState on a synthetic 1,000-page document.
+
+Replays the state operations the renderer does per block (a copy of the
+tracker's state, a copy per line as in listings, the fitting check and
+adding the height) with the current LayoutState and with the previous one,
+which kept a running total as Length and derived the page and the offset
+from it.
+
+    python benchmarks/layout_state.py
+"""
+import random
+import timeit
+from copy import copy
+
+from docx.shared import Length, Mm, Pt
+
+from md2gost.layout_tracker import LayoutState
+
+PAGES = 1000
+MAX_HEIGHT = Mm(297 - 20 - 19)
+MAX_WIDTH = Mm(210 - 30 - 10)
+
+
+class RunningTotalLayoutState:
+    """LayoutState before it tracked the page directly"""
+    def __init__(self, max_height: Length, max_width: Length):
+        self.max_height: Length = max_height
+        self.max_width: Length = max_width
+        self._current_height: Length = Length(0)
+
+    @property
+    def current_page_height(self):
+        return self._current_height % self.max_height
+
+    @property
+    def remaining_page_height(self) -> Length:
+        return self.max_height - self.current_page_height
+
+    @property
+    def page(self):
+        return self._current_height // self.max_height + 1
+
+    def add_height(self, height: Length):
+        self._current_height += height
+
+
+def _blocks() -> list[tuple[Length, int]]:
+    """Heights of the blocks and their number of lines, PAGES pages of them without page breaks"""
+    random_ = random.Random(0)
+    blocks, total = [], 0
+    while total < PAGES * MAX_HEIGHT:
+        lines = random_.choice([1, 3, 5, 8, 20])
+        height = Length(Pt(21) * lines + Pt(10))
+        blocks.append((height, lines))
+        total += height
+    return blocks
+
+
+def _layout(state_type, blocks: list[tuple[Length, int]]) -> int:
+    tracker_state = state_type(MAX_HEIGHT, MAX_WIDTH)
+    for height, lines in blocks:
+        layout_state = copy(tracker_state)
+        if height >= layout_state.remaining_page_height and layout_state.current_page_height:
+            tracker_state.add_height(tracker_state.remaining_page_height)
+        for _ in range(lines):
+            line_state = copy(layout_state)
+            line_state.remaining_page_height
+            line_state.add_height(height // lines)
+        tracker_state.add_height(height)
+        tracker_state.page
+    return tracker_state.page
+
+
+def main():
+    blocks = _blocks()
+    assert _layout(LayoutState, blocks) == _layout(RunningTotalLayoutState, blocks)
+    print(f"{len(blocks)} blocks, {_layout(LayoutState, blocks)} pages")
+    for state_type in (RunningTotalLayoutState, LayoutState):
+        seconds = min(timeit.repeat(lambda: _layout(state_type, blocks), number=1, repeat=5))
+        print(f"{state_type.__name__:>24}: {seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
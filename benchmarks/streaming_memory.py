@@ -0,0 +1,93 @@
+"""Peak memory of the streaming conversion on generated documents of up to 2,000 pages.
+
+Converts documents of a growing number of pages with and without streaming,
+each in a new process, and prints the peak of the memory traced by
+tracemalloc and the growth of the peak resident set size. tracemalloc only
+sees python objects, the document tree of lxml is only in the latter. In the
+streaming mode both should stay roughly constant apart from the parsed
+markdown, which is proportional to the input.
+
+    python benchmarks/streaming_memory.py [pages ...]
+"""
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from multiprocessing import get_context
+
+from md2gost.converter import Converter
+
+_TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "..", "md2gost", "Template.docx")
+
+# about 4 pages
+_CHAPTER = """
+# Chapter {i}
+
+## Requirements
+
+{text}
+
+- {sentence}
+- {sentence}
+- {sentence}
+
+%table{i} Parameters
+
+| Parameter | Value | Unit |
+|-----------|-------|------|
+{rows}
+
+{text}
+
+%listing{i} Implementation
+
+```python
+{code}
+```
+
+{text}
+"""
+
+
+def _markdown(pages: int) -> str:
+    sentence = "The contractor shall deliver the works in accordance with the schedule set out in the appendix."
+    text = " ".join([sentence] * 12)
+    rows = "\n".join(f"| parameter {j} | {j * 10} | mm |" for j in range(10))
+    code = "\n".join(f"result_{j} = compute({j}, factor={j * 2})" for j in range(40))
+    chapters = "".join(_CHAPTER.format(i=i, text=text, sentence=sentence, rows=rows, code=code)
+                       for i in range(pages // 4))
+    return "# *CONTENTS\n\n[TOC]\n" + chapters
+
+
+def _measure(path: str, streaming: bool) -> tuple[float, float, float]:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    start = time.perf_counter()
+    converter = Converter(path, os.devnull, _TEMPLATE_PATH, equation_workers=1, streaming=streaming)
+    converter.convert()
+    with tempfile.TemporaryFile() as output:
+        converter.save(output)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # ru_maxrss is in KiB on linux
+    return peak / 2 ** 20, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) / 2 ** 10, seconds
+
+
+def main():
+    sizes = [int(pages) for pages in sys.argv[1:]] or [250, 500, 1000, 2000]
+    with tempfile.TemporaryDirectory() as directory, get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+        for pages in sizes:
+            path = os.path.join(directory, f"{pages}.md")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(_markdown(pages))
+            for streaming in (False, True):
+                peak, rss, seconds = pool.apply(_measure, (path, streaming))
+                print(f"{pages:>5} pages, {'streaming' if streaming else 'in memory':>9}: "
+                      f"tracemalloc peak {peak:7.1f} MiB, peak RSS +{rss:7.1f} MiB, {seconds:6.1f} s", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,9 @@ from getpass import getuser
 from docxcompose.composer import Composer
 from docx import Document
 
+from .context import ConversionContext
 from .converter import Converter
+from .renderable.find_font import rebuild_font_index, FONT_INDEX_PATH
 
 
 def main():
@@ -15,7 +17,7 @@ def main():
         description="Этот скрипт предназначен для генерирования отчетов/\
                 курсовых работ по ГОСТ в формате docx из Markdown-файла."
     )
-    parser.add_argument("filename", help="Путь до исходного markdown файла")
+    parser.add_argument("filename", nargs="?", help="Путь до исходного markdown файла")
     parser.add_argument("-o", "--output", help="Путь до сгенерированного \
                             файла")
     parser.add_argument("-t", "--template", help="Путь до шаблона .docx")
@@ -23,20 +25,40 @@ def main():
     #                         страниц(ы)")
     parser.add_argument("--syntax-highlighting", help="Подсветка синтаксиса в листингах",
                         action=BooleanOptionalAction)
+    parser.add_argument("--equation-workers", type=int,
+                        help="Количество процессов для преобразования формул (по умолчанию формулы "
+                             "преобразуются в текущем процессе)")
+    parser.add_argument("--workers", type=int,
+                        help="Количество процессов для параллельной вёрстки глав (по умолчанию 1)")
+    parser.add_argument("--streaming", help="Потоковое преобразование больших документов с ограниченным "
+                                            "потреблением памяти", action="store_true")
+    parser.add_argument("--compression-level", type=int, choices=range(10), metavar="{0-9}",
+                        help="Уровень сжатия docx (0 - без сжатия)")
+    parser.add_argument("--reproducible", help="Одинаковый docx для одинаковых исходных данных",
+                        action="store_true")
     parser.add_argument("--debug", help="Добавляет отладочные данные в документ",
                         action="store_true")
+    parser.add_argument("--rebuild-font-index", help="Пересобирает индекс установленных шрифтов",
+                        action="store_true")
 
     args = parser.parse_args()
+
+    if args.rebuild_font_index:
+        rebuild_font_index()
+        print(f"Font index: {FONT_INDEX_PATH}")
+        if not args.filename:
+            return
+    elif not args.filename:
+        parser.error("the following arguments are required: filename")
+
     filename, output, template, debug = \
         args.filename, args.output, args.template, args.debug
-    if args.syntax_highlighting:
-        os.environ["SYNTAX_HIGHLIGHTING"] = "1"
 
     if not filename.endswith(".md"):
         print("Error: filename must have md format")
         exit(1)
 
-    os.environ["WORKING_DIR"] = os.path.dirname(filename)
+    context = ConversionContext(os.path.dirname(filename), bool(args.syntax_highlighting))
 
     if output:
         if not output.endswith(".docx"):
@@ -48,8 +70,11 @@ def main():
     if not template:
         template = os.path.join(os.path.dirname(__file__), "Template.docx")
 
-    converter = Converter(filename, output, template, debug)
-    converter.convert()
+    converter = Converter(filename, output, template, debug, args.equation_workers, args.workers,
+                          streaming=args.streaming, compression_level=args.compression_level,
+                          reproducible=args.reproducible, context=context)
+    if not args.streaming:
+        converter.convert()
 
     document = converter.document
 
@@ -60,11 +85,16 @@ def main():
     #     composer.append(document)
     #     document = composer.doc
 
-    document.core_properties.author = getuser()
+    # the user differs between machines, so reproducible documents have a fixed author
+    document.core_properties.author = "md2gost" if args.reproducible else getuser()
     document.core_properties.comments =\
         "Создано при помощи https://github.com/witelokk/md2gost"
 
-    document.save(output)
+    if args.streaming:
+        # the document is written to the output while it's converted
+        converter.convert(output)
+    else:
+        converter.save(output)
     print(f"Generated document: {os.path.abspath(output)}")
 
     if debug:
@@ -0,0 +1,444 @@
+"""Parallel layout of chapters.
+
+Every level-1 heading after the first page starts a new page, so a chapter
+depends on the text before it only through the page it starts on, the last
+numbers of figures, tables, listings and formulas, and the way its heading is
+laid out after the end of the previous chapter.
+
+Chapters are laid out concurrently in worker processes as if the previous
+chapter ended in the middle of a page and with numbering from 1. Then they are
+spliced into the document in order: the pages of the headings are shifted,
+numbers are changed to the final ones and images and links are related to the
+document. A chapter whose heading is laid out differently after the actual end
+of the previous chapter is laid out again from it.
+
+Layouts don't depend on the chapters before them, so they are kept in a
+ChapterCache and a chapter that hasn't changed since the previous conversion
+is spliced without being rendered again.
+"""
+from collections import OrderedDict, defaultdict
+from collections.abc import Iterable
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from copy import copy, deepcopy
+from dataclasses import dataclass, replace
+from hashlib import blake2b
+from io import BytesIO
+from threading import Lock
+
+from docx.document import Document
+from docx.image.image import Image as DocxImage
+from docx.opc.constants import RELATIONSHIP_TYPE
+from docx.opc.part import Part
+from docx.oxml import parse_xml
+from docx.oxml.ns import qn
+from docx.shared import Length, Parented
+from docx.text.paragraph import Paragraph as DocxParagraph
+from lxml import etree
+from lxml.etree import _Element
+from marko.block import BlockElement
+from marko.element import Element
+from marko.inline import Image
+
+from .context import ConversionContext
+from .layout_tracker import LayoutState
+from .parser_ import Parser
+from .renderable.heading import Heading
+from .renderable.paragraph_sizer import ParagraphSizer
+from .renderable.toc import ToC
+from .renderable_factory import RenderableFactory
+from .rendered_info import RenderedInfo
+from .renderer import Renderer, add_page_numbering
+from .template import TemplateCache, get_template_profile
+from .toc_processor import HeadingRecord, TocProcessor
+from .util import create_element
+from .worker_pool import WorkerPool
+
+_RELATIONSHIP_ATTRIBUTES = (qn("r:embed"), qn("r:id"), qn("r:link"))
+
+# rId: is external, relationship type, url or image, name of the image's file
+Relationships = dict[str, tuple[bool, str, str | bytes, str | None]]
+
+
+class ChapterLayoutError(Exception):
+    """Chapters can't be laid out in parallel, the document has to be rendered serially"""
+
+
+@dataclass(frozen=True)
+class _Entry:
+    """Position after the previous chapter and its last element (None at the beginning of the document)"""
+    page: int
+    offset: int
+    previous: bytes | None
+
+
+_START = _Entry(1, 0, None)
+
+# chapters are laid out as if the previous one ended with a paragraph in the middle of a page
+_GUESS = _Entry(2, 1, etree.tostring(create_element("w:p")))
+
+
+@dataclass
+class _ChapterTask:
+    elements: list[BlockElement]
+    entry: _Entry
+    template_path: str | None
+    # without the caches if the chapter is laid out by a worker process
+    context: ConversionContext
+    # workers convert formulas of their chapters in place, since chapters are laid out concurrently
+    equation_workers: int | None = 1
+
+
+@dataclass
+class _ChapterLayout:
+    elements: list[bytes]
+    # page break before, no space before and the position after the first heading
+    heading: tuple[bool, bool, int, int] | None
+    end: tuple[int, int]
+    numbers: dict[str, int]
+    # category, number, index of the top-level element, path from it to the element with the number, text template
+    number_elements: list[tuple[str, int, int, tuple[int, ...], str]]
+    headings: list[HeadingRecord]
+    # index of the ToC paragraph and the number of headings before it
+    toc: tuple[int, int] | None
+    relationships: Relationships
+
+    @property
+    def size(self) -> int:
+        """Approximate size of the kept elements and images in bytes"""
+        return sum(map(len, self.elements)) + sum(len(target) for _, _, target, _ in self.relationships.values())
+
+
+def previous_rendered(element: _Element, parent: Parented) -> RenderedInfo:
+    """Returns the rendered info of an element rendered earlier, e.g. by another process (see serialize_previous)"""
+    # renderables only look at the previous element if it's a paragraph
+    return RenderedInfo(DocxParagraph(element, parent) if element.tag == qn("w:p") else None, Length(0))
+
+
+def serialize_previous(element: _Element) -> bytes:
+    """Serializes the element as much as the next renderable needs it.
+
+    Renderables only look at the properties of the previous paragraph and
+    whether it's an empty line, so equal serializations of different
+    paragraphs mean the same layout of the next element.
+    """
+    if element.tag != qn("w:p"):
+        return etree.tostring(etree.Element(element.tag))
+    if DocxParagraph(element, None).text == "\n":
+        return etree.tostring(element)
+    paragraph = create_element("w:p")
+    if element.pPr is not None:
+        paragraph.append(deepcopy(element.pPr))
+    return etree.tostring(paragraph)
+
+
+def _lay_out_heading(heading: Heading, previous_rendered: RenderedInfo | None,
+                     layout_state: LayoutState) -> tuple[bool, bool, int, int]:
+    page_break_before, no_space_before, height = heading._layout(previous_rendered, layout_state)
+    layout_state.add_height(height)
+    return page_break_before, no_space_before, *layout_state.snapshot()
+
+
+def _path(element: _Element, indexes: dict[_Element, int]) -> tuple[int, tuple[int, ...]]:
+    """Returns the index of the element's top-level ancestor and the path from it to the element"""
+    path = []
+    while element not in indexes:
+        parent = element.getparent()
+        path.append(parent.index(element))
+        element = parent
+    return indexes[element], tuple(reversed(path))
+
+
+def _layout_chapter(task: _ChapterTask) -> _ChapterLayout:
+    document = task.context.get_template(task.template_path)
+    body = document._body
+    renderables = list(Parser(document, "", task.equation_workers, task.context).parse(task.elements))
+
+    renderer = Renderer(document, page_numbering=False, record_numbered=True)
+    previous = previous_rendered(parse_xml(task.entry.previous), body) if task.entry.previous else None
+    renderer.resume((task.entry.page, task.entry.offset), previous)
+
+    heading = None
+    if previous is not None and renderables and isinstance(renderables[0], Heading):
+        heading = _lay_out_heading(renderables[0], previous, renderer.layout_tracker.current_state)
+
+    renderer.process(renderables)
+
+    elements = [element for element in body._element if element.tag != qn("w:sectPr")]
+    indexes = {element: i for i, element in enumerate(elements)}
+
+    number_elements = []
+    for renderable, number in renderer.numbered:
+        for element, template in renderable.number_elements:
+            number_elements.append((renderable.numbering_category, number, *_path(element, indexes), template))
+
+    headings = []
+    toc = None
+    for renderable in renderables:
+        if isinstance(renderable, ToC) and toc is None:
+            toc = indexes[renderable.docx_paragraph._p], len(headings)
+        elif isinstance(renderable, Heading):
+            headings.append(HeadingRecord.from_heading(renderable))
+
+    return _ChapterLayout([etree.tostring(element) for element in elements], heading,
+                          renderer.layout_tracker.snapshot(), renderer.numberer.numbers(), number_elements,
+                          headings, toc, element_relationships(elements, document.part))
+
+
+def element_relationships(elements: list[_Element], part: Part) -> Relationships:
+    """Returns relationships of the part the elements refer to (see relate_elements)"""
+    relationships = {}
+    for element in elements:
+        for node in element.iter(etree.Element):
+            for attribute in _RELATIONSHIP_ATTRIBUTES:
+                r_id = node.get(attribute)
+                if r_id is not None and r_id not in relationships:
+                    rel = part.rels[r_id]
+                    relationships[r_id] = (True, rel.reltype, rel.target_ref, None) if rel.is_external \
+                        else (False, rel.reltype, rel.target_part.blob, getattr(rel.target_part, "filename", None))
+    return relationships
+
+
+def _relate_image(part: Part, blob: bytes, filename: str | None) -> str:
+    """As part.get_or_add_image, but the image part gets the name of the file it was added from, so the
+    pictures rendered later with the same image get it too, as in the document the image came from"""
+    image = DocxImage._from_stream(BytesIO(blob), blob, filename)
+    image_parts = part.package.image_parts
+    image_part = image_parts._get_by_sha1(image.sha1) or image_parts._add_image_part(image)
+    return part.relate_to(image_part, RELATIONSHIP_TYPE.IMAGE)
+
+
+def relate_elements(elements: list[_Element], relationships: Relationships, part: Part):
+    """Relates images and links of the elements from another document to the part"""
+    r_ids = {}
+    for element in elements:
+        for node in element.iter(etree.Element):
+            for attribute in _RELATIONSHIP_ATTRIBUTES:
+                r_id = node.get(attribute)
+                if r_id is None:
+                    continue
+                if r_id not in r_ids:
+                    is_external, reltype, target, filename = relationships[r_id]
+                    if is_external:
+                        r_ids[r_id] = part.relate_to(target, reltype, is_external=True)
+                    elif reltype == RELATIONSHIP_TYPE.IMAGE:
+                        r_ids[r_id] = _relate_image(part, target, filename)
+                    else:
+                        raise ChapterLayoutError(f"Unsupported relationship {reltype}")
+                node.set(attribute, r_ids[r_id])
+
+
+def _renumber(elements: list[_Element], layout: _ChapterLayout, numbers: dict[str, int], parent: Parented,
+              max_width: Length):
+    """Changes numbers of the chapter's elements, numbers are the last numbers before the chapter"""
+    for category, number, index, path, template in layout.number_elements:
+        final_number = number + numbers[category]
+        if final_number == number:
+            continue
+
+        element = elements[index]
+        for i in path:
+            element = element[i]
+
+        # a longer number may move the end of a caption to the next line
+        paragraph = DocxParagraph(elements[index], parent) if elements[index].tag == qn("w:p") else None
+        check = paragraph is not None and len(str(final_number)) != len(str(number))
+        lines = check and ParagraphSizer(paragraph, None, max_width).calculate_height().lines
+
+        element.text = template.format(final_number)
+
+        if check and ParagraphSizer(paragraph, None, max_width).calculate_height().lines != lines:
+            raise ChapterLayoutError(f"Number {final_number} changes the layout of \"{paragraph.text}\"")
+
+
+# positions in the source (source_span, dest_span, _inline_positions, ...), they change with edits of the
+# chapters before
+_POSITION_ATTRIBUTE_SUFFIXES = ("_span", "_spans", "_positions", "_anchor")
+
+
+def _hash_elements(key: blake2b, elements: Iterable[Element]):
+    """Hashes the markdown elements regardless of their positions in the source"""
+    for element in elements:
+        key.update(type(element).__qualname__.encode())
+        for name, value in sorted(vars(element).items()):
+            if name.endswith(_POSITION_ATTRIBUTE_SUFFIXES):
+                continue
+            if name == "children" and isinstance(value, list):
+                _hash_elements(key, value)
+            else:
+                key.update(f"{name}={value!r};".encode())
+
+
+def _image_paths(elements: Iterable[Element]) -> Iterable[str]:
+    for element in elements:
+        if isinstance(element, Image):
+            yield element.dest
+        elif isinstance(getattr(element, "children", None), list):
+            yield from _image_paths(element.children)
+
+
+def fingerprint(elements: list[Element], context: ConversionContext) -> bytes:
+    """Returns the hash of the markdown elements and the images they refer to"""
+    key = blake2b(digest_size=16)
+    _hash_elements(key, elements)
+    for path in _image_paths(elements):
+        key.update(path.encode())
+        if (data := context.read_image(path)) is not None:
+            key.update(blake2b(data, digest_size=16).digest())
+    return key.digest()
+
+
+class ChapterCache:
+    """Keeps layouts of the recently rendered chapters.
+
+    A layout is identified by the chapter's markdown, the images it refers to,
+    the template, the settings of the conversion and the position the chapter is laid out
+    from. Numbers and pages of the chapters before it are applied while
+    splicing, so they aren't a part of the key. Thread-safe.
+    """
+
+    def __init__(self, maxsize: int = 64 * 1024 * 1024):
+        # total size of the kept layouts, images included
+        self._maxsize = maxsize
+        self._size = 0
+        self._layouts: OrderedDict[bytes, _ChapterLayout] = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def key(task: _ChapterTask) -> bytes:
+        key = blake2b(repr((task.entry, TemplateCache.key(task.template_path), task.context.working_dir,
+                            task.context.syntax_highlighting)).encode(), digest_size=16)
+        key.update(fingerprint(task.elements, task.context))
+        return key.digest()
+
+    def get(self, key: bytes) -> _ChapterLayout | None:
+        with self._lock:
+            layout = self._layouts.get(key)
+            if layout is not None:
+                self._layouts.move_to_end(key)
+            return layout
+
+    def put(self, key: bytes, layout: _ChapterLayout):
+        with self._lock:
+            if (previous := self._layouts.pop(key, None)) is not None:
+                self._size -= previous.size
+            self._layouts[key] = layout
+            self._size += layout.size
+            while self._size > self._maxsize:
+                _, old_layout = self._layouts.popitem(last=False)
+                self._size -= old_layout.size
+
+    def clear(self):
+        with self._lock:
+            self._layouts.clear()
+            self._size = 0
+
+
+chapter_cache = ChapterCache()
+
+
+_pool = WorkerPool()
+
+
+def _lay_out(task: _ChapterTask, pool: ProcessPoolExecutor | None, cache: ChapterCache | None) -> Future:
+    """Returns the future layout of the chapter, it's laid out in the pool or in this process if there is no pool"""
+    if pool is None:
+        task = replace(task, equation_workers=None)
+    key = cache.key(task) if cache is not None else None
+    layout = cache.get(key) if cache is not None else None
+
+    if layout is None and pool is not None:
+        try:
+            future = pool.submit(_layout_chapter, task)
+        except RuntimeError as e:
+            # the pool is shut down, another conversion has found it broken
+            raise BrokenProcessPool(e) from e
+    else:
+        future = Future()
+        future.set_result(layout or _layout_chapter(task))
+
+    if cache is not None and layout is None:
+        future.add_done_callback(lambda done: done.exception() is None and cache.put(key, done.result()))
+    return future
+
+
+def render_chapters(document: Document, chapters: list[list[BlockElement]], template_path: str | None,
+                    workers: int, cache: ChapterCache | None = None, context: ConversionContext = None):
+    """Renders chapters (see Parser.chapters) to the empty document.
+
+    Chapters are laid out in a pool of workers processes, or in this process
+    if workers is 1, and layouts from the cache are reused. The result is the
+    same as of Renderer and TocProcessor. Raises ChapterLayoutError if the
+    document has to be rendered serially, the document is partially rendered
+    then.
+    """
+    body = document._body
+    profile = get_template_profile(document)
+    context = context or ConversionContext.from_environment()
+    # headings are created to measure them on a scratch document, so their images and links aren't related
+    # to the output
+    factory = RenderableFactory(context.get_template(template_path)._body, context=context)
+
+    # an image resolver may not be picklable (e.g. it's a closure), so then chapters are laid out here
+    pool = _pool.get(workers) if workers > 1 and context.image_resolver is None else None
+    if pool is not None:
+        context = context.settings()
+
+    try:
+        futures = [_lay_out(_ChapterTask(chapter, _START if i == 0 else _GUESS, template_path, context),
+                            pool, cache)
+                   for i, chapter in enumerate(chapters)]
+
+        layout_state = LayoutState(profile.text_height, profile.text_width)
+        previous_element = None
+        numbers: dict[str, int] = defaultdict(int)
+        headings: list[HeadingRecord] = []
+        toc = None
+
+        for i, (chapter, future) in enumerate(zip(chapters, futures)):
+            layout = future.result()
+            page_shift = 0
+            no_space_before = False
+
+            if i > 0:
+                # the guess is laid out after an element, so it's wrong if nothing has been rendered before
+                guess = layout.heading if previous_element is not None else None
+                if guess is not None:
+                    page_break_before, no_space_before, page, offset = _lay_out_heading(
+                        factory.create(chapter[0], None), previous_rendered(previous_element, body),
+                        copy(layout_state))
+                    page_shift = page - guess[2]
+
+                if guess is None or guess[0] != page_break_before or guess[3] != offset \
+                        or guess[1] and not no_space_before:
+                    entry = _Entry(layout_state.page, layout_state.current_page_height,
+                                   serialize_previous(previous_element) if previous_element is not None else None)
+                    layout = _lay_out(_ChapterTask(chapter, entry, template_path, context), pool, cache).result()
+                    page_shift = 0
+
+            elements = [parse_xml(element) for element in layout.elements]
+            if no_space_before and layout.heading is not None and not layout.heading[1]:
+                DocxParagraph(elements[0], body).paragraph_format.space_before = 0  # see Heading.render
+
+            relate_elements(elements, layout.relationships, document.part)
+            _renumber(elements, layout, numbers, body, profile.text_width)
+            for element in elements:
+                body._element.append(element)
+
+            if layout.toc is not None and toc is None:
+                toc = elements[layout.toc[0]], len(headings) + layout.toc[1]
+            headings.extend(replace(heading, page=heading.page + page_shift) for heading in layout.headings)
+            for category, number in layout.numbers.items():
+                numbers[category] += number
+
+            layout_state.restore((layout.end[0] + page_shift, layout.end[1]))
+            if elements:
+                previous_element = elements[-1]
+    except BrokenProcessPool as e:
+        _pool.discard(pool)
+        raise ChapterLayoutError(e)
+
+    add_page_numbering(document)
+
+    if toc is not None:
+        TocProcessor.fill(ToC.from_paragraph(DocxParagraph(toc[0], body), profile), headings[toc[1]:])
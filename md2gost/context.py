@@ -0,0 +1,57 @@
+import os
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Callable
+
+from docx.document import Document
+
+from .template import TemplateCache, template_cache
+
+if TYPE_CHECKING:
+    from .chapters import ChapterCache
+
+# returns the data of an image by its path in the markdown, None if there is no such image
+ImageResolver = Callable[[str], bytes | None]
+
+
+@dataclass(frozen=True)
+class ConversionContext:
+    """Settings and caches of one conversion.
+
+    The context is passed to the parser and the renderables, so conversions
+    with different settings can run concurrently in one process.
+    """
+    # directory relative paths of images are resolved against
+    working_dir: str = ""
+    syntax_highlighting: bool = False
+    # reads images instead of the working directory, e.g. from the uploads of a web session
+    image_resolver: ImageResolver | None = None
+    # template.template_cache if None
+    template_cache: TemplateCache | None = None
+    # layouts of chapters are kept in it if the converter caches chapters, chapters.chapter_cache if None
+    chapter_cache: "ChapterCache | None" = None
+
+    @classmethod
+    def from_environment(cls) -> "ConversionContext":
+        """Returns the context of the WORKING_DIR and SYNTAX_HIGHLIGHTING environment variables"""
+        return cls(os.environ.get("WORKING_DIR") or "", os.environ.get("SYNTAX_HIGHLIGHTING") == "1")
+
+    def image_path(self, path: str) -> str:
+        return os.path.join(self.working_dir, os.path.expanduser(path))
+
+    def read_image(self, path: str) -> bytes | None:
+        """Returns the data of a local image, None if it can't be read"""
+        if self.image_resolver is not None:
+            return self.image_resolver(path)
+        try:
+            with open(self.image_path(path), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def settings(self) -> "ConversionContext":
+        """Returns the context without the caches, e.g. to pass it to another process"""
+        return replace(self, template_cache=None, chapter_cache=None)
+
+    def get_template(self, template_path: str | None) -> Document:
+        """Returns a new document of the template with empty body, see TemplateCache.get"""
+        return (self.template_cache or template_cache).get(template_path)
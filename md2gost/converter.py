@@ -1,25 +1,89 @@
-import docx
+import logging
+from dataclasses import replace
+from io import BytesIO
+from typing import IO
+
 from docx.document import Document
 
+from .chapters import ChapterLayoutError, render_chapters, chapter_cache
+from .context import ConversionContext, ImageResolver
 from .debugger import Debugger
+from .package_writer import etag, save
 from .parser_ import Parser
 from .toc_processor import TocProcessor
 from .renderer import Renderer
+from .streaming import BodyWriter, render_streaming
 
 
 class Converter:
     """Converts markdown file to docx file"""
 
-    def __init__(self, input_path: str, output_path: str,
-                 template_path: str = None, debug: bool = False):
+    def __init__(self, input_path: str | None, output_path: str | None,
+                 template_path: str = None, debug: bool = False, equation_workers: int = None,
+                 workers: int = None, cache_chapters: bool = False, streaming: bool = False,
+                 compression_level: int = None, reproducible: bool = False, context: ConversionContext = None,
+                 text: str = None):
+        """The context is read from the environment if it isn't given (see ConversionContext.from_environment),
+        the markdown is read from the input path if the text isn't given"""
         self._output_path = output_path
-        self._document: Document = docx.Document(template_path)
-        self._document._body.clear_content()
+        self._template_path = template_path
+        self._equation_workers = equation_workers
+        self._workers = workers or 1
+        # keep layouts of chapters, so unchanged chapters aren't rendered again by the next conversion
+        self._cache_chapters = cache_chapters
+        # see PackageZip
+        self._compression_level = compression_level
+        self._reproducible = reproducible
+        self._context = context or ConversionContext.from_environment()
+        self._document: Document = self._context.get_template(template_path)
+        # rendered elements are written to a temporary file instead of the document's body, see save
+        self._writer = BodyWriter(self._document, compression_level, reproducible) if streaming else None
         self._debugger = Debugger(self._document) if debug else None
-        with open(input_path, encoding="utf-8") as f:
-            self.parser = Parser(self._document, f.read())
+        if text is None:
+            with open(input_path, encoding="utf-8") as f:
+                text = f.read()
+        self._text = text
+        self.parser = Parser(self._document, self._text, equation_workers, self._context)
+
+    @classmethod
+    def from_text(cls, text: str, template_path: str = None, image_resolver: ImageResolver = None,
+                  context: ConversionContext = None, **kwargs) -> "Converter":
+        """Returns the converter of the markdown text, which doesn't use the filesystem besides the template.
+
+        Images are read by the resolver, if it's set. The context isn't read
+        from the environment, it's the default one if it isn't given.
+        The document is written with save or to_bytes, or to the file passed
+        to convert in the streaming mode.
+        """
+        context = context or ConversionContext()
+        if image_resolver is not None:
+            context = replace(context, image_resolver=image_resolver)
+        return cls(None, None, template_path, context=context, text=text, **kwargs)
+
+    def convert(self, file: str | IO[bytes] = None):
+        """In the streaming mode, if the file is set, the document is written to it while it's converted
+        and save isn't needed, so the core properties of the document should be set before"""
+        if self._writer is not None:
+            try:
+                render_streaming(self._document, self.parser.parse(), self._writer, file)
+            finally:
+                if file is not None:
+                    self._writer.close()
+            return
+
+        if (self._workers > 1 or self._cache_chapters) and self._debugger is None:
+            chapters = self.parser.chapters()
+            if len(chapters) > 1 or self._cache_chapters:
+                try:
+                    render_chapters(self._document, chapters, self._template_path, self._workers,
+                                    (self._context.chapter_cache or chapter_cache) if self._cache_chapters else None,
+                                    self._context)
+                    return
+                except ChapterLayoutError as e:
+                    logging.warning(f"Chapters can't be laid out in parallel, rendering serially: {e}")
+                    self._document = self._context.get_template(self._template_path)
+                    self.parser = Parser(self._document, self._text, self._equation_workers, self._context)
 
-    def convert(self):
         renderables = list(self.parser.parse())
 
         processors = [
@@ -32,4 +96,35 @@ class Converter:
 
     @property
     def document(self) -> Document:
+        """The converted document, its body is empty in the streaming mode"""
         return self._document
+
+    def save(self, file: str | IO[bytes]) -> str | None:
+        """Returns the strong ETag of the document in the reproducible mode, in which
+        the same markdown, images, template and core properties give the same bytes"""
+        if not self._reproducible:
+            self._save(file)
+            return None
+
+        output = BytesIO()
+        self._save(output)
+        data = output.getvalue()
+        if isinstance(file, str):
+            with open(file, "wb") as f:
+                f.write(data)
+        else:
+            file.write(data)
+        return etag(data)
+
+    def to_bytes(self) -> bytes:
+        """Returns the saved document"""
+        output = BytesIO()
+        self._save(output)
+        return output.getvalue()
+
+    def _save(self, file: str | IO[bytes]):
+        if self._writer is not None:
+            self._writer.save(file)
+            self._writer.close()
+        else:
+            save(self._document, file, self._compression_level, self._reproducible)
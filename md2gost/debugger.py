@@ -14,7 +14,7 @@ from docx.oxml.xmlchemy import BaseOxmlElement, OneAndOnlyOne
 from docx.text.paragraph import Paragraph
 
 from md2gost.util import create_element
-from .renderer import BOTTOM_MARGIN
+from .template import get_template_profile
 
 EMUS_PER_PX = Pt(1)
 
@@ -150,13 +150,14 @@ class _Page:
 
     @classmethod
     def from_document(cls, document: Document, *args, **kwargs):
+        profile = get_template_profile(document)
         return cls(
-            document.sections[0].page_width,
-            document.sections[0].page_height,
-            document.sections[0].left_margin,
-            document.sections[0].top_margin,
-            document.sections[0].right_margin,
-            BOTTOM_MARGIN,  # todo: fix detection
+            profile.page_width,
+            profile.page_height,
+            profile.left_margin,
+            profile.top_margin,
+            profile.right_margin,
+            profile.bottom_margin,
             *args, **kwargs
         )
 
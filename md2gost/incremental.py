@@ -0,0 +1,197 @@
+"""Incremental conversion of documents edited in a live preview.
+
+The rendered document is kept as blocks (see Parser.blocks) with a checkpoint
+after each of them: the position (see LayoutState.snapshot), the numbers and
+the last rendered element, which is all the next block depends on. A new
+version of the document is compared with the previous one block by block.
+Blocks before the first changed one are reused, the rest is rendered from the
+checkpoint before it until the checkpoint before an unchanged block is the
+same as in the previous version, then the rest of the blocks is reused too.
+"""
+from dataclasses import dataclass, replace
+
+from docx.document import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import qn
+from docx.text.paragraph import Paragraph as DocxParagraph
+from lxml import etree
+
+from .chapters import Relationships, element_relationships, fingerprint, previous_rendered, relate_elements, \
+    serialize_previous
+from .context import ConversionContext
+from .parser_ import Parser
+from .renderable.heading import Heading
+from .renderable.toc import ToC
+from .renderer import Renderer, add_page_numbering
+from .template import TemplateCache, get_template_profile
+from .toc_processor import HeadingRecord, TocProcessor
+
+
+@dataclass(frozen=True)
+class _Checkpoint:
+    position: tuple[int, int]
+    numbers: tuple[tuple[str, int], ...]
+    previous: bytes | None
+
+
+_START = _Checkpoint((1, 0), (), None)
+
+_DOC_PR = qn("wp:docPr")
+
+
+@dataclass
+class _Block:
+    fingerprint: bytes
+    elements: list[bytes]
+    relationships: Relationships
+    headings: list[HeadingRecord]
+    # index of the ToC paragraph in elements
+    toc: int | None
+    # None if some renderables of the block wait for the next page
+    checkpoint: _Checkpoint | None
+
+
+class IncrementalConverter:
+    """Converts versions of a markdown document, rendering only the blocks affected by the changes.
+
+    The result is the same as of Converter. Not thread-safe, a preview
+    session should have its own converter.
+    """
+
+    def __init__(self, template_path: str = None, equation_workers: int = None, context: ConversionContext = None):
+        """The context is read from the environment on every conversion if it isn't given"""
+        self._template_path = template_path
+        self._equation_workers = equation_workers
+        self._context = context
+        self._blocks: list[_Block] = []
+        # template and settings the blocks are rendered with
+        self._blocks_key = None
+        self._rendered_blocks = 0
+
+    @property
+    def rendered_blocks(self) -> int:
+        """Number of blocks rendered by the last conversion, the others were reused"""
+        return self._rendered_blocks
+
+    @staticmethod
+    def _append(document: Document, block: _Block):
+        elements = [parse_xml(element) for element in block.elements]
+        relate_elements(elements, block.relationships, document.part)
+        for element in elements:
+            document._body._element.append(element)
+
+    @staticmethod
+    def _render(document: Document, renderer: Renderer, parser: Parser, group: list, block_fingerprint: bytes,
+                picture_id: int) -> _Block:
+        body = document._body._element
+        first = len(body)
+        renderables = list(parser.parse(group))
+        for renderable in renderables:
+            renderer.render(renderable)
+        elements = body[first:]
+
+        # a picture gets the next id of the document it's created in, Converter creates all renderables before
+        # rendering them, so the ids don't depend on the blocks before
+        for element in elements:
+            for doc_pr in element.iter(_DOC_PR):
+                doc_pr.set("id", str(picture_id))
+                doc_pr.set("name", f"Picture {picture_id}")
+
+        toc = next((elements.index(renderable.docx_paragraph._p) for renderable in renderables
+                    if isinstance(renderable, ToC)), None)
+        checkpoint = None
+        if not renderer.has_deferred:
+            previous = renderer.previous_rendered
+            checkpoint = _Checkpoint(renderer.layout_tracker.snapshot(),
+                                     tuple(sorted((category, number)
+                                                  for category, number in renderer.numberer.numbers().items()
+                                                  if number)),
+                                     serialize_previous(previous.docx_element._element) if previous else None)
+
+        return _Block(block_fingerprint, [etree.tostring(element) for element in elements],
+                      element_relationships(elements, document.part),
+                      [HeadingRecord.from_heading(renderable) for renderable in renderables
+                       if isinstance(renderable, Heading)],
+                      toc, checkpoint)
+
+    def convert(self, text: str, context: ConversionContext = None) -> Document:
+        """Returns the document of the new version of the markdown, converted with the context if it's given,
+        e.g. with the image resolver of the request"""
+        context = context or self._context or ConversionContext.from_environment()
+        document = context.get_template(self._template_path)
+        body = document._body
+        first = len(body._element)
+        picture_id = document.part.next_id
+        parser = Parser(document, text, self._equation_workers, context)
+
+        # changed images change the fingerprints of their blocks, so the resolver doesn't have to be the same
+        blocks_key = TemplateCache.key(self._template_path), replace(context.settings(), image_resolver=None)
+        if blocks_key != self._blocks_key:
+            self._blocks = []
+            self._blocks_key = blocks_key
+
+        groups = parser.blocks()
+        fingerprints = [fingerprint(group, context) for group in groups]
+        old_blocks = self._blocks
+
+        # blocks before the first changed one are reused up to the last checkpoint
+        start = 0
+        while start < min(len(groups), len(old_blocks)) and fingerprints[start] == old_blocks[start].fingerprint:
+            start += 1
+        while start > 0 and old_blocks[start - 1].checkpoint is None:
+            start -= 1
+
+        # unchanged blocks at the end are reused if the layout converges before them
+        suffix = 0
+        while suffix < min(len(groups), len(old_blocks)) - start \
+                and fingerprints[-1 - suffix] == old_blocks[-1 - suffix].fingerprint:
+            suffix += 1
+
+        blocks = old_blocks[:start]
+        for block in blocks:
+            self._append(document, block)
+
+        checkpoint = blocks[-1].checkpoint if blocks else _START
+        renderer = Renderer(document, page_numbering=False)
+        renderer.resume(checkpoint.position,
+                        previous_rendered(parse_xml(checkpoint.previous), body) if checkpoint.previous else None,
+                        dict(checkpoint.numbers))
+
+        self._rendered_blocks = 0
+        for i in range(start, len(groups)):
+            old_index = i - len(groups) + len(old_blocks)
+            if i >= len(groups) - suffix and checkpoint is not None \
+                    and checkpoint == (old_blocks[old_index - 1].checkpoint if old_index > 0 else _START):
+                blocks.extend(old_blocks[old_index:])
+                for block in old_blocks[old_index:]:
+                    self._append(document, block)
+                break
+
+            blocks.append(self._render(document, renderer, parser, groups[i], fingerprints[i], picture_id))
+            checkpoint = blocks[-1].checkpoint
+            self._rendered_blocks += 1
+        else:
+            # renderables waiting for the next page are rendered after the last block
+            end = len(body._element)
+            renderer.finish()
+            if flushed := body._element[end:]:
+                blocks[-1].elements.extend(etree.tostring(element) for element in flushed)
+                blocks[-1].relationships.update(element_relationships(flushed, document.part))
+
+        self._blocks = blocks
+        add_page_numbering(document)
+
+        toc = None
+        headings = []
+        index = first
+        for block in blocks:
+            if block.toc is not None and toc is None:
+                toc = body._element[index + block.toc], len(headings)
+            headings.extend(block.headings)
+            index += len(block.elements)
+
+        if toc is not None:
+            TocProcessor.fill(ToC.from_paragraph(DocxParagraph(toc[0], body), get_template_profile(document)),
+                              headings[toc[1]:])
+
+        return document
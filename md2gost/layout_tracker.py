@@ -4,28 +4,56 @@ from docx.shared import Length
 
 
 class LayoutState:
+    """Position of the end of the rendered content: the page and the offset from its top, in EMU.
+
+    Lengths are kept as plain ints and the page is tracked directly instead of
+    being derived from the total height, so the state is cheap to update and to
+    copy. snapshot and restore save the position as a tuple.
+    """
+    __slots__ = ("max_height", "max_width", "_page", "_offset")
+
     def __init__(self, max_height: Length, max_width: Length):
-        self.max_height: Length = max_height
+        self.max_height: int = int(max_height)
         self.max_width: Length = max_width
-        self._current_height: Length = Length(0)
+        self._page = 1
+        self._offset = 0
+
+    def __copy__(self) -> "LayoutState":
+        state = LayoutState.__new__(LayoutState)
+        state.max_height = self.max_height
+        state.max_width = self.max_width
+        state._page = self._page
+        state._offset = self._offset
+        return state
+
+    def snapshot(self) -> tuple[int, int]:
+        return self._page, self._offset
+
+    def restore(self, snapshot: tuple[int, int]):
+        self._page, self._offset = snapshot
 
     def new_page(self):
-        self._current_height += self.remaining_page_height
+        self._page += 1
+        self._offset = 0
 
     @property
-    def current_page_height(self):
-        return self._current_height % self.max_height
+    def current_page_height(self) -> int:
+        return self._offset
 
     @property
-    def remaining_page_height(self) -> Length:
-        return self.max_height - self.current_page_height
+    def remaining_page_height(self) -> int:
+        return self.max_height - self._offset
 
     @property
-    def page(self):
-        return self._current_height // self.max_height + 1
+    def page(self) -> int:
+        return self._page
 
     def add_height(self, height: Length):
-        self._current_height += height
+        offset = self._offset + int(height)
+        if not 0 <= offset < self.max_height:
+            self._page += offset // self.max_height
+            offset %= self.max_height
+        self._offset = offset
 
 
 class LayoutTracker:
@@ -41,6 +69,13 @@ class LayoutTracker:
     def is_new_page(self):
         return self._is_new_page
 
+    def snapshot(self) -> tuple[int, int]:
+        return self._state.snapshot()
+
+    def restore(self, snapshot: tuple[int, int]):
+        self._state.restore(snapshot)
+        self._is_new_page = False
+
     def add_height(self, height: Length):
         page = self._state.page
         self._state.add_height(height)
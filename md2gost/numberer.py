@@ -10,3 +10,11 @@ class Numberer:
 
     def save_number(self, category, number):
         self._categories[category] = number
+
+    def numbers(self) -> dict[str, int]:
+        """Returns the last numbers of all categories"""
+        return dict(self._categories)
+
+    def restore(self, numbers: dict[str, int]):
+        self._categories.clear()
+        self._categories.update(numbers)
@@ -0,0 +1,182 @@
+"""Writing of docx packages with the parts of the template compressed once.
+
+Parts of the template, like styles.xml, numbering.xml or the theme, are the
+same in every converted document. Their compressed data is kept by content,
+so saving another document copies it into the zip instead of compressing the
+parts again. Only the changed parts, like document.xml, relationships and
+new media, are compressed.
+"""
+import time
+import zlib
+from collections import OrderedDict
+from hashlib import blake2b
+from threading import Lock
+from typing import IO
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, ZIP_STORED
+
+from docx.document import Document
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.pkgwriter import _ContentTypesItem
+
+# compression level storing the parts uncompressed, e.g. for a docx read back right away
+STORED = 0
+
+# modification time of the entries of reproducible packages, the earliest a zip file can store
+REPRODUCIBLE_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+class CompressedParts:
+    """Keeps compressed data of the recently written parts.
+
+    Data is identified by the part's name, the compression level and the
+    part's content, so a changed part is compressed again. Thread-safe.
+    """
+
+    def __init__(self, maxsize: int = 64 * 1024 * 1024):
+        # total size of the kept parts
+        self._maxsize = maxsize
+        self._size = 0
+        self._entries: OrderedDict[tuple[str, int | None, int], tuple[bytes, bytes, int]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, name: str, level: int | None, blob: bytes) -> tuple[bytes, int] | None:
+        """Returns the compressed data and the CRC of the part"""
+        key = name, level, len(blob)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != blob:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def put(self, name: str, level: int | None, blob: bytes, data: bytes, crc: int):
+        key = name, level, len(blob)
+        with self._lock:
+            if (previous := self._entries.pop(key, None)) is not None:
+                self._size -= len(previous[0]) + len(previous[1])
+            self._entries[key] = blob, data, crc
+            self._size += len(blob) + len(data)
+            while self._size > self._maxsize:
+                _, (old_blob, old_data, _) = self._entries.popitem(last=False)
+                self._size -= len(old_blob) + len(old_data)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+compressed_parts = CompressedParts()
+
+
+# zipfile can't write compressed data, so PackageZip writes it with the internals ZipFile.writestr uses.
+# They may change between Python versions, so parts are compressed again by writestr if any is missing
+_ZIP_FILE_INTERNALS = ("_lock", "_writing", "_seekable", "start_dir", "_writecheck", "_didModify")
+_ZIP_INFO_INTERNALS = ("FileHeader",)
+# attribute of the compression level of ZipInfo, compress_level since Python 3.13
+_COMPRESS_LEVEL = next((name for name in ("compress_level", "_compresslevel") if hasattr(ZipInfo(), name)), None)
+
+
+class PackageZip:
+    """Zip file of a docx package.
+
+    Parts are deflated with the compression level (zlib's default if None),
+    level 0 (STORED) stores them uncompressed. Entries of a reproducible
+    package have fixed metadata, so the same parts give the same bytes.
+    """
+
+    def __init__(self, file: str | IO[bytes], compression_level: int = None, reproducible: bool = False):
+        self._level = compression_level
+        self._reproducible = reproducible
+        if compression_level == STORED:
+            self._zip_file = ZipFile(file, "w", compression=ZIP_STORED)
+        else:
+            self._zip_file = ZipFile(file, "w", compression=ZIP_DEFLATED, compresslevel=compression_level)
+        self._writes_compressed = all(hasattr(self._zip_file, name) for name in _ZIP_FILE_INTERNALS) \
+            and all(hasattr(ZipInfo, name) for name in _ZIP_INFO_INTERNALS)
+
+    def __enter__(self) -> "PackageZip":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, name: str, blob: bytes, cache: bool = False):
+        """Writes the part, its compressed data is kept for the next packages if cache is set"""
+        if not cache or not self._writes_compressed:
+            self._zip_file.writestr(self._info(name), blob, compresslevel=self._zip_file.compresslevel)
+            return
+
+        entry = compressed_parts.get(name, self._level, blob)
+        if entry is None:
+            entry = self._compress(blob), zlib.crc32(blob)
+            compressed_parts.put(name, self._level, blob, *entry)
+        self._write_compressed(name, blob, *entry)
+
+    def open(self, name: str) -> IO[bytes]:
+        """Opens the part for writing, e.g. to write it by pieces"""
+        return self._zip_file.open(self._info(name), "w")
+
+    def close(self):
+        self._zip_file.close()
+
+    def _info(self, name: str) -> ZipInfo:
+        # as ZipFile.writestr and ZipFile.open do for a name
+        info = ZipInfo(name, date_time=REPRODUCIBLE_DATE_TIME if self._reproducible
+                       else time.localtime(time.time())[:6])
+        info.compress_type = self._zip_file.compression
+        if _COMPRESS_LEVEL is not None:
+            setattr(info, _COMPRESS_LEVEL, self._zip_file.compresslevel)
+        info.external_attr = 0o600 << 16
+        if self._reproducible:
+            # the same on windows
+            info.create_system = 3
+        return info
+
+    def _compress(self, blob: bytes) -> bytes:
+        if self._level == STORED:
+            return blob
+        # as zipfile does
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION if self._level is None else self._level,
+                                      zlib.DEFLATED, -15)
+        return compressor.compress(blob) + compressor.flush()
+
+    def _write_compressed(self, name: str, blob: bytes, data: bytes, crc: int):
+        # zipfile can't write compressed data, so the entry is written as ZipFile.writestr does
+        zip_file = self._zip_file
+        info = self._info(name)
+        info.file_size, info.compress_size, info.CRC = len(blob), len(data), crc
+        with zip_file._lock:
+            if zip_file._writing:
+                raise ValueError("Can't write to the zip file while a part is open for writing")
+            if zip_file._seekable:
+                zip_file.fp.seek(zip_file.start_dir)
+            info.header_offset = zip_file.fp.tell()
+            zip_file._writecheck(info)
+            zip_file._didModify = True
+            zip_file.fp.write(info.FileHeader(False))
+            zip_file.fp.write(data)
+            zip_file.start_dir = zip_file.fp.tell()
+            zip_file.filelist.append(info)
+            zip_file.NameToInfo[name] = info
+
+
+def etag(data: bytes) -> str:
+    """Strong entity tag of the saved package, unquoted"""
+    return blake2b(data, digest_size=16).hexdigest()
+
+
+def save(document: Document, file: str | IO[bytes], compression_level: int = None, reproducible: bool = False):
+    """Saves the document as Document.save does, see PackageZip for the compression level and reproducible"""
+    package = document.part.package
+    parts = list(package.iter_parts())
+    for part in parts:
+        part.before_marshal()
+
+    with PackageZip(file, compression_level, reproducible) as package_zip:
+        package_zip.write(CONTENT_TYPES_URI.membername, _ContentTypesItem.from_parts(parts).blob)
+        package_zip.write(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+        for part in parts:
+            package_zip.write(part.partname.membername, part.blob, cache=part is not document.part)
+            if len(part.rels):
+                package_zip.write(part.partname.rels_uri.membername, part.rels.xml)
@@ -1,9 +1,11 @@
 from collections.abc import Generator
 
 from docx import Document
-from marko.block import BlankLine
+from marko.block import BlankLine, BlockElement
 
-from .extended_markdown import markdown, Caption
+from .context import ConversionContext
+from .extended_markdown import markdown, Caption, Equation, Heading
+from .latex_math import convert_equations
 from .renderable.caption import CaptionInfo
 from .renderable.renderable import Renderable
 from .renderable_factory import RenderableFactory
@@ -12,15 +14,66 @@ from .renderable_factory import RenderableFactory
 class Parser:
     """Parses given markdown string and returns Renderable elements"""
 
-    def __init__(self, document: Document, text: str):
+    def __init__(self, document: Document, text: str, equation_workers: int = None,
+                 context: ConversionContext = None):
+        """The context is read from the environment if it isn't given (see ConversionContext.from_environment)"""
         self._document = document
         self._parsed = markdown.parse(text)
         self._caption_info: CaptionInfo | None = None
+        self._equation_workers = equation_workers
+        self._context = context or ConversionContext.from_environment()
 
-    def parse(self) -> Generator[Renderable, None, None]:
-        factory = RenderableFactory(self._document._body)
+    @property
+    def context(self) -> ConversionContext:
+        return self._context
 
+    def _equations(self, element) -> Generator[str, None, None]:
+        """Yields latex of all block formulas in the element"""
+        if isinstance(element, Equation):
+            yield element.latex_equation
+        elif isinstance(getattr(element, "children", None), list):
+            for child in element.children:
+                yield from self._equations(child)
+
+    def chapters(self) -> list[list[BlockElement]]:
+        """Splits the top-level elements before level-1 headings.
+
+        Every level-1 heading after the first page starts a new page, so
+        chapters can be laid out independently (see chapters.render_chapters).
+        The first chapter may be the text before the first heading, it's
+        merged into the next one if it has nothing to render (e.g. only blank
+        lines), so every chapter after it has an element before it.
+        """
+        chapters = [[]]
+        for marko_element in self._parsed.children:
+            if isinstance(marko_element, Heading) and marko_element.level == 1 and chapters[-1] \
+                    and not all(isinstance(element, (BlankLine, Caption)) for element in chapters[-1]):
+                chapters.append([])
+            chapters[-1].append(marko_element)
+        return [chapter for chapter in chapters if chapter]
+
+    def blocks(self) -> list[list[BlockElement]]:
+        """Splits the top-level elements into blocks of one renderable each.
+
+        Blank lines and captions belong to the block of the element after them.
+        """
+        blocks = [[]]
         for marko_element in self._parsed.children:
+            blocks[-1].append(marko_element)
+            if not isinstance(marko_element, (BlankLine, Caption)):
+                blocks.append([])
+        return [block for block in blocks if block]
+
+    def parse(self, elements: list[BlockElement] = None) -> Generator[Renderable, None, None]:
+        """Yields renderables of the top-level elements, all of the document by default"""
+        elements = self._parsed.children if elements is None else elements
+
+        # formulas are converted all at once, so it can be done concurrently
+        equations = convert_equations((latex for element in elements for latex in self._equations(element)),
+                                      self._equation_workers)
+        factory = RenderableFactory(self._document._body, equations, self._context)
+
+        for marko_element in elements:
             if isinstance(marko_element, BlankLine):
                 continue
 
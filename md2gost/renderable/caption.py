@@ -2,9 +2,10 @@ from copy import copy
 from dataclasses import dataclass
 from typing import Generator
 
-from docx.shared import Parented
+from docx.shared import Parented, Length
 from docx.text.paragraph import Paragraph as DocxParagraph
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from lxml.etree import _Element
 
 from md2gost.layout_tracker import LayoutState
 from md2gost.renderable import Renderable
@@ -33,27 +34,43 @@ class Caption(Renderable):
         if caption_info and caption_info.text:
             self._docx_paragraph.add_run(f" - {caption_info.text}")
 
+    @property
+    def number_element(self) -> _Element:
+        """w:t element with the number"""
+        return self._numbering_run._r.t_lst[0]
+
     def center(self):
         self._docx_paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
 
-    def render(self, previous_rendered: RenderedInfo, layout_state: LayoutState) -> Generator[
-        "RenderedInfo | Renderable", None, None]:
+    def _layout(self, previous_rendered: RenderedInfo, layout_state: LayoutState) -> tuple[bool, Length]:
+        """Returns whether the caption goes to the next page and its height"""
         height_data = ParagraphSizer(
             self._docx_paragraph,
             previous_rendered.docx_element
             if previous_rendered and isinstance(previous_rendered.docx_element, DocxParagraph) else None,
             layout_state.max_width
         ).calculate_height()
+        page_break_before = self._docx_paragraph.paragraph_format.page_break_before
 
         # if three more lines don't fit, move it to the next page (so there is no only caption on the end of the page)
         if self._before and ((height_data.lines + 2 - 1) * height_data.line_spacing + 1) * height_data.line_height \
                 > layout_state.remaining_page_height:
-            self._docx_paragraph.paragraph_format.page_break_before = True
+            page_break_before = True
             height_data = ParagraphSizer(
                 self._docx_paragraph,
                 None,
                 layout_state.max_width
             ).calculate_height()
 
-        yield RenderedInfo(self._docx_paragraph, height_data.full + (layout_state.remaining_page_height
-                                                                     if self._docx_paragraph.paragraph_format.page_break_before else 0))
+        return page_break_before, height_data.full + (layout_state.remaining_page_height if page_break_before else 0)
+
+    def measure(self, previous_rendered: RenderedInfo, layout_state: LayoutState) -> Generator[
+            "RenderedInfo | Renderable", None, None]:
+        yield RenderedInfo(self._docx_paragraph, self._layout(previous_rendered, layout_state)[1])
+
+    def render(self, previous_rendered: RenderedInfo, layout_state: LayoutState) -> Generator[
+            "RenderedInfo | Renderable", None, None]:
+        page_break_before, height = self._layout(previous_rendered, layout_state)
+        if page_break_before:
+            self._docx_paragraph.paragraph_format.page_break_before = True
+        yield RenderedInfo(self._docx_paragraph, height)
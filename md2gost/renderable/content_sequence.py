@@ -18,6 +18,16 @@ class ContentSequence(Renderable):
         self._parent = parent
         self._items = items
 
+    def measure(self, previous_rendered: RenderedInfo, layout_state: LayoutState)\
+            -> Generator[RenderedInfo | SubRenderable, None, None]:
+        layout_state = copy(layout_state)
+        for item in self._items:
+            for info in item.measure(previous_rendered, layout_state):
+                if isinstance(info, RenderedInfo):
+                    previous_rendered = info
+                    layout_state.add_height(info.height)
+                yield info
+
     def render(self, previous_rendered: RenderedInfo, layout_state: LayoutState)\
             -> Generator[RenderedInfo | SubRenderable, None, None]:
         for item in self._items:
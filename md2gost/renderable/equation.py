@@ -2,8 +2,9 @@ from typing import Generator
 
 from docx.enum.table import WD_CELL_VERTICAL_ALIGNMENT
 from docx.oxml import CT_Tbl
-from docx.shared import Pt, Twips
+from docx.shared import Pt
 from docx.table import Table
+from lxml import etree
 
 from .requires_numbering import RequiresNumbering
 from ..layout_tracker import LayoutState
@@ -11,23 +12,19 @@ from ..renderable import Renderable
 from ..rendered_info import RenderedInfo
 from ..util import create_element
 from ..latex_math import latex_to_omml
+from ..template import TemplateProfile, get_template_profile
 
 
 _HEIGHT = Pt(50)
 
 
 class Equation(Renderable, RequiresNumbering):
-    def __init__(self, parent, latex_formula: str):
+    def __init__(self, parent, latex_formula: str, omml: bytes = None, profile: TemplateProfile = None):
+        """omml is the formula already converted by convert_equations"""
         super().__init__("Формула")
-        word_math = latex_to_omml(latex_formula)
+        word_math = etree.fromstring(omml) if omml else latex_to_omml(latex_formula)
 
-        sect = parent.part.document.sections[0]
-
-        # todo: style inheritance
-        left_margin = Twips(int(parent.part.styles["Normal Table"]._element.xpath("w:tblPr/w:tblCellMar/w:left")[0].attrib["{http://schemas.openxmlformats.org/wordprocessingml/2006/main}w"]))
-        right_margin = Twips(int(parent.part.styles["Normal Table"]._element.xpath("w:tblPr/w:tblCellMar/w:right")[0].attrib["{http://schemas.openxmlformats.org/wordprocessingml/2006/main}w"]))
-
-        table_width = sect.page_width - sect.right_margin - sect.left_margin + left_margin + right_margin
+        table_width = (profile or get_template_profile(parent.part.document)).table_width
 
         self._table = table = Table(CT_Tbl.new_tbl(1, 2, table_width), parent)
 
@@ -53,6 +50,7 @@ class Equation(Renderable, RequiresNumbering):
                 "w:instr": f"SEQ formula \\* ARABIC"
             }, [self._numbering_run]))
         right_paragraph._p.append(create_element("w:r", ")"))
+        self.number_elements.append((self._numbering_run, "{}"))
         right_cell.vertical_alignment = \
             WD_CELL_VERTICAL_ALIGNMENT.CENTER
 
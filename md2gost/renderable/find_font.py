@@ -1,45 +1,156 @@
-from sys import platform, exit
+from sys import platform
+import json
+import os
 import subprocess
 import logging
-from functools import cache
+import tempfile
+from functools import cache, cached_property
+from hashlib import blake2b
+
+
+FONT_FALLBACK_MAP = {
+    "Times New Roman": ["Liberation Serif", "DejaVu Serif", "Times"],
+    "Courier New": ["Liberation Mono", "DejaVu Sans Mono", "Courier"],
+    "Arial": ["Liberation Sans", "DejaVu Sans", "Helvetica"],
+}
+
+_CACHE_DIR = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+
+FONT_INDEX_PATH = os.environ.get("MD2GOST_FONT_INDEX") or os.path.join(_CACHE_DIR, "md2gost", "fonts.json")
+
+_FONTCONFIG_CACHE_DIRS = [
+    "/var/cache/fontconfig",
+    os.path.join(_CACHE_DIR, "fontconfig"),
+    os.path.expanduser("~/.fontconfig"),
+]
+
+
+def _style_key(bold: bool, italic: bool) -> str:
+    return f"{int(bool(bold))}{int(bool(italic))}"
+
+
+def _fontconfig_stamp() -> dict[str, float]:
+    """mtimes of the fontconfig cache directories, they change whenever fonts are (un)installed"""
+    stamp = {}
+    for directory in _FONTCONFIG_CACHE_DIRS:
+        try:
+            stamp[directory] = os.stat(directory).st_mtime
+        except OSError:
+            pass
+    return stamp
+
+
+class FontIndex:
+    """Maps font family and style to the font file path.
+
+    Built from fc-list output once and stored in FONT_INDEX_PATH, so other
+    processes only have to read a small json file instead of running fc-list.
+    """
+
+    def __init__(self, families: dict[str, dict[str, str]], stamp: dict[str, float]):
+        self._families = families
+        self._stamp = stamp
+
+    @classmethod
+    def from_fc_list(cls, output: str, stamp: dict[str, float] = None) -> "FontIndex":
+        families: dict[str, dict[str, str]] = {}
+        for line in output.strip().split("\n"):
+            font = line.split(":")
+            if len(font) != 3:
+                continue
+            path, names, styles = font
+            key = _style_key("Bold" in styles, "Italic" in styles)
+            for family in names.split(","):
+                families.setdefault(family.strip(), {}).setdefault(key, path)
+        return cls(families, stamp or {})
+
+    @classmethod
+    def build(cls) -> "FontIndex":
+        result = subprocess.run(
+            "fc-list", shell=True, check=True, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, text=True)
+        return cls.from_fc_list(result.stdout, _fontconfig_stamp())
+
+    @classmethod
+    def load(cls, path: str = FONT_INDEX_PATH) -> "FontIndex | None":
+        """Returns the stored index or None if there is none or fonts have changed since it was built"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("stamp") != _fontconfig_stamp():
+            return None
+        return cls(data["families"], data["stamp"])
+
+    @cached_property
+    def fingerprint(self) -> bytes:
+        """Identifies the indexed fonts and the fontconfig caches they were read with"""
+        return blake2b(json.dumps([self._stamp, self._families], sort_keys=True).encode(), digest_size=16).digest()
+
+    def save(self, path: str = FONT_INDEX_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temporary file first, so concurrent readers never see a partial index
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"stamp": self._stamp, "families": self._families}, f)
+        os.replace(temp_path, path)
+
+    def _families_matching(self, name: str) -> list[dict[str, str]]:
+        if name in self._families:
+            return [self._families[name]]
+        return [styles for family, styles in self._families.items() if name in family]
+
+    def find(self, name: str, bold: bool, italic: bool) -> str:
+        search_names = [name] + FONT_FALLBACK_MAP.get(name, [])
+        key = _style_key(bold, italic)
+
+        for search_name in search_names:
+            for styles in self._families_matching(search_name):
+                if key in styles:
+                    return styles[key]
+
+        for search_name in search_names:
+            for styles in self._families_matching(search_name):
+                return next(iter(styles.values()))
+
+        raise ValueError(f"Font {name} not found")
+
+
+_font_index: FontIndex | None = FontIndex.load() if platform == "linux" else None
+# whether _font_index was built by this process rather than loaded, so it has all installed fonts
+_font_index_built = False
+
+
+def rebuild_font_index() -> FontIndex:
+    global _font_index, _font_index_built
+    _font_index = FontIndex.build()
+    _font_index_built = True
+    try:
+        _font_index.save()
+    except OSError as e:
+        logging.warning(f"Can't save font index to {FONT_INDEX_PATH}: {e}")
+    find_font.cache_clear()
+    return _font_index
+
+
+def font_index_fingerprint() -> bytes:
+    """Fingerprint of the fonts find_font finds, it changes when the index is rebuilt with other fonts"""
+    if platform != "linux":
+        # matplotlib finds fonts there, the installed fonts aren't tracked
+        return b""
+    return (_font_index or rebuild_font_index()).fingerprint
 
 
 def __find_font_linux(name: str, bold: bool, italic: bool):
-    font_fallback_map = {
-        "Times New Roman": ["Liberation Serif", "DejaVu Serif", "Times"],
-        "Courier New": ["Liberation Mono", "DejaVu Sans Mono", "Courier"],
-        "Arial": ["Liberation Sans", "DejaVu Sans", "Helvetica"],
-    }
-    
-    search_names = [name]
-    if name in font_fallback_map:
-        search_names.extend(font_fallback_map[name])
-    
-    result = subprocess.run(
-        "fc-list", shell=True, check=True, stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE, text=True)
-
-    if result.returncode == 0:
-        fonts = \
-            [line.split(":") for line in result.stdout.strip().split("\n")]
-        fonts = [font for font in fonts if len(font) == 3]
-    else:
-        logging.log(logging.ERROR, "fc-list not found")
-        exit(1)
-
-    for search_name in search_names:
-        for path, names, styles in fonts:
-            if (search_name in names
-                and ("Bold" in styles) == bool(bold)
-                and ("Italic" in styles) == bool(italic)):
-                return path
-    
-    for search_name in search_names:
-        for path, names, styles in fonts:
-            if search_name in names:
-                return path
-    
-    raise ValueError(f"Font {name} not found")
+    index = _font_index or rebuild_font_index()
+    try:
+        return index.find(name, bold, italic)
+    except ValueError:
+        if _font_index_built:
+            raise
+    # the stored index may be outdated, e.g. there are no fontconfig caches to tell that fonts were installed
+    return rebuild_font_index().find(name, bold, italic)
 
 
 @cache
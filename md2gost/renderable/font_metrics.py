@@ -0,0 +1,123 @@
+from functools import lru_cache
+from math import ceil, floor
+from threading import Lock
+
+from freetype import Face, FT_KERNING_DEFAULT
+from PIL import ImageFont
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class GlyphAdvanceTable:
+    """Glyph metrics of one font face at one size, filled lazily per character.
+
+    Widths are computed the same way PIL's ``textbbox`` measures text: from
+    the pen origin (or the leftmost ink, if it is to the left of it) to the
+    end of the pen advance (or the rightmost ink), rounded to whole pixels.
+    """
+
+    def __init__(self, face: Face, kerning: bool = True):
+        self._face = face
+        self._has_kerning = face.has_kerning and kerning
+        # char -> (glyph index, advance, left ink edge, right ink edge) in 26.6 points
+        self._glyphs: dict[str, tuple[int, int, int, int]] = {}
+        self._kerning: dict[tuple[int, int], int] = {}
+        # the face has a single glyph slot, so filling the table must not be interleaved
+        self._lock = Lock()
+
+    def _glyph(self, char: str) -> tuple[int, int, int, int]:
+        glyph = self._glyphs.get(char)
+        if glyph is None:
+            with self._lock:
+                self._face.load_char(char)
+                metrics = self._face.glyph.metrics
+                glyph = self._glyphs[char] = (
+                    self._face.get_char_index(char),
+                    self._face.glyph.advance.x,
+                    metrics.horiBearingX,
+                    metrics.horiBearingX + metrics.width,
+                )
+        return glyph
+
+    def kerning(self, left: str, right: str) -> float:
+        """Returns the kerning of the pair of chars in points"""
+        return self._kern(self._glyph(left)[0], self._glyph(right)[0]) / 64
+
+    def _kern(self, left: int, right: int) -> int:
+        pair = (left, right)
+        kerning = self._kerning.get(pair)
+        if kerning is None:
+            with self._lock:
+                kerning = self._kerning[pair] = self._face.get_kerning(left, right, FT_KERNING_DEFAULT).x
+        return kerning
+
+    def advance(self, char: str) -> float:
+        """Returns the advance of the char in points"""
+        return self._glyph(char)[1] / 64
+
+    def text_width(self, text: str) -> int:
+        """Returns the width of the text in points"""
+        pen = left = right = 0
+        previous = None
+        for char in text:
+            index, advance, ink_left, ink_right = self._glyph(char)
+            if previous is not None and self._has_kerning:
+                pen += self._kern(previous, index)
+            left = min(left, pen + ink_left)
+            right = max(right, pen + ink_right)
+            pen += advance
+            previous = index
+        right = max(right, pen)
+        return ceil(right / 64) - floor(left / 64)
+
+    def text_widths(self, chars: "np.ndarray", lengths: "np.ndarray") -> "np.ndarray":
+        """Vectorized text_width of several texts.
+
+        chars are the code points of the texts one after another, lengths are
+        the lengths of the texts. Each text must not be empty.
+        """
+        if self._has_kerning:
+            text = chars.tobytes().decode("utf-32-le")
+            offsets = np.concatenate(([0], np.cumsum(lengths)))
+            return np.array([self.text_width(text[start:end]) for start, end in zip(offsets, offsets[1:])],
+                            dtype=np.int64)
+
+        unique_chars, inverse = np.unique(chars, return_inverse=True)
+        glyphs = np.array([self._glyph(chr(char))[1:] for char in unique_chars.tolist()], dtype=np.int64)
+        advances, ink_lefts, ink_rights = glyphs[inverse].T
+
+        ends = np.cumsum(advances)
+        starts = np.cumsum(lengths) - lengths
+        # pen positions relative to the beginning of their text
+        pens = ends - advances - np.repeat((ends - advances)[starts], lengths)
+        left = np.minimum(np.minimum.reduceat(pens + ink_lefts, starts), 0)
+        right = np.maximum(np.maximum.reduceat(pens + ink_rights, starts), pens[starts + lengths - 1]
+                           + advances[starts + lengths - 1])
+        return -(-right // 64) - left // 64
+
+
+_KERNING_PROBES = ("AV", "To", "Ta", "Yo", "LT", "WA", "Te", "Vo")
+
+
+def _pil_applies_kerning(path: str, size_pt: float, table: GlyphAdvanceTable) -> bool:
+    """Whether PIL's text layout applies the font's kerning pairs, so widths keep matching textbbox"""
+    font = ImageFont.truetype(path, size_pt)
+    for left, right in _KERNING_PROBES:
+        kerning = table.kerning(left, right)
+        if kerning:
+            return abs(font.getlength(left + right) - table.advance(left) - table.advance(right)) > abs(kerning) / 2
+    return False
+
+
+# bounded as the Font registry (see paragraph_sizer._get_font), templates may use any sizes
+@lru_cache(maxsize=64)
+def get_glyph_advance_table(path: str, size_pt: float, bold: bool, italic: bool) -> GlyphAdvanceTable:
+    face = Face(path)
+    face.set_char_size(int(size_pt * 64))
+    table = GlyphAdvanceTable(face)
+    if not _pil_applies_kerning(path, size_pt, table):
+        table = GlyphAdvanceTable(face, kerning=False)
+    return table
@@ -46,10 +46,6 @@ class Heading(Paragraph):
     def level(self) -> int:
         return self._level
 
-    @property
-    def text(self) -> str:
-        return self._docx_paragraph.text
-
     def _remove_numbering(self):
         self._docx_paragraph._p.pPr.append(
             create_element("w:numPr", [
@@ -62,40 +58,57 @@ class Heading(Paragraph):
             ])
         )
 
-    def render(self, previous_rendered: RenderedInfo, layout_state: LayoutState)\
-            -> Generator[RenderedInfo | SubRenderable, None, None]:
+    def _layout(self, previous_rendered: RenderedInfo, layout_state: LayoutState) -> tuple[bool, bool, Length]:
+        """Returns whether the heading goes to the next page, whether its space before is dropped and its height"""
         remaining_height = layout_state.remaining_page_height
+        page_break_before = self.page_break_before
 
         if self._level == 1 and layout_state.page != 1 and\
                 not (isinstance(previous_rendered.docx_element, DocxParagraph)
                      and previous_rendered.docx_element.text == "\n"):
-            self.page_break_before = True
+            page_break_before = True
 
         height_data = ParagraphSizer(
             self._docx_paragraph,
             previous_rendered.docx_element
             if previous_rendered and isinstance(previous_rendered.docx_element, DocxParagraph) else None,
-            layout_state.max_width).calculate_height()
+            layout_state.max_width, self.runs).calculate_height()
 
         if layout_state.current_page_height == 0 and layout_state.page != 1:
             height_data.before = 0
 
         # if a heading + 3 lines don't fit to the page, they go to the next page
-        if ((height_data.lines + 3 - 1) * height_data.line_spacing + 1) * height_data.line_height\
-                > layout_state.remaining_page_height:
-            self._docx_paragraph.paragraph_format.space_before = 0  # libreoffice fix
+        no_space_before = ((height_data.lines + 3 - 1) * height_data.line_spacing + 1) * height_data.line_height\
+            > layout_state.remaining_page_height
+        if no_space_before:
             height = height_data.full - height_data.before
 
             # force this behaviour as there could be a table or an image instead of text
-            self.page_break_before = True
+            page_break_before = True
 
         else:
             height = height_data.full
 
-        if self.page_break_before:
+        if page_break_before:
             height += remaining_height
 
+        return page_break_before, no_space_before, Length(height)
+
+    def measure(self, previous_rendered: RenderedInfo, layout_state: LayoutState)\
+            -> Generator[RenderedInfo | SubRenderable, None, None]:
+        yield RenderedInfo(self._docx_paragraph, self._layout(previous_rendered, layout_state)[2])
+
+    def render(self, previous_rendered: RenderedInfo, layout_state: LayoutState)\
+            -> Generator[RenderedInfo | SubRenderable, None, None]:
+        self.build()
+        page_break_before, no_space_before, height = self._layout(previous_rendered, layout_state)
+
+        if no_space_before:
+            self._docx_paragraph.paragraph_format.space_before = 0  # libreoffice fix
+        if page_break_before:
+            self.page_break_before = True
+
         layout_state.add_height(height)
         self._rendered_page = layout_state.page
 
-        yield RenderedInfo(self._docx_paragraph, Length(height))
+        yield RenderedInfo(self._docx_paragraph, height)
@@ -0,0 +1,62 @@
+from collections import OrderedDict, namedtuple
+from copy import copy
+from hashlib import blake2b
+from threading import Lock
+from typing import Callable, Hashable, TypeVar
+
+from lxml import etree
+from lxml.etree import _Element
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+T = TypeVar("T")
+
+
+def fingerprint(element: _Element) -> bytes:
+    """Returns a short digest of the element's xml"""
+    return blake2b(etree.tostring(element), digest_size=16).digest()
+
+
+class HeightCache:
+    """Thread-safe LRU cache of paragraph sizing results.
+
+    Results are mutable (renderables adjust them), so a copy is returned on
+    every lookup and the cached value is never handed out.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self._maxsize = maxsize
+        self._results: OrderedDict[Hashable, T] = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: Hashable, calculate: Callable[[], T]) -> T:
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self._hits += 1
+                return copy(result)
+            self._misses += 1
+
+        result = calculate()
+
+        if self._maxsize > 0:
+            with self._lock:
+                self._results[key] = result
+                if len(self._results) > self._maxsize:
+                    self._results.popitem(last=False)
+        return copy(result)
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._maxsize, len(self._results))
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self._hits = self._misses = 0
+
+
+height_cache = HeightCache()
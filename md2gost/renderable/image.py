@@ -1,9 +1,8 @@
 import logging
+import os
 from copy import copy
 from io import BytesIO
 from typing import Generator
-from os import environ
-import os.path
 
 import requests
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
@@ -11,6 +10,7 @@ from docx.shared import Parented, Length
 from docx.text.paragraph import Paragraph
 
 from .caption import Caption, CaptionInfo
+from ..context import ConversionContext
 from .renderable import Renderable
 from .requires_numbering import RequiresNumbering
 from ..layout_tracker import LayoutState
@@ -20,7 +20,8 @@ from ..util import create_element
 
 
 class Image(Renderable, RequiresNumbering):
-    def __init__(self, parent: Parented, path: str, caption_info: CaptionInfo | None = None):
+    def __init__(self, parent: Parented, path: str, caption_info: CaptionInfo | None = None,
+                 context: ConversionContext = None):
         super().__init__("Рисунок")
         self._parent = parent
         self._caption_info = caption_info
@@ -39,8 +40,17 @@ class Image(Renderable, RequiresNumbering):
             bytesio.write(requests.get(path).content)
             self._image = run.add_picture(bytesio)
         else:
+            context = context or ConversionContext.from_environment()
             try:
-                self._image = run.add_picture(os.path.join(environ['WORKING_DIR'], os.path.expanduser(path)))
+                if context.image_resolver is not None:
+                    data = context.read_image(path)
+                    if data is None:
+                        raise FileNotFoundError(path)
+                    self._image = run.add_picture(BytesIO(data))
+                    # the name of the file, as if the picture was added by its path
+                    self._image._inline.graphic.graphicData.pic.nvPicPr.cNvPr.name = os.path.basename(path)
+                else:
+                    self._image = run.add_picture(context.image_path(path))
             except FileNotFoundError:
                 logging.warning(f"Invalid image path: {path}, skipping...")
                 self._invalid = True
@@ -50,25 +60,32 @@ class Image(Renderable, RequiresNumbering):
     def set_number(self, number: int):
         self._number = number
 
-    def render(self, previous_rendered: RenderedInfo, layout_state: LayoutState)\
-            -> Generator[RenderedInfo | SubRenderable, None, None]:
-        if self._invalid:
-            yield from []
-            return
+    def _size(self, layout_state: LayoutState) -> tuple[Length, Length]:
+        """Returns the image's width and height limited by the page size"""
+        width, height = self._image.width, self._image.height
 
         # limit width
-        if self._image.width > layout_state.max_width:
-            height_by_width = self._image.height / self._image.width
-            self._image.width = layout_state.max_width
-            self._image.height = Length(self._image.width * height_by_width)
+        if width > layout_state.max_width:
+            height_by_width = height / width
+            width = layout_state.max_width
+            height = Length(width * height_by_width)
 
         # limit height
-        if self._image.height > layout_state.max_height:
-            width_by_height = self._image.width / self._image.height
-            self._image.height = layout_state.max_height
-            self._image.width = Length(self._image.height * width_by_height)
+        if height > layout_state.max_height:
+            width_by_height = width / height
+            height = layout_state.max_height
+            width = Length(height * width_by_height)
 
-        height = self._image.height
+        return width, height
+
+    def _layout(self, previous_rendered: RenderedInfo, layout_state: LayoutState, commit: bool)\
+            -> Generator[RenderedInfo | SubRenderable, None, None]:
+        if self._invalid:
+            return
+
+        width, height = self._size(layout_state)
+        if commit:
+            self._image.width, self._image.height = width, height
 
         if layout_state.remaining_page_height < height:
             height += layout_state.remaining_page_height
@@ -80,4 +97,16 @@ class Image(Renderable, RequiresNumbering):
         caption = Caption(self._parent, "Рисунок", self._caption_info, self._number, False)
         caption.center()
 
-        yield from caption.render(rendered_image, copy(layout_state))
+        if commit:
+            self.number_elements = [(caption.number_element, "{}")]
+            yield from caption.render(rendered_image, copy(layout_state))
+        else:
+            yield from caption.measure(rendered_image, layout_state)
+
+    def measure(self, previous_rendered: RenderedInfo, layout_state: LayoutState)\
+            -> Generator[RenderedInfo | SubRenderable, None, None]:
+        yield from self._layout(previous_rendered, copy(layout_state), False)
+
+    def render(self, previous_rendered: RenderedInfo, layout_state: LayoutState)\
+            -> Generator[RenderedInfo | SubRenderable, None, None]:
+        yield from self._layout(previous_rendered, layout_state, True)
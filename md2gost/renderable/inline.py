@@ -0,0 +1,96 @@
+"""Inline content of paragraphs, kept as plain records until the paragraph is rendered.
+
+Sizing only needs the text and the formatting of the runs, so paragraphs
+keep them as InlineRun and LinkRuns records, and the w:r elements are built
+once the paragraph is rendered (see build_runs).
+
+Adjacent text with the same formatting is kept in one run (see add_run),
+and hyphens are written as w:noBreakHyphen inside the run, so a paragraph
+has a run per change of formatting rather than per token or hyphen.
+"""
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml import CT_R
+from docx.oxml.text.paragraph import CT_P
+from docx.oxml.text.run import _RunContentAppender
+from docx.opc.part import Part
+from docx.shared import RGBColor
+
+from .resolved_style import get_style_resolver
+from ..util import create_element
+
+
+class InlineRun:
+    """w:r with text and direct formatting, all hyphens of the text are non-breaking"""
+    __slots__ = ("text", "bold", "italic", "color", "strike_through")
+
+    def __init__(self, text: str, bold: bool | None = None, italic: bool | None = None, color: RGBColor = None,
+                 strike_through: bool | None = None):
+        self.text = text
+        self.bold = bold
+        self.italic = italic
+        self.color = color
+        self.strike_through = strike_through
+
+    def same_format(self, bold: bool | None, italic: bool | None, color: RGBColor | None,
+                    strike_through: bool | None) -> bool:
+        return self.bold == bold and self.italic == italic and self.color == color \
+            and self.strike_through == strike_through
+
+
+class LinkRuns:
+    """w:hyperlink with its runs, the relationship is created when the link is added"""
+    __slots__ = ("r_id", "runs")
+
+    def __init__(self, r_id: str):
+        self.r_id = r_id
+        self.runs: list[InlineRun] = []
+
+
+def add_run(runs: "list[InlineRun | LinkRuns]", text: str, bold: bool | None, italic: bool | None,
+            color: RGBColor | None, strike_through: bool | None):
+    """Appends the text to the last run if it has the same formatting, otherwise adds a run"""
+    if not text:
+        return
+    last = runs[-1] if runs else None
+    if isinstance(last, InlineRun) and last.same_format(bold, italic, color, strike_through):
+        last.text += text
+    else:
+        runs.append(InlineRun(text, bold, italic, color, strike_through))
+
+
+def _build_run(run: InlineRun, style_id: str = None) -> CT_R:
+    # the same elements as python-docx's Run gets with its properties set, without an empty w:rPr
+    r: CT_R = create_element("w:r")
+    if style_id is not None or not run.same_format(None, None, None, None):
+        rPr = r.get_or_add_rPr()
+        if style_id is not None:
+            rPr.style = style_id
+        rPr._set_bool_val("b", run.bold)
+        rPr._set_bool_val("i", run.italic)
+        rPr._set_bool_val("strike", run.strike_through)
+        if run.color is not None:
+            rPr.get_or_add_color().val = run.color
+
+    # replace all hyphens with non-breaking hyphens
+    for i, part in enumerate(run.text.split("-")):
+        if i:
+            r.append(create_element("w:noBreakHyphen"))
+        _RunContentAppender.append_to_run_from_text(r, part)
+    return r
+
+
+def build_runs(p: CT_P, part: Part, content: "list[InlineRun | LinkRuns]"):
+    """Appends the runs and the links to the paragraph element"""
+    link_style_id = None
+    for item in content:
+        if isinstance(item, LinkRuns):
+            if link_style_id is None:
+                link_style_id = get_style_resolver(part).style_id("Hyperlink", WD_STYLE_TYPE.CHARACTER)
+            hyperlink = create_element("w:hyperlink", {
+                "r:id": item.r_id
+            })
+            for run in item.runs:
+                hyperlink.append(_build_run(run, link_style_id))
+            p.append(hyperlink)
+        else:
+            p.append(_build_run(item))
@@ -17,7 +17,6 @@ class List(Renderable):
         self._parent = parent
         self._ordered = ordered
         self._paragraphs: list[Paragraph] = []
-        self._last_paragraph_space_after = 0
 
         self._numbering = [0 for _ in range(10)]
 
@@ -37,17 +36,25 @@ class List(Renderable):
         paragraph._docx_paragraph.paragraph_format.left_indent = (Twips(425) + (first_indent or 0) + LEVEL_INDENT*(level-1))
         paragraph._docx_paragraph.paragraph_format.first_line_indent = -Twips(425)
 
-        self._last_paragraph_space_after = paragraph._docx_paragraph.paragraph_format.space_after
+        # only the last item keeps its space after
         paragraph._docx_paragraph.paragraph_format.space_before = 0
-        paragraph._docx_paragraph.paragraph_format.space_after = 0
+        if self._paragraphs:
+            self._paragraphs[-1]._docx_paragraph.paragraph_format.space_after = 0
 
         self._paragraphs.append(paragraph)
         return paragraph
 
-    def render(self, previous_rendered: RenderedInfo, layout_state: LayoutState) -> Generator[
+    def measure(self, previous_rendered: RenderedInfo, layout_state: LayoutState) -> Generator[
             RenderedInfo | Renderable, None, None]:
-        self._paragraphs[-1]._docx_paragraph.paragraph_format.space_after = self._last_paragraph_space_after
+        layout_state = copy(layout_state)
+        for paragraph in self._paragraphs:
+            for x in paragraph.measure(previous_rendered, layout_state):
+                layout_state.add_height(x.height)
+                previous_rendered = x
+                yield x
 
+    def render(self, previous_rendered: RenderedInfo, layout_state: LayoutState) -> Generator[
+            RenderedInfo | Renderable, None, None]:
         for paragraph in self._paragraphs:
             for x in paragraph.render(previous_rendered, copy(layout_state)):
                 layout_state.add_height(x.height)
@@ -1,5 +1,4 @@
 from copy import copy
-import os
 from typing import Generator, Callable
 
 from docx.oxml import CT_Tbl
@@ -12,12 +11,14 @@ from pygments.lexers import get_lexer_by_name
 
 from .caption import Caption, CaptionInfo
 from .paragraph import Paragraph
+from .paragraph_sizer import ParagraphSizerResult, calculate_mono_heights
 from .renderable import Renderable
 from .requires_numbering import RequiresNumbering
 from ..docx_elements import create_table
 from ..layout_tracker import LayoutState
 from ..rendered_info import RenderedInfo
 from ..sub_renderable import SubRenderable
+from ..template import TemplateProfile, get_template_profile
 
 
 class DocxParagraphPygmentsFormatter(Formatter):
@@ -50,26 +51,20 @@ LISTING_OFFSET = Pt(31) - Twips(108 * 2)  # todo: fix
 
 
 class Listing(Renderable, RequiresNumbering):
-    def __init__(self, parent, language: str, caption_info: CaptionInfo):
+    def __init__(self, parent, language: str, caption_info: CaptionInfo, profile: TemplateProfile = None):
         super().__init__("Листинг")
         self._caption_info = caption_info
         self._language = language
         self._parent = parent
+        self._profile = profile or get_template_profile(parent.part.document)
         self.paragraphs: list[Paragraph] = []
         self._number = None
+        self._heights_cache = None
 
     def _create_table(self, parent, width: Length):
-        # todo: style inheritance
-        left_margin = Twips(int(
-            parent.part.styles["Normal Table"]._element.xpath("w:tblPr/w:tblCellMar/w:left")[0].attrib[
-                "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}w"]))
-        right_margin = Twips(int(
-            parent.part.styles["Normal Table"]._element.xpath("w:tblPr/w:tblCellMar/w:right")[0].attrib[
-                "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}w"]))
+        return create_table(parent, 1, 1, width + self._profile.cell_left_margin + self._profile.cell_right_margin)
 
-        return create_table(parent, 1, 1, width + left_margin + right_margin)
-
-    def set_text(self, text: str):
+    def set_text(self, text: str, syntax_highlighting: bool = False):
         def create_paragraph() -> Paragraph:
             paragraph = Paragraph(self._parent)
             paragraph.style = "Code"
@@ -77,7 +72,7 @@ class Listing(Renderable, RequiresNumbering):
 
         text = text.removesuffix("\n")
 
-        if self._language and "SYNTAX_HIGHLIGHTING" in os.environ and os.environ["SYNTAX_HIGHLIGHTING"] == "1":
+        if self._language and syntax_highlighting:
             formatter = DocxParagraphPygmentsFormatter(self.paragraphs, lambda: create_paragraph())
             highlight(text, get_lexer_by_name(self._language), formatter)
         else:
@@ -89,32 +84,45 @@ class Listing(Renderable, RequiresNumbering):
     def set_number(self, number: int):
         self._number = number
 
-    def render(self, previous_rendered: RenderedInfo, layout_state: LayoutState)\
+    def _heights(self, max_width: Length) -> list[ParagraphSizerResult]:
+        """Sizes of the lines, each after the previous line, they don't depend on the position on the page"""
+        if self._heights_cache is None or self._heights_cache[0] != max_width:
+            # lines are sized all at once, before their runs are built
+            self._heights_cache = max_width, calculate_mono_heights(
+                [paragraph._docx_paragraph for paragraph in self.paragraphs], max_width,
+                [paragraph.runs for paragraph in self.paragraphs])
+        return self._heights_cache[1]
+
+    def _layout(self, previous_rendered: RenderedInfo, layout_state: LayoutState, commit: bool)\
             -> Generator[RenderedInfo | SubRenderable, None, None]:
-        caption_rendered_infos = list(
-            Caption(self._parent, "Листинг", self._caption_info, self._number, True)
-            .render(previous_rendered, copy(layout_state))
-        )
+        """Yields the caption and parts of the listing split by pages, tables are only built if commit is True"""
+        caption = Caption(self._parent, "Листинг", self._caption_info, self._number, True)
+        if commit:
+            self.number_elements = [(caption.number_element, "{}")]
+        caption_rendered_infos = list(caption.render(previous_rendered, copy(layout_state)) if commit
+                                      else caption.measure(previous_rendered, layout_state))
         layout_state.add_height(sum([info.height for info in caption_rendered_infos]))
         yield from caption_rendered_infos
 
-        table = self._create_table(self._parent, layout_state.max_width)
+        table = self._create_table(self._parent, layout_state.max_width) if commit else None
         previous = None
 
         table_height = Pt(1)  # table borders, 4 eights of point for each border
 
         # if first line doesn't fit move listing to the next page
+        heights = self._heights(layout_state.max_width - LISTING_OFFSET)
+
         paragraph_layout_state = copy(layout_state)
         paragraph_layout_state.max_width -= LISTING_OFFSET
-        paragraph_rendered_info = next(self.paragraphs[0].render(previous, paragraph_layout_state))
+        paragraph_rendered_info = next(self.paragraphs[0].measure(previous, paragraph_layout_state, heights[0]))
         if paragraph_rendered_info.height + table_height > layout_state.remaining_page_height:
             table_height += layout_state.remaining_page_height
             layout_state.add_height(layout_state.remaining_page_height)
 
-        for paragraph in self.paragraphs:
+        for paragraph, height_data in zip(self.paragraphs, heights):
             paragraph_layout_state = copy(layout_state)
             paragraph_layout_state.max_width -= LISTING_OFFSET
-            paragraph_rendered_info = next(paragraph.render(previous, paragraph_layout_state))
+            paragraph_rendered_info = next(paragraph.measure(previous, paragraph_layout_state, height_data))
 
             if paragraph_rendered_info.height > layout_state.remaining_page_height:  # todo add before after
                 table_rendered_info = RenderedInfo(table, table_height)
@@ -127,6 +135,9 @@ class Listing(Renderable, RequiresNumbering):
                 continuation_paragraph.style = "Caption"
                 continuation_paragraph.first_line_indent = 0
                 continuation_paragraph.page_break_before = True
+                if commit:
+                    self.number_elements.append((continuation_paragraph.docx_paragraph.runs[0]._r.t_lst[0],
+                                                 "Продолжение листинга {}"))
 
                 continuation_rendered_info = next(
                     continuation_paragraph.render(None, copy(layout_state)))
@@ -134,18 +145,28 @@ class Listing(Renderable, RequiresNumbering):
                 layout_state.add_height(continuation_rendered_info.height)
                 yield continuation_rendered_info
 
-                table = self._create_table(self._parent, layout_state.max_width)
+                table = self._create_table(self._parent, layout_state.max_width) if commit else None
 
                 previous = None
 
                 paragraph_layout_state = copy(layout_state)
                 paragraph_layout_state.max_width -= LISTING_OFFSET
-                paragraph_rendered_info = next(paragraph.render(previous, paragraph_layout_state))
+                paragraph_rendered_info = next(paragraph.measure(previous, paragraph_layout_state))
 
-            table._cells[0]._element.append(paragraph_rendered_info.docx_element._element)
+            if commit:
+                paragraph.build()
+                table._cells[0]._element.append(paragraph_rendered_info.docx_element._element)
             layout_state.add_height(paragraph_rendered_info.height)
             table_height += paragraph_rendered_info.height
 
             previous = paragraph_rendered_info
 
         yield RenderedInfo(table, table_height)
+
+    def measure(self, previous_rendered: RenderedInfo, layout_state: LayoutState)\
+            -> Generator[RenderedInfo | SubRenderable, None, None]:
+        yield from self._layout(previous_rendered, copy(layout_state), False)
+
+    def render(self, previous_rendered: RenderedInfo, layout_state: LayoutState)\
+            -> Generator[RenderedInfo | SubRenderable, None, None]:
+        yield from self._layout(previous_rendered, layout_state, True)
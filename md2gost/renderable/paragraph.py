@@ -3,14 +3,17 @@ from typing import Generator, Any
 
 from docx.shared import Length, Parented, RGBColor
 from docx.text.paragraph import Paragraph as DocxParagraph
-from docx.text.paragraph import Run as DocxRun
+from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.text import WD_LINE_SPACING
 from docx.opc.constants import RELATIONSHIP_TYPE
 
 from . import Renderable
 from .caption import CaptionInfo
 from .image import Image
-from .paragraph_sizer import ParagraphSizer
+from .inline import InlineRun, LinkRuns, add_run, build_runs
+from .paragraph_sizer import ParagraphSizer, ParagraphSizerResult
+from .resolved_style import get_style_resolver
+from ..context import ConversionContext
 from ..layout_tracker import LayoutState
 from ..sub_renderable import SubRenderable
 from ..util import create_element
@@ -20,61 +23,39 @@ from ..latex_math import latex_to_omml, inline_omml
 
 class Link:
     def __init__(self, url, docx_paragraph: DocxParagraph):
-        self._docx_paragraph = docx_paragraph
+        # the relationship is created right away, so relationship ids follow the order of the links
         r_id = docx_paragraph.part.relate_to(url, RELATIONSHIP_TYPE.HYPERLINK, is_external=True)
-
-        self._hyperlink = create_element("w:hyperlink", {
-            "r:id": r_id
-        })
+        self._link_runs = LinkRuns(r_id)
 
     def add_run(self, text: str, is_bold: bool = None, is_italic: bool = None, color: RGBColor = None,
                     strike_through: bool = None):
-
-        parts = text.split("-")
-        for i, part in enumerate(parts):
-            docx_run = DocxRun(create_element("w:r"), self._docx_paragraph)
-            self._hyperlink.append(docx_run._element)
-            docx_run.text = text
-            docx_run.style = "Hyperlink"
-            docx_run.bold = is_bold
-            docx_run.italic = is_italic
-            docx_run.font.color.rgb = color
-            docx_run.font.strike = strike_through
-            if i != len(parts) - 1:
-                self._hyperlink.append(create_element("w:r", [create_element("w:noBreakHyphen")]))
+        add_run(self._link_runs.runs, text, is_bold, is_italic, color, strike_through)
 
     @property
-    def element(self):
-        return self._hyperlink
+    def link_runs(self) -> LinkRuns:
+        return self._link_runs
 
 
 class Paragraph(Renderable):
     def __init__(self, parent: Parented):
         self._parent = parent
         self._docx_paragraph = DocxParagraph(create_element("w:p"), parent)
-        self._docx_paragraph.style = "Normal"
+        self.style = "Normal"
         self._images: list[Image] = []
+        # runs are built by build(), until then the paragraph element only has the paragraph properties
+        self._content: list[InlineRun | LinkRuns] = []
+        self._built = False
 
     def add_run(self, text: str, is_bold: bool = None, is_italic: bool = None, color: RGBColor = None,
                 strike_through: bool = None):
-        # replace all hyphens with non-breaking hyphens
-        parts = text.split("-")
-        for i, part in enumerate(parts):
-            docx_run = self._docx_paragraph.add_run(part)
-            docx_run.bold = is_bold
-            docx_run.italic = is_italic
-            docx_run.font.color.rgb = color
-            docx_run.font.strike = strike_through
-            if i != len(parts)-1:
-                self._docx_paragraph.add_run()._element.\
-                    append(create_element("w:noBreakHyphen"))
-
-    def add_image(self, path: str, caption_info: CaptionInfo):
-        self._images.append(Image(self._parent, path, caption_info))
+        add_run(self._content, text, is_bold, is_italic, color, strike_through)
+
+    def add_image(self, path: str, caption_info: CaptionInfo, context: ConversionContext = None):
+        self._images.append(Image(self._parent, path, caption_info, context))
 
     def add_link(self, url: str):
         link = Link(url, self._docx_paragraph)
-        self._docx_paragraph._p.append(link.element)
+        self._content.append(link.link_runs)
         return link
 
     def add_inline_equation(self, formula: str):
@@ -101,7 +82,9 @@ class Paragraph(Renderable):
 
     @style.setter
     def style(self, value: str):
-        self._docx_paragraph.style = value
+        # as DocxParagraph.style does, with the style id looked up once per document
+        self._docx_paragraph._p.style = get_style_resolver(self._docx_paragraph.part).style_id(
+            value, WD_STYLE_TYPE.PARAGRAPH)
 
     @property
     def first_line_indent(self):
@@ -111,19 +94,61 @@ class Paragraph(Renderable):
     def first_line_indent(self, value: Length):
         self._docx_paragraph.paragraph_format.first_line_indent = value
 
-    def render(self, previous_rendered: RenderedInfo, layout_state: LayoutState)\
-            -> Generator[RenderedInfo | SubRenderable, None, None]:
+    @property
+    def runs(self) -> list[InlineRun]:
+        """Runs of the paragraph including the runs of links, one for each w:r of the built paragraph"""
+        runs = []
+        for item in self._content:
+            if isinstance(item, LinkRuns):
+                runs.extend(item.runs)
+            else:
+                runs.append(item)
+        return runs
+
+    @property
+    def text(self) -> str:
+        """Text of the runs including the runs of links, with "\\n" for line breaks"""
+        return "".join(run.text for run in self.runs).replace("\r", "\n")
+
+    def build(self):
+        """Builds the runs of the paragraph element, it's done once the paragraph is rendered"""
+        if not self._built:
+            build_runs(self._docx_paragraph._p, self._docx_paragraph.part, self._content)
+            self._built = True
+
+    @property
+    def docx_paragraph(self) -> DocxParagraph:
+        self.build()
+        return self._docx_paragraph
+
+    def measure(self, previous_rendered: RenderedInfo, layout_state: LayoutState,
+                height_data: ParagraphSizerResult = None) -> Generator[RenderedInfo | SubRenderable, None, None]:
+        yield from self._layout(previous_rendered, copy(layout_state), height_data)
+
+    def render(self, previous_rendered: RenderedInfo, layout_state: LayoutState,
+               height_data: ParagraphSizerResult = None) -> Generator[RenderedInfo | SubRenderable, None, None]:
+        """height_data is the precalculated size of the paragraph after previous_rendered
+        (see calculate_mono_heights), if it's None the paragraph is sized by ParagraphSizer"""
+        self.build()
+        yield from self._layout(previous_rendered, layout_state, height_data)
+
+    def _layout(self, previous_rendered: RenderedInfo, layout_state: LayoutState,
+                height_data: ParagraphSizerResult = None) -> Generator[RenderedInfo | SubRenderable, None, None]:
+        # the paragraph is sized by its runs, so measuring and rendering only differ in images
         remaining_space = layout_state.remaining_page_height
 
         if self.page_break_before:
             layout_state.add_height(layout_state.remaining_page_height)
-        if self._docx_paragraph.text or not self._images:
+        if height_data is not None:
+            height_data = copy(height_data)
+        elif self.text or not self._images:
             height_data = ParagraphSizer(
                 self._docx_paragraph,
                 previous_rendered.docx_element
                           if previous_rendered and isinstance(previous_rendered.docx_element, DocxParagraph) else None,
-                          layout_state.max_width).calculate_height()
+                          layout_state.max_width, self.runs).calculate_height()
 
+        if height_data is not None:
             if layout_state.current_page_height == 0 and layout_state.page > 1:
                 height_data.before = 0
 
@@ -154,12 +179,12 @@ class Paragraph(Renderable):
                 height += remaining_space
 
             yield (previous_rendered := RenderedInfo(self._docx_paragraph, Length(height)))
-            layout_state.add_height(height)
+            layout_state.add_height(previous_rendered.height)
 
         images = iter(self._images)
 
         for image in images:
-            rendered_image = list(image.render(previous_rendered, copy(layout_state)))
+            rendered_image = list(image.measure(previous_rendered, layout_state))
             rendered_image_height = sum([x.height for x in rendered_image])
             if rendered_image:
                 previous_rendered = rendered_image[-1]
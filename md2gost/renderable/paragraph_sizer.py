@@ -1,80 +1,75 @@
 import logging
 import os
+from copy import copy
 from dataclasses import dataclass
-from functools import cached_property
+from functools import cached_property, lru_cache
+from hashlib import blake2b
 from math import ceil
 
 from docx.enum.text import WD_LINE_SPACING
 from docx.oxml import CT_R
+from docx.oxml.ns import qn
 from docx.text.run import Run
 from freetype import Face
 
 from docx.text.paragraph import Paragraph
 from docx.text.font import Font as DocxFont
 from docx.shared import Length, Pt, Inches
-from docx.text.parfmt import ParagraphFormat
-from docx.styles.style import _ParagraphStyle
 
 from PIL import Image, ImageDraw, ImageFont
+from lxml import etree
 
 from .find_font import find_font
-
-
-def _merge_objects(*objects):
-    from inspect import ismethod
-    """
-    Returns the new object containing attributes from objects, where the latest
-    one has the highest priority.
-    """
-
-    class MergedObject:
-        pass
-
-    merged_object = MergedObject()
-    
-    # Use dir() instead of getmembers() to avoid accessing problematic properties
-    for name in dir(objects[0]):
-        if name.startswith("_"):
-            continue
-        try:
-            value = getattr(objects[0], name)
-            if ismethod(value):
-                continue
-            merged_object.__setattr__(name, value)
-        except (ValueError, AttributeError):
-            continue
-
-    for object_ in objects[1:]:
-        for name in dir(object_):
-            if name.startswith("_"):
-                continue
-            try:
-                value = getattr(object_, name)
-                if ismethod(value):
-                    continue
-                if value is not None:
-                    merged_object.__setattr__(name, value)
-            except (ValueError, AttributeError):
-                continue
-
-    return merged_object
+from .font_metrics import get_glyph_advance_table
+from .resolved_style import ResolvedFont, ResolvedParagraphFormat, get_style_resolver
+from .height_cache import height_cache, fingerprint
+from .inline import InlineRun
+from . import sizing_store, line_breaking
+from .line_breaking import np
 
 
 class Font:
-    def __init__(self, name: str, bold: bool, italic: bool, size_pt: int):
-        path = find_font(name, bold, italic)
+    """Font metrics used for sizing. Instances are shared between threads
+    (see get_font), so they must not be mutated after construction."""
+
+    def __init__(self, name: str, bold: bool, italic: bool, size_pt: float, path: str = None):
+        path = path or find_font(name, bold, italic)
         self._freetypefont = ImageFont.truetype(path, size_pt)
-        self._draw = ImageDraw.Draw(Image.new("RGB", (1000, 1000)))
+        self._draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
 
         self._face = Face(path)
         self._face.set_char_size(int(size_pt * 64))
 
+        self._glyph_table = get_glyph_advance_table(path, size_pt, bold, italic)
+
+        self._face.load_char("i")
+        i_width = self._face.glyph.advance.x
+        self._face.load_char("m")
+        self._mono_advance = self._face.glyph.advance.x / 64
+        self._is_mono = i_width == self._face.glyph.advance.x
+
     def get_text_width(self, text: str) -> Length:
         if not self.is_mono:
             bbox = self._draw.textbbox((0, 0), text, self._freetypefont)
             return Pt(bbox[2] - bbox[0])
         else:
-            return Pt(len(text) * self._face.glyph.advance.x / 64)
+            return Pt(len(text) * self._mono_advance)
+
+    def get_word_width(self, text: str) -> Length:
+        """Same as get_text_width, but summed from the cached glyph advances
+        instead of laying the text out with PIL"""
+        if not self.is_mono:
+            return Pt(self._glyph_table.text_width(text))
+        else:
+            return Pt(len(text) * self._mono_advance)
+
+    def get_word_widths(self, chars: "np.ndarray", lengths: "np.ndarray") -> "np.ndarray":
+        """Vectorized get_word_width, returns widths in EMUs of the words
+        given by their code points (chars) and lengths"""
+        if not self.is_mono:
+            return self._glyph_table.text_widths(chars, lengths) * Length._EMUS_PER_PT
+        else:
+            return (lengths * self._mono_advance * Length._EMUS_PER_PT).astype(np.int64)
 
     def get_line_height(self) -> Length:
         # TODO: make it work for all fonts
@@ -84,15 +79,35 @@ class Font:
             return Pt(13.61)
         else:
             return Pt(self._face.size.height / 64)
-    @cached_property
-    def is_mono(self):
-        self._face.load_char("i")
-        i_width = self._face.glyph.advance.x
-        self._face.load_char("m")
-        return i_width == self._face.glyph.advance.x
-        # return self._face.glyph.bitmap.width
+
+    @property
+    def is_mono(self) -> bool:
+        return self._is_mono
+
+
+@lru_cache(maxsize=64)
+def _get_font(path: str, size_pt: float, bold: bool, italic: bool) -> Font:
+    return Font(None, bold, italic, size_pt, path)
+
+
+def get_font(name: str, bold: bool, italic: bool, size_pt: float) -> Font:
+    """Returns the process-wide shared Font for the given parameters"""
+    return _get_font(find_font(name, bold, italic), size_pt, bool(bold), bool(italic))
+
+
+def font_registry_info():
+    """Returns hits, misses, maxsize and currsize of the shared Font registry"""
+    return _get_font.cache_info()
 
 
+_RUN_CONTENT_TEXT = {qn("w:tab"): "\t", qn("w:br"): "\n", qn("w:cr"): "\n", qn("w:noBreakHyphen"): "-"}
+
+
+def _run_text(run: Run) -> str:
+    """Text of the run with its non-breaking hyphens, python-docx 0.8.11 leaves them out of Run.text"""
+    return "".join((child.text or "") if child.tag == qn("w:t") else _RUN_CONTENT_TEXT.get(child.tag, "")
+                   for child in run._r)
+
 
 @dataclass
 class ParagraphSizerResult:
@@ -112,76 +127,80 @@ class ParagraphSizerResult:
 
 
 class ParagraphSizer:
-    def __init__(self, paragraph: Paragraph, previous_paragraph: Paragraph | None, max_width: Length):
+    def __init__(self, paragraph: Paragraph, previous_paragraph: Paragraph | None, max_width: Length,
+                 runs: list[InlineRun] = None):
+        """runs are the paragraph's runs if they aren't built yet (see Paragraph.runs),
+        then the paragraph element is only used for the paragraph properties"""
         self.previous_paragraph = previous_paragraph
         self.max_width = max_width
         self.paragraph = paragraph
+        self.runs = runs
 
-        self.same_style_as_previous = (paragraph.style == previous_paragraph.style) if previous_paragraph else False
+        self._style_resolver = get_style_resolver(paragraph.part)
 
     @cached_property
-    def _default_style(self):
-
-        default_style_element = type("DefaultStyle", (), {})
-        default_style_element.rPr = \
-            self.paragraph.part.document.styles.element.xpath(
-                'w:docDefaults/w:rPrDefault/w:rPr')[0]
-        default_style_element.pPr = \
-            self.paragraph.part.document.styles.element.xpath(
-                'w:docDefaults/w:pPrDefault/w:pPr')[0]
-        default_style = _ParagraphStyle(default_style_element)
-        return default_style
+    def _paragraph_format(self) -> ResolvedParagraphFormat:
+        return self._style_resolver.paragraph_format(self.paragraph)
 
     @cached_property
-    def _styles(self) -> list[_ParagraphStyle]:
-        styles = [self.paragraph.style]
-        while styles[-1].base_style:
-            styles.append(styles[-1].base_style)
-        styles.append(self._default_style)
-        return styles
+    def _fingerprint(self) -> bytes:
+        if self.runs is None:
+            return fingerprint(self.paragraph._p)
+        return runs_fingerprint(self.paragraph._p.pPr, self.runs)
 
     @cached_property
-    def _is_contextual_spacing(self) -> bool:
-        contextual_spacing = False
-        pPrs = [self.paragraph.paragraph_format._element.pPr] + \
-               [style._element.pPr for style in self._styles]
-        for pPr in pPrs:
-            if pPr.xpath("./w:contextualSpacing"):
-                contextual_spacing = True
-                break
-        return contextual_spacing
-
-    def count_lines(self, runs: list[Run], max_width: Length, docx_font: DocxFont, first_line_indent: Length,
-                    is_mono: bool = False):
+    def _previous_paragraph_format(self) -> ResolvedParagraphFormat | None:
+        if not self.previous_paragraph:
+            return None
+        return self._style_resolver.paragraph_format(self.previous_paragraph)
+
+    @property
+    def same_style_as_previous(self) -> bool:
+        return self._previous_paragraph_format is not None \
+            and self._paragraph_format.style_id == self._previous_paragraph_format.style_id
+
+    def count_lines(self, runs: list[Run | InlineRun], max_width: Length, docx_font: "DocxFont | ResolvedFont",
+                    first_line_indent: Length, is_mono: bool = False):
         lines = 1
         line_width = first_line_indent
 
-        space_width = Font(docx_font.name, docx_font.bold, docx_font.italic, docx_font.size.pt).get_text_width(" ")
+        space_width = get_font(docx_font.name, docx_font.bold, docx_font.italic, docx_font.size.pt).get_text_width(" ")
         if not is_mono:
             space_width *= 0.81
 
+        texts, fonts = [], []
+        for run in runs:
+            if isinstance(run, Run):
+                run_docx_font = self._style_resolver.run_font(docx_font, run)
+                run_text = _run_text(run)
+            else:
+                run_docx_font = self._style_resolver.inline_run_font(docx_font, run)
+                run_text = run.text
+            fonts.append(get_font(run_docx_font.name, run_docx_font.bold, run_docx_font.italic,
+                                  run_docx_font.size.pt))
+            texts.append(run_text)
+
+        if line_breaking.vectorized_line_breaking_available() \
+                and sum(map(len, texts)) >= line_breaking.VECTORIZED_MIN_LENGTH:
+            vectorized_lines = line_breaking.count_lines(texts, fonts, max_width, first_line_indent, space_width)
+            if vectorized_lines is not None:
+                return vectorized_lines
+
         word_part = ""
         word_parts_widths = [0]
         spaces = 0
-        for i, run in enumerate(runs):
+        for i, (run_text, font) in enumerate(zip(texts, fonts)):
             if word_part:
                 word_part = ""
                 word_parts_widths.append(0)
 
-            run_docx_font = _merge_objects(
-                docx_font,
-                run.font
-            )
-            font = Font(run_docx_font.name, run_docx_font.bold, run_docx_font.italic, run_docx_font.size.pt)
-
-            run_text = run.text
-            if run_text == "" and run._element.xpath("w:noBreakHyphen"):
-                run_text = "-"
             if i == len(runs) - 1:
                 run_text += " "  # add space to the end of the last run, so it adds the last word
 
             for c in run_text:
                 if c == " ":
+                    if word_part:
+                        word_parts_widths[-1] = font.get_word_width(word_part)
                     if any(word_parts_widths):
                         width = spaces*space_width + sum(word_parts_widths)
                         if width <= max_width - line_width:
@@ -204,54 +223,63 @@ class ParagraphSizer:
                         spaces += 1
                 else:
                     word_part += c
-                    word_parts_widths[-1] = font.get_text_width(word_part)
+
+            if word_part:
+                word_parts_widths[-1] = font.get_word_width(word_part)
 
         return int(lines)
 
     def calculate_height(self) -> ParagraphSizerResult:
-        max_width = self.max_width
-
+        previous_paragraph_format = self._previous_paragraph_format
+        key = (
+            self._style_resolver.styles_fingerprint,
+            self._fingerprint,
+            int(self.max_width),
+            previous_paragraph_format and previous_paragraph_format.style_id,
+            previous_paragraph_format and previous_paragraph_format.space_after,
+        )
+        return height_cache.get(key, self._calculate_height)
 
-        docx_font: DocxFont = _merge_objects(
-            *[style.font for style in self._styles[::-1] if style.font],
-            self.paragraph.style.font)
+    def _calculate_height(self) -> ParagraphSizerResult:
+        max_width = self.max_width
 
-        paragraph_format: ParagraphFormat = _merge_objects(
-            *[style.paragraph_format for style in self._styles[::-1]
-              if style.paragraph_format],
-            self.paragraph.paragraph_format
-        )
+        docx_font = self._style_resolver.font(self.paragraph)
+        paragraph_format = self._paragraph_format
 
         max_width -= (paragraph_format.left_indent or 0) + \
             (paragraph_format.right_indent or 0)
 
-        font = Font(docx_font.name, docx_font.bold, docx_font.italic, docx_font.size.pt)
-
-        # here self.paragraph.runs is not used because
-        # it does not always return all runs (e.g. if they are inside hyperlink)
-        runs = []
-        for element in self.paragraph._element.getiterator():
-            if isinstance(element, CT_R):
-                runs.append(Run(element, self.paragraph))
-
-        lines = self.count_lines(runs, max_width, docx_font, paragraph_format.first_line_indent or 0,
-                                 font.is_mono)
-
-        previous_paragraph_format: ParagraphFormat = None
-        if self.previous_paragraph:
-            previous_paragraph_styles = [self.previous_paragraph.style]
-            while previous_paragraph_styles[-1].base_style:
-                previous_paragraph_styles.append(
-                    previous_paragraph_styles[-1].base_style
-                )
-            previous_paragraph_styles.append(self._default_style)
-            previous_paragraph_format = _merge_objects(
-                *[style.paragraph_format for style in previous_paragraph_styles[::-1]
-                    if style.paragraph_format],
-                self.previous_paragraph.paragraph_format
-            )
-
-        if self._is_contextual_spacing and self.same_style_as_previous:
+        font = get_font(docx_font.name, docx_font.bold, docx_font.italic, docx_font.size.pt)
+
+        store = sizing_store.sizing_store
+        if store:
+            store_key = store.key(self._style_resolver.styles_fingerprint, self._fingerprint, int(self.max_width))
+            lines = store.get(store_key)
+        else:
+            lines = None
+
+        if lines is None:
+            runs = self.runs
+            if runs is None:
+                # here self.paragraph.runs is not used because
+                # it does not always return all runs (e.g. if they are inside hyperlink)
+                runs = []
+                for element in self.paragraph._element.getiterator():
+                    if isinstance(element, CT_R):
+                        runs.append(Run(element, self.paragraph))
+
+            lines = self.count_lines(runs, max_width, docx_font, paragraph_format.first_line_indent or 0,
+                                     font.is_mono)
+            if store:
+                store.put(store_key, lines)
+
+        return self._result(lines, font)
+
+    def _result(self, lines: int, font: Font) -> ParagraphSizerResult:
+        paragraph_format = self._paragraph_format
+        previous_paragraph_format = self._previous_paragraph_format
+
+        if paragraph_format.contextual_spacing and self.same_style_as_previous:
             before = (previous_paragraph_format.space_after or 0)
         else:
             before = (paragraph_format.space_before or 0)
@@ -269,3 +297,108 @@ class ParagraphSizer:
             raise NotImplementedError("Line spacing rule AT_LEAST is not supported")
 
         return ParagraphSizerResult(before, lines, line_height, line_spacing, after)
+
+
+def calculate_mono_heights(paragraphs: list[Paragraph], max_width: Length,
+                           runs: list[list[InlineRun]] = None) -> list[ParagraphSizerResult]:
+    """Sizes consecutive paragraphs of one monospaced style (e.g. lines of a listing) at once.
+
+    Returns the same results as ParagraphSizer(paragraph, previous paragraph,
+    max_width).calculate_height() for each paragraph. The style is resolved
+    only once, and lines that are certainly shorter than max_width (their
+    length times the widest advance) are not broken into words. Other
+    paragraphs go through ParagraphSizer. runs are the runs of each
+    paragraph if they aren't built yet (see ParagraphSizer).
+    """
+    if not paragraphs:
+        return []
+
+    first = paragraphs[0]
+    style_resolver = get_style_resolver(first.part)
+    docx_font = style_resolver.font(first)
+    font = get_font(docx_font.name, docx_font.bold, docx_font.italic, docx_font.size.pt)
+    paragraph_format = style_resolver.paragraph_format(first)
+    style_key = _xml(first._p.pPr)
+
+    line_width = max_width - (paragraph_format.left_indent or 0) - (paragraph_format.right_indent or 0) \
+        - (paragraph_format.first_line_indent or 0)
+    # single line results of the first paragraph and of the following ones, which are sized after
+    # a paragraph of the same style
+    single_line = (ParagraphSizer(first, None, max_width)._result(1, font),
+                   ParagraphSizer(first, first, max_width)._result(1, font))
+
+    # get_word_width truncates to whole EMUs, so one is added to get upper bounds of character widths
+    space_width = font.get_word_width(" ") + 1
+    char_widths: dict[bytes | tuple, int | None] = {}
+
+    def char_width(run_docx_font: ResolvedFont) -> int | None:
+        run_font = get_font(run_docx_font.name, run_docx_font.bold, run_docx_font.italic, run_docx_font.size.pt)
+        return max(run_font.get_word_width(" ") + 1, space_width) if run_font.is_mono else None
+
+    def max_runs_width(paragraph_runs: list[InlineRun]) -> int | None:
+        """max_text_width of a paragraph which runs aren't built"""
+        width = 0
+        for run in paragraph_runs:
+            if not run.text:
+                continue
+            key = run.bold, run.italic
+            if key not in char_widths:
+                char_widths[key] = char_width(style_resolver.inline_run_font(docx_font, run))
+            if char_widths[key] is None:
+                return None
+            width += len(run.text) * char_widths[key]
+        return width
+
+    def max_text_width(paragraph: Paragraph) -> int | None:
+        """Upper bound of the paragraph's text width or None if some of its fonts aren't monospaced"""
+        width = 0
+        for r in paragraph._p.iter(_R):
+            rPr = None
+            length = 0
+            for child in r:
+                if child.tag == _T:
+                    length += len(child.text or "")
+                elif child.tag == _RPR:
+                    rPr = child
+                else:
+                    length += 1  # tabs, breaks and hyphens are single characters
+            if not length:
+                continue
+            key = _xml(rPr)
+            if key not in char_widths:
+                char_widths[key] = char_width(style_resolver.run_font(docx_font, Run(r, paragraph)))
+            if char_widths[key] is None:
+                return None
+            width += length * char_widths[key]
+        return width
+
+    results = []
+    previous_same_style = False
+    for i, paragraph in enumerate(paragraphs):
+        same_style = _xml(paragraph._p.pPr) == style_key
+        if font.is_mono and same_style and (i == 0 or previous_same_style):
+            text_width = max_text_width(paragraph) if runs is None else max_runs_width(runs[i])
+            if text_width is not None and text_width <= line_width:
+                results.append(copy(single_line[min(i, 1)]))
+                previous_same_style = same_style
+                continue
+        results.append(ParagraphSizer(paragraph, paragraphs[i - 1] if i else None, max_width,
+                                      None if runs is None else runs[i]).calculate_height())
+        previous_same_style = same_style
+
+    return results
+
+
+_R, _T, _RPR = qn("w:r"), qn("w:t"), qn("w:rPr")
+
+
+def _xml(element) -> bytes:
+    return etree.tostring(element) if element is not None else b""
+
+
+def runs_fingerprint(pPr, runs: list[InlineRun]) -> bytes:
+    """Returns a short digest of the paragraph properties and what is sized of the runs"""
+    digest = blake2b(_xml(pPr), digest_size=16)
+    digest.update(repr([(run.text, run.bold, run.italic) for run in runs]).encode())
+    return digest.digest()
+
@@ -1,3 +1,4 @@
+from copy import copy
 from typing import TYPE_CHECKING
 from collections.abc import Generator
 from abc import ABC, abstractmethod
@@ -9,6 +10,17 @@ if TYPE_CHECKING:
 
 
 class Renderable(ABC):
+    def measure(self, previous_rendered: RenderedInfo, layout_state: LayoutState)\
+            -> Generator["RenderedInfo | SubRenderable", None, None]:
+        """Lays the object out without building docx elements or changing the object and layout_state.
+
+        Yields what render would yield with the same arguments, docx elements that
+        are built by render (e.g. tables) are None. The generator is lazy, so taking
+        only the first item lays out only the first block. By default the object is
+        rendered, which is only correct for renderables whose render changes nothing.
+        """
+        yield from self.render(previous_rendered, copy(layout_state))
+
     @abstractmethod
     def render(self, previous_rendered: RenderedInfo, layout_state: LayoutState)\
             -> Generator["RenderedInfo | SubRenderable", None, None]:
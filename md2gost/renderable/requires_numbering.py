@@ -1,9 +1,14 @@
 from abc import ABC, abstractmethod
 
+from lxml.etree import _Element
+
 
 class RequiresNumbering:
     def __init__(self, category):
         self.numbering_category = category
+        # rendered elements which text shows the number and templates of their text,
+        # so the number can be changed after rendering (see chapters.render_chapters)
+        self.number_elements: list[tuple[_Element, str]] = []
 
     @abstractmethod
     def set_number(self, number: int):
@@ -0,0 +1,154 @@
+from functools import cached_property
+from typing import TYPE_CHECKING
+from weakref import WeakKeyDictionary
+
+from docx.enum.style import WD_STYLE_TYPE
+from docx.opc.part import Part
+from docx.shared import Length
+from docx.styles.style import _ParagraphStyle
+from docx.text.font import Font as DocxFont
+from docx.text.paragraph import Paragraph
+from docx.text.run import Run
+from lxml import etree
+
+from .height_cache import fingerprint
+
+if TYPE_CHECKING:
+    from .inline import InlineRun
+
+
+class ResolvedFont:
+    """Effective character formatting after applying the whole style chain"""
+    __slots__ = ("name", "bold", "italic", "size")
+
+    def __init__(self, name: str | None, bold: bool | None, italic: bool | None, size: Length | None):
+        self.name = name
+        self.bold = bold
+        self.italic = italic
+        self.size = size
+
+
+class ResolvedParagraphFormat:
+    """Effective paragraph formatting after applying the whole style chain and direct formatting"""
+    __slots__ = ("style_id", "left_indent", "right_indent", "first_line_indent", "space_before",
+                 "space_after", "line_spacing", "line_spacing_rule", "contextual_spacing")
+
+    def __init__(self, style_id: str, contextual_spacing: bool):
+        self.style_id = style_id
+        self.contextual_spacing = contextual_spacing
+
+
+def _fingerprint(element: etree._Element | None) -> bytes:
+    return etree.tostring(element) if element is not None else b""
+
+
+def _merge(record, attributes: tuple[str, ...], sources: list):
+    """Sets record's attributes from sources, where the latest not None value has the highest priority"""
+    for name in attributes:
+        value = None
+        for source in sources:
+            source_value = getattr(source, name)
+            if source_value is not None:
+                value = source_value
+        setattr(record, name, value)
+    return record
+
+
+class StyleResolver:
+    """Resolves effective formatting of paragraphs and runs of one document.
+
+    Results are cached by the paragraph's pPr (it contains the style id and
+    direct formatting) or the run's rPr, so each distinct combination is
+    resolved only once per document.
+    """
+
+    _FONT_ATTRIBUTES = ResolvedFont.__slots__
+    _PARAGRAPH_FORMAT_ATTRIBUTES = ("left_indent", "right_indent", "first_line_indent", "space_before",
+                                    "space_after", "line_spacing", "line_spacing_rule")
+
+    def __init__(self, part: Part):
+        self._part = part
+        self._fonts: dict[str, ResolvedFont] = {}
+        self._paragraph_formats: dict[bytes, ResolvedParagraphFormat] = {}
+        self._run_fonts: dict[tuple, ResolvedFont] = {}
+        self._style_ids: dict[tuple[str, WD_STYLE_TYPE], str | None] = {}
+
+    @cached_property
+    def styles_fingerprint(self) -> bytes:
+        """Digest of the styles part, documents from the same template share it"""
+        return fingerprint(self._part.document.styles.element)
+
+    def style_id(self, name: str, style_type: WD_STYLE_TYPE) -> str | None:
+        """Returns the id of the style as Part.get_style_id does, None for the default style"""
+        key = name, style_type
+        if key not in self._style_ids:
+            self._style_ids[key] = self._part.get_style_id(name, style_type)
+        return self._style_ids[key]
+
+    def _default_style(self) -> _ParagraphStyle:
+        styles_element = self._part.document.styles.element
+        default_style_element = type("DefaultStyle", (), {})
+        default_style_element.rPr = styles_element.xpath('w:docDefaults/w:rPrDefault/w:rPr')[0]
+        default_style_element.pPr = styles_element.xpath('w:docDefaults/w:pPrDefault/w:pPr')[0]
+        return _ParagraphStyle(default_style_element)
+
+    def _styles(self, style: _ParagraphStyle) -> list[_ParagraphStyle]:
+        """Returns the style chain from the document defaults to the given style"""
+        styles = [style]
+        while styles[-1].base_style:
+            styles.append(styles[-1].base_style)
+        styles.append(self._default_style())
+        return styles[::-1]
+
+    def font(self, paragraph: Paragraph) -> ResolvedFont:
+        style = paragraph.style
+        font = self._fonts.get(style.style_id)
+        if font is None:
+            font = self._fonts[style.style_id] = _merge(
+                ResolvedFont(None, None, None, None), self._FONT_ATTRIBUTES,
+                [style.font for style in self._styles(style)])
+        return font
+
+    def paragraph_format(self, paragraph: Paragraph) -> ResolvedParagraphFormat:
+        pPr = paragraph._p.pPr
+        key = _fingerprint(pPr)
+        paragraph_format = self._paragraph_formats.get(key)
+        if paragraph_format is None:
+            styles = self._styles(paragraph.style)
+            pPrs = [pPr] + [style._element.pPr for style in styles]
+            contextual_spacing = any(pPr is not None and pPr.xpath("./w:contextualSpacing") for pPr in pPrs)
+            paragraph_format = self._paragraph_formats[key] = _merge(
+                ResolvedParagraphFormat(styles[-1].style_id, contextual_spacing),
+                self._PARAGRAPH_FORMAT_ATTRIBUTES,
+                [style.paragraph_format for style in styles] + [paragraph.paragraph_format])
+        return paragraph_format
+
+    def run_font(self, font: "ResolvedFont | DocxFont", run: Run) -> ResolvedFont:
+        """Returns the font with the run's direct formatting applied"""
+        key = (font.name, font.bold, font.italic, font.size, _fingerprint(run._r.rPr))
+        run_font = self._run_fonts.get(key)
+        if run_font is None:
+            run_font = self._run_fonts[key] = _merge(
+                ResolvedFont(font.name, font.bold, font.italic, font.size), self._FONT_ATTRIBUTES,
+                [font, run.font])
+        return run_font
+
+    def inline_run_font(self, font: "ResolvedFont | DocxFont", run: "InlineRun") -> ResolvedFont:
+        """run_font of a run which isn't built (see inline.InlineRun)"""
+        key = (font.name, font.bold, font.italic, font.size, run.bold, run.italic)
+        run_font = self._run_fonts.get(key)
+        if run_font is None:
+            run_font = self._run_fonts[key] = _merge(
+                ResolvedFont(font.name, font.bold, font.italic, font.size), self._FONT_ATTRIBUTES,
+                [font, ResolvedFont(None, run.bold, run.italic, None)])
+        return run_font
+
+
+_style_resolvers: "WeakKeyDictionary[Part, StyleResolver]" = WeakKeyDictionary()
+
+
+def get_style_resolver(part: Part) -> StyleResolver:
+    resolver = _style_resolvers.get(part)
+    if resolver is None:
+        resolver = _style_resolvers[part] = StyleResolver(part)
+    return resolver
@@ -0,0 +1,86 @@
+import logging
+import os
+import sqlite3
+import threading
+from hashlib import blake2b
+
+from .find_font import font_index_fingerprint
+
+# stored line counts of another version of the line breaking code aren't used,
+# increase it whenever the code counts lines differently
+LINE_COUNT_VERSION = 1
+
+
+class SizingStore:
+    """Paragraph line counts shared between processes through an SQLite database.
+
+    Enabled by setting MD2GOST_SIZING_CACHE to the database path (or by
+    set_sizing_store). Several processes may use the same file, the store
+    keeps at most max_entries of the latest results. Any database error is
+    logged and treated as a miss, so the store never breaks a conversion.
+    """
+
+    _EVICT_EVERY = 1000
+
+    def __init__(self, path: str, max_entries: int = 200_000):
+        self._path = path
+        self._max_entries = max_entries
+        self._local = threading.local()
+        self._puts = 0
+        self._puts_lock = threading.Lock()
+
+    @staticmethod
+    def key(styles_fingerprint: bytes, paragraph_fingerprint: bytes, max_width: int) -> bytes:
+        """The key depends on the version of the line breaking code and the installed fonts as well,
+        since the database outlives them"""
+        return blake2b(str(LINE_COUNT_VERSION).encode() + font_index_fingerprint() + styles_fingerprint
+                       + paragraph_fingerprint + str(max_width).encode(), digest_size=16).digest()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS lines (key BLOB PRIMARY KEY, lines INTEGER NOT NULL)")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: bytes) -> int | None:
+        try:
+            row = self._connection().execute("SELECT lines FROM lines WHERE key = ?", (key,)).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            logging.warning(f"Sizing cache {self._path} is unavailable: {e}")
+            return None
+        return row[0] if row else None
+
+    def put(self, key: bytes, lines: int):
+        try:
+            connection = self._connection()
+            connection.execute("INSERT OR REPLACE INTO lines (key, lines) VALUES (?, ?)", (key, lines))
+            with self._puts_lock:
+                self._puts += 1
+                evict = self._puts % self._EVICT_EVERY == 0
+            if evict:
+                self._evict(connection)
+        except (sqlite3.Error, OSError) as e:
+            logging.warning(f"Sizing cache {self._path} is unavailable: {e}")
+
+    def _evict(self, connection: sqlite3.Connection):
+        # rowids grow with every insert, so the smallest ones are the oldest entries
+        connection.execute("DELETE FROM lines WHERE rowid <= (SELECT MAX(rowid) FROM lines) - ?",
+                           (self._max_entries,))
+
+
+sizing_store: SizingStore | None = \
+    SizingStore(os.environ["MD2GOST_SIZING_CACHE"]) if os.environ.get("MD2GOST_SIZING_CACHE") else None
+
+
+def set_sizing_store(path: str | None, max_entries: int = 200_000):
+    """Enables the shared sizing store at path, or disables it if path is None"""
+    global sizing_store
+    sizing_store = SizingStore(path, max_entries) if path else None
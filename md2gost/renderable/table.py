@@ -11,27 +11,24 @@ from ..docx_elements import *
 from ..layout_tracker import LayoutState
 from ..rendered_info import RenderedInfo
 from ..sub_renderable import SubRenderable
+from ..template import TemplateProfile, get_template_profile
 
 CELL_OFFSET = Pt(9) - Twips(108*2)
 
 
 class Table(Renderable, RequiresNumbering):
-    def __init__(self, parent: Parented, rows: int, cols: int, caption_info: CaptionInfo):
+    def __init__(self, parent: Parented, rows: int, cols: int, caption_info: CaptionInfo,
+                 profile: TemplateProfile = None):
         super().__init__("Таблица")
         self._parent = parent
         self._caption_info = caption_info
         self._cols = cols
 
-        sect = parent.part.document.sections[0]
-
-        # todo: style inheritance
-        left_margin = Twips(int(parent.part.styles["Normal Table"]._element.xpath("w:tblPr/w:tblCellMar/w:left")[0].attrib["{http://schemas.openxmlformats.org/wordprocessingml/2006/main}w"]))
-        right_margin = Twips(int(parent.part.styles["Normal Table"]._element.xpath("w:tblPr/w:tblCellMar/w:right")[0].attrib["{http://schemas.openxmlformats.org/wordprocessingml/2006/main}w"]))
-
-        self._table_width = sect.page_width - sect.left_margin - sect.right_margin + left_margin + right_margin
+        self._table_width = (profile or get_template_profile(parent.part.document)).table_width
         self._number = "?"
 
         self._rows: list[list[list[Paragraph]]] = [[[] for i in range(cols)] for j in range(rows)]
+        self._rows_layout = None
 
     def add_paragraph_to_cell(self, row: int, col: int) -> Paragraph:
         paragraph = Paragraph(self._parent)
@@ -45,38 +42,49 @@ class Table(Renderable, RequiresNumbering):
     def set_number(self, number):
         self._number = number
 
-    def render(self, previous_rendered: RenderedInfo, layout_state: LayoutState)\
+    def _layout_rows(self, max_height: Length) -> list[tuple[Length, list[list[tuple[Paragraph, RenderedInfo]]]]]:
+        """Returns heights of the rows with their bottom borders and the measured paragraphs of their cells.
+
+        Cells' paragraphs are laid out from the top of a page, so rows don't depend
+        on the table's position and are laid out only once. Their runs are built
+        when the rows are committed.
+        """
+        if self._rows_layout is None or self._rows_layout[0] != max_height:
+            rows = []
+            for row in self._rows:
+                row_height = 0
+                cells = []
+                for i in range(self._cols):
+                    cell_height = 0
+                    cell = []
+                    for paragraph in row[i]:
+                        cell_layout_state = LayoutState(max_height, self._table_width / self._cols - CELL_OFFSET)
+                        for paragraph_rendered_info in paragraph.measure(None, cell_layout_state):
+                            cell.append((paragraph, paragraph_rendered_info))
+                            cell_height += paragraph_rendered_info.height
+                        row_height = max(cell_height, row_height)
+                    cells.append(cell)
+
+                rows.append((row_height + Pt(0.5), cells))  # bottom row border
+            self._rows_layout = max_height, rows
+        return self._rows_layout[1]
+
+    def _layout(self, previous_rendered: RenderedInfo, layout_state: LayoutState, commit: bool)\
             -> Generator[RenderedInfo | SubRenderable, None, None]:
-        caption_rendered_infos = list(
-            Caption(self._parent, "Таблица", self._caption_info, self._number, True)
-            .render(previous_rendered, copy(layout_state))
-        )
+        """Yields the caption and parts of the table split by pages, tables are only built if commit is True"""
+        caption = Caption(self._parent, "Таблица", self._caption_info, self._number, True)
+        if commit:
+            self.number_elements = [(caption.number_element, "{}")]
+        caption_rendered_infos = list(caption.render(previous_rendered, copy(layout_state)) if commit
+                                      else caption.measure(previous_rendered, layout_state))
         layout_state.add_height(sum([info.height for info in caption_rendered_infos]))
         yield from caption_rendered_infos
 
-        docx_table = create_table(self._parent, 0, self._cols, self._table_width)
+        docx_table = create_table(self._parent, 0, self._cols, self._table_width) if commit else None
 
         table_height = Pt(0.5)  # top border
 
-        for row in self._rows:
-            docx_row = create_table_row(docx_table)
-            row_height = 0
-            for i in range(self._cols):
-                docx_cell = create_table_cell(docx_row, self._table_width / self._cols)
-                cell_height = 0
-                for paragraph in row[i]:
-                    cell_layout_state = LayoutState(
-                        layout_state.max_height, layout_state.max_width
-                    )
-                    cell_layout_state.max_width = self._table_width / self._cols - CELL_OFFSET
-                    for paragraph_rendered_info in paragraph.render(None, cell_layout_state):
-                        docx_cell._element.append(paragraph_rendered_info.docx_element._element)
-                        cell_height += paragraph_rendered_info.height
-                    row_height = max(cell_height, row_height)
-                docx_row._element.append(docx_cell._element)
-
-            row_height += Pt(0.5)  # bottom row border
-
+        for row_height, cells in self._layout_rows(layout_state.max_height):
             # Break before this row if table + row would not fit on current page.
             # Only break when we already have at least one row (avoid empty table on page).
             if (table_height + row_height) > layout_state.remaining_page_height and table_height > Pt(0.5):
@@ -97,14 +105,27 @@ class Table(Renderable, RequiresNumbering):
                 layout_state.add_height(continuation_rendered_info.height)
                 yield continuation_rendered_info
 
-                docx_table = create_table(self._parent, 0, self._cols, self._table_width)
+                docx_table = create_table(self._parent, 0, self._cols, self._table_width) if commit else None
 
-                # previous = None
+            if commit:
+                docx_row = create_table_row(docx_table)
+                for cell in cells:
+                    docx_cell = create_table_cell(docx_row, self._table_width / self._cols)
+                    for paragraph, paragraph_rendered_info in cell:
+                        paragraph.build()
+                        docx_cell._element.append(paragraph_rendered_info.docx_element._element)
+                    docx_row._element.append(docx_cell._element)
+                docx_table._element.append(docx_row._element)
 
-            docx_table._element.append(docx_row._element)
             layout_state.add_height(row_height)
             table_height += row_height
 
-            # previous = paragraph_rendered_info
-
         yield RenderedInfo(docx_table, table_height)
+
+    def measure(self, previous_rendered: RenderedInfo, layout_state: LayoutState)\
+            -> Generator[RenderedInfo | SubRenderable, None, None]:
+        yield from self._layout(previous_rendered, copy(layout_state), False)
+
+    def render(self, previous_rendered: RenderedInfo, layout_state: LayoutState)\
+            -> Generator[RenderedInfo | SubRenderable, None, None]:
+        yield from self._layout(previous_rendered, layout_state, True)
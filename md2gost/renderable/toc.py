@@ -3,6 +3,7 @@ from typing import Generator
 
 from docx.enum.text import WD_TAB_LEADER, WD_TAB_ALIGNMENT, WD_PARAGRAPH_ALIGNMENT
 from docx.shared import Parented, Pt
+from docx.text.paragraph import Paragraph as DocxParagraph
 from docx.text.run import Run
 
 from . import Paragraph
@@ -12,6 +13,7 @@ from ..layout_tracker import LayoutState
 from ..rendered_info import RenderedInfo
 from ..sub_renderable import SubRenderable
 from ..util import create_element
+from ..template import TemplateProfile, get_template_profile
 
 
 def create_field(parent: Parented, text: str, instr_text: str):
@@ -42,21 +44,33 @@ class ToC(Renderable):
     After the document is fully rendered fill must be called.
     """
 
-    def __init__(self, parent: Parented):
+    def __init__(self, parent: Parented, profile: TemplateProfile = None):
         self._parent = parent
+        self._profile = profile or get_template_profile(parent.part.document)
         self._paragraph = Paragraph(parent)
         self._paragraph._docx_paragraph.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
         self._paragraph.first_line_indent = 0
         self._items: list[tuple[int, str, int, bool]] = []
         pass
 
+    @classmethod
+    def from_paragraph(cls, docx_paragraph: DocxParagraph, profile: TemplateProfile = None) -> "ToC":
+        """Returns the ToC which paragraph is already rendered (e.g. by another process) to be filled"""
+        toc = cls(docx_paragraph._parent, profile)
+        toc._paragraph._docx_paragraph = docx_paragraph
+        return toc
+
+    @property
+    def docx_paragraph(self) -> DocxParagraph:
+        return self._paragraph.docx_paragraph
+
     def add_item(self, level: int, title: str, page: int, numbered: bool):
         self._items.append((level, title, page, numbered))
 
     def fill(self):
         p = self._paragraph._docx_paragraph
         p.paragraph_format.tab_stops.add_tab_stop(
-            p.part.document.sections[0].page_width - p.part.document.sections[0].left_margin - p.part.document.sections[0].right_margin,
+            self._profile.text_width,
             alignment=WD_TAB_ALIGNMENT.RIGHT, leader=WD_TAB_LEADER.DOTS)
         p.paragraph_format.tab_stops.add_tab_stop(0, alignment=WD_TAB_ALIGNMENT.LEFT, leader=WD_TAB_LEADER.SPACES)
 
@@ -8,6 +8,7 @@ from .renderable import Renderable
 from .renderable.content_sequence import ContentSequence
 from .renderable.image import Image as ImageRenderable
 from . import extended_markdown
+from .context import ConversionContext
 from .renderable.caption import CaptionInfo
 from .renderable.paragraph import Link
 from .renderable.table import Table
@@ -16,11 +17,16 @@ from .renderable.heading import Heading
 from .renderable.list import List
 from .renderable.toc import ToC
 from .renderable.page_break import PageBreak
+from .template import get_template_profile
 
 
 class RenderableFactory:
-    def __init__(self, parent: Parented):
+    def __init__(self, parent: Parented, equations: dict[str, bytes] = None, context: ConversionContext = None):
+        """equations are formulas converted in advance (see latex_math.convert_equations)"""
         self._parent = parent
+        self._equations = equations or {}
+        self._context = context or ConversionContext.from_environment()
+        self._profile = get_template_profile(parent.part.document)
 
     @singledispatchmethod
     def create(self, marko_element: extended_markdown.BlockElement,
@@ -30,8 +36,7 @@ class RenderableFactory:
         logging.warning(f"{marko_element.get_type()} is not supported")
         return paragraph
 
-    @staticmethod
-    def _add_child_to_paragraph(paragraph_or_link: Paragraph | Link, child, classes: list[type]):
+    def _add_child_to_paragraph(self, paragraph_or_link: Paragraph | Link, child, classes: list[type]):
         if isinstance(child, (extended_markdown.RawText, extended_markdown.Literal)):
             paragraph_or_link.add_run(child.children,
                                       is_bold=extended_markdown.StrongEmphasis in classes or None,
@@ -40,51 +45,47 @@ class RenderableFactory:
         elif isinstance(child, extended_markdown.CodeSpan):
             paragraph_or_link.add_run(child.children, is_italic=True)
         elif isinstance(child, extended_markdown.Image):
-            paragraph_or_link.add_image(child.dest, CaptionInfo(None, child.title))
+            paragraph_or_link.add_image(child.dest, CaptionInfo(None, child.title), self._context)
         elif isinstance(child, extended_markdown.LineBreak):
             pass  # ignore
         elif isinstance(child, extended_markdown.InlineEquation):
             paragraph_or_link.add_inline_equation(child.latex_equation)
         elif isinstance(child, (extended_markdown.Link, extended_markdown.Url)):
-            RenderableFactory._create_runs(paragraph_or_link.add_link(child.dest),
-                                           child.children, classes)
+            self._create_runs(paragraph_or_link.add_link(child.dest), child.children, classes)
         elif isinstance(child, (extended_markdown.Emphasis, extended_markdown.StrongEmphasis,
                                 extended_markdown.Strikethrough)):
-            RenderableFactory._create_runs(paragraph_or_link,
-                                           child.children, classes + [type(child)])
+            self._create_runs(paragraph_or_link, child.children, classes + [type(child)])
         else:
             paragraph_or_link.add_run(f" {child.get_type()} is not supported ",
                                       color=RGBColor.from_string("FF0000"))
             logging.warning(f"{child.get_type()} is not supported")
 
-    @staticmethod
-    def _create_runs(paragraph_or_link: Paragraph | Link, children, classes: list[type] = None):
+    def _create_runs(self, paragraph_or_link: Paragraph | Link, children, classes: list[type] = None):
         if not classes:
             classes = []
         for child in children:
-            RenderableFactory._add_child_to_paragraph(paragraph_or_link, child, classes)
+            self._add_child_to_paragraph(paragraph_or_link, child, classes)
 
-    @staticmethod
-    def _build_paragraph_content_items(parent: Parented, children) -> list[Renderable]:
+    def _build_paragraph_content_items(self, parent: Parented, children) -> list[Renderable]:
         """Build list of Paragraph and Image renderables in source order.
         Ensures images appear between the correct text segments."""
         items: list[Renderable] = []
         current = Paragraph(parent)
         for child in children:
             if isinstance(child, extended_markdown.Image):
-                if current._docx_paragraph.text.strip():
+                if current.text.strip():
                     items.append(current)
-                items.append(ImageRenderable(parent, child.dest, CaptionInfo(None, child.title)))
+                items.append(ImageRenderable(parent, child.dest, CaptionInfo(None, child.title), self._context))
                 current = Paragraph(parent)
             else:
-                RenderableFactory._add_child_to_paragraph(current, child, [])
-        if current._docx_paragraph.text.strip() or current._images:
+                self._add_child_to_paragraph(current, child, [])
+        if current.text.strip() or current._images:
             items.append(current)
         return items
 
     @create.register
     def _(self, marko_paragraph: extended_markdown.Paragraph, caption_info: CaptionInfo):
-        items = RenderableFactory._build_paragraph_content_items(
+        items = self._build_paragraph_content_items(
             self._parent, marko_paragraph.children
         )
         if len(items) == 0:
@@ -100,18 +101,19 @@ class RenderableFactory:
         # нумерации (1.2.10, 1.2.100) между номером и текстом всегда был отступ.
         if marko_heading.numbered:
             heading.add_run(" ")
-        RenderableFactory._create_runs(heading, marko_heading.children)
+        self._create_runs(heading, marko_heading.children)
         return heading
 
     @create.register
     def _(self, marko_code_block: extended_markdown.FencedCode | extended_markdown.CodeBlock, caption_info: CaptionInfo):
-        listing = Listing(self._parent, marko_code_block.lang, caption_info)
-        listing.set_text(marko_code_block.children[0].children)
+        listing = Listing(self._parent, marko_code_block.lang, caption_info, self._profile)
+        listing.set_text(marko_code_block.children[0].children, self._context.syntax_highlighting)
         return listing
 
     @create.register
     def _(self, marko_equation: extended_markdown.Equation, caption_info: CaptionInfo):
-        formula = Equation(self._parent, marko_equation.latex_equation)
+        formula = Equation(self._parent, marko_equation.latex_equation,
+                           self._equations.get(marko_equation.latex_equation), self._profile)
         return formula
 
     @create.register
@@ -124,7 +126,7 @@ class RenderableFactory:
                     if isinstance(child, extended_markdown.List):
                         create_items_from_marko(child, level + 1)
                     elif isinstance(child, extended_markdown.Paragraph):
-                        RenderableFactory._create_runs(
+                        self._create_runs(
                             list_.add_item(level),
                             child.children
                         )
@@ -136,11 +138,11 @@ class RenderableFactory:
     @create.register
     def _(self, marko_table: extended_markdown.Table, caption_info: CaptionInfo):
         table = Table(self._parent, len(marko_table.children), len(marko_table.children[0].children),
-                      caption_info)
+                      caption_info, self._profile)
 
         for i, row in enumerate(marko_table.children):
             for j, cell in enumerate(row.children):
-                RenderableFactory._create_runs(
+                self._create_runs(
                     table.add_paragraph_to_cell(i, j),
                     cell.children
                 )
@@ -149,7 +151,7 @@ class RenderableFactory:
 
     @create.register
     def _(self, marko_toc: extended_markdown.TOC, caption_info: CaptionInfo):
-        toc = ToC(self._parent)
+        toc = ToC(self._parent, self._profile)
         return toc
 
     @create.register
@@ -1,8 +1,7 @@
 from typing import TYPE_CHECKING
-from itertools import chain
 
 from docx.document import Document
-from docx.shared import Length, Cm, Parented, Pt
+from docx.shared import Length, Parented
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 
 from .numberer import Numberer
@@ -12,41 +11,81 @@ from .rendered_info import RenderedInfo
 from .sub_renderable import SubRenderable
 from .util import create_element
 from .layout_tracker import LayoutTracker
+from .template import get_template_profile
 
 if TYPE_CHECKING:
     from .debugger import Debugger
+    from .streaming import BodyWriter
 
-BOTTOM_MARGIN = Cm(1.86)
+def add_page_numbering(document: Document):
+    """Adds page numbers to the footer"""
+    paragraph = document.sections[0].footer.paragraphs[0]
+    paragraph.paragraph_format.first_line_indent = 0
+    paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+    paragraph._p.append(create_element("w:fldSimple", {
+        "w:instr": "PAGE \\* MERGEFORMAT"
+    }))
 
 
 class Renderer:
     """Renders Renderable elements to docx file"""
 
-    def __init__(self, document: Document, debugger: "Debugger | None" = None):
+    def __init__(self, document: Document, debugger: "Debugger | None" = None, page_numbering: bool = True,
+                 writer: "BodyWriter | None" = None, record_numbered: bool = False):
+        """page_numbering=False leaves adding of page numbers (see add_page_numbering) to the caller.
+        Rendered elements are written to the writer instead of the document's body if it's set.
+        record_numbered keeps the rendered renderables that require numbering (see numbered)."""
         self._document: Document = document
         self._numberer = Numberer()
         self._debugger = debugger
-        max_height = document.sections[0].page_height - document.sections[0].top_margin - BOTTOM_MARGIN# - ((136 / 2) * (Pt(1)*72/96))  # todo add bottom margin detection with footer
-        max_width = self._document.sections[0].page_width - self._document.sections[0].left_margin\
-            - self._document.sections[0].right_margin
-        self._layout_tracker = LayoutTracker(max_height, max_width)
-
-        # add page numbering to the footer
-        paragraph = self._document.sections[0].footer.paragraphs[0]
-        paragraph.paragraph_format.first_line_indent = 0
-        paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        paragraph._p.append(create_element("w:fldSimple", {
-            "w:instr": "PAGE \\* MERGEFORMAT"
-        }))
+        profile = get_template_profile(document)
+        self._layout_tracker = LayoutTracker(profile.text_height, profile.text_width)
+
+        if page_numbering:
+            add_page_numbering(document)
 
         self.previous_rendered = None
 
         self._to_new_page: list[Renderable] = []
+        self._writer = writer
+        self._record_numbered = record_numbered
+        self._numbered: list[tuple[RequiresNumbering, int]] = []
+
+    @property
+    def layout_tracker(self) -> LayoutTracker:
+        return self._layout_tracker
+
+    @property
+    def numberer(self) -> Numberer:
+        return self._numberer
+
+    @property
+    def numbered(self) -> list[tuple[RequiresNumbering, int]]:
+        """Rendered renderables that require numbering and their numbers, if record_numbered is set"""
+        return self._numbered
+
+    @property
+    def has_deferred(self) -> bool:
+        """Whether some rendered renderables wait for the next page"""
+        return bool(self._to_new_page)
+
+    def resume(self, snapshot: tuple[int, int], previous_rendered: RenderedInfo | None,
+               numbers: dict[str, int] = None):
+        """Continues rendering of a document which is already rendered up to the position (see LayoutState.snapshot)
+        with the numbers (see Numberer.numbers)"""
+        self._layout_tracker.restore(snapshot)
+        self.previous_rendered = previous_rendered
+        if numbers is not None:
+            self._numberer.restore(numbers)
 
     def process(self, renderables: list[Renderable]):
         for i in range(len(renderables)):
             self.render(renderables[i])
 
+        self.finish()
+
+    def finish(self):
+        """Renders the renderables waiting for the next page, process calls it after the last renderable"""
         self._flush_to_new_screen()
         if self._debugger:
             self._debugger.after_rendered()
@@ -55,18 +94,18 @@ class Renderer:
         if requires_numbering := isinstance(renderable, RequiresNumbering):
             number = self._numberer.get_current_number(renderable.numbering_category) + 1
             renderable.set_number(number)
-        infos = renderable.render(self.previous_rendered, self._layout_tracker.current_state)
-
-        try:
-            first = next(infos)
-            if isinstance(first, RenderedInfo) and first.height\
-                    >= self._layout_tracker.current_state.remaining_page_height:
+            if self._record_numbered:
+                self._numbered.append((renderable, number))
+        layout_state = self._layout_tracker.current_state
+        if self._to_new_page:
+            # the renderables waiting for the next page go before this one if its first block starts it,
+            # the block is laid out without building it, so the renderable is rendered only once.
+            # Without them there is nothing to decide, so the renderable is only laid out by render
+            first = next(renderable.measure(self.previous_rendered, layout_state), None)
+            if isinstance(first, RenderedInfo) and first.height >= layout_state.remaining_page_height:
                 self._flush_to_new_screen()
-                infos = renderable.render(self.previous_rendered, self._layout_tracker.current_state)
-            else:
-                infos = chain([first], infos)
-        except StopIteration:
-            pass
+                layout_state = self._layout_tracker.current_state
+        infos = renderable.render(self.previous_rendered, layout_state)
 
         for info in infos:
             if isinstance(info, SubRenderable):
@@ -87,15 +126,20 @@ class Renderer:
             if isinstance(renderable, RequiresNumbering):
                 number = self._numberer.get_current_number(renderable.numbering_category) + 1
                 renderable.set_number(number)
+                if self._record_numbered:
+                    self._numbered.append((renderable, number))
                 self._numberer.save_number(renderable.numbering_category, number)
             for info_ in renderable.render(self.previous_rendered, self._layout_tracker.current_state):
                 self._add(info_.docx_element, info_.height)
 
 
     def _add(self, element: Parented, height: Length):
-        self._document._body._element.append(
-            element._element
-        )
+        if self._writer is not None:
+            self._writer.write(element._element)
+        else:
+            self._document._body._element.append(
+                element._element
+            )
         self._layout_tracker.add_height(height)
 
         if self._debugger:
@@ -0,0 +1,217 @@
+"""Conversion of big documents with memory bounded regardless of their length.
+
+Renderables are created, rendered and written one by one: rendered elements
+are serialized to a temporary file instead of being kept in the document tree,
+and only records of the headings are kept for the table of contents. The
+paragraph of the table of contents is reserved and written in its place when
+the document is saved.
+
+If the output is known before rendering (see BodyWriter.start), the parts of
+the template and the start of the document part are written to it first and
+rendered elements go straight into the document part, until the table of
+contents is reserved: the elements after it are kept in the temporary file
+until it's filled.
+"""
+import shutil
+import tempfile
+from collections.abc import Iterable
+from contextlib import suppress
+from typing import IO
+
+from docx.document import Document
+from docx.opc.constants import CONTENT_TYPE
+from docx.opc.oxml import serialize_part_xml
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.pkgwriter import _ContentTypesItem
+from lxml import etree
+from lxml.etree import _Element
+
+from .package_writer import PackageZip
+from .renderable import Renderable
+from .renderable.heading import Heading
+from .renderable.toc import ToC
+from .renderer import Renderer, add_page_numbering
+from .toc_processor import HeadingRecord, TocProcessor
+
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class BodyWriter:
+    """Writes rendered elements of the document's body to a temporary file.
+
+    The element reserved for the table of contents is kept in memory and
+    written in its place by save, so it may be filled after the rest of the
+    document is rendered.
+
+    After start, the document is written to the output as it's rendered and
+    finished by end instead of save.
+    """
+
+    def __init__(self, document: Document, compression_level: int = None, reproducible: bool = False):
+        """See PackageZip for compression_level and reproducible"""
+        self._document = document
+        self._compression_level = compression_level
+        self._reproducible = reproducible
+        self._file = tempfile.TemporaryFile()
+        # elements are written without the namespace declarations of the document element
+        self._declarations = [f' xmlns:{prefix}="{uri}"'.encode()
+                              for prefix, uri in document.element.nsmap.items() if prefix]
+        self._reserved: _Element | None = None
+        self._reserved_offset: int | None = None
+        # the output and its document part after start
+        self._package_zip: PackageZip | None = None
+        self._part_file: IO[bytes] | None = None
+        self._tail = b""
+        self._written: set = set()
+        self._target: IO[bytes] = self._file
+
+    def start(self, file: str | IO[bytes]):
+        """Writes the parts of the template and the start of the document part to the file,
+        rendered elements are written right after them.
+
+        The document element, except for the body's content, and the parts of the template
+        mustn't be changed after it, apart from the core properties.
+        """
+        package = self._document.part.package
+        self._package_zip = PackageZip(file, self._compression_level, self._reproducible)
+        for part in package.iter_parts():
+            if part is self._document.part or part.content_type == CONTENT_TYPE.OPC_CORE_PROPERTIES:
+                continue
+            part.before_marshal()
+            self._package_zip.write(part.partname.membername, part.blob, cache=True)
+            self._written.add(part.partname)
+
+        head, self._tail = serialize_part_xml(self._document.element).rsplit(b"</w:body>", 1)
+        self._part_file = self._package_zip.open(self._document.part.partname.membername)
+        self._part_file.write(head)
+        self._target = self._part_file
+
+    def reserve(self, element: _Element):
+        """Reserves the place of the element, it's written as it is when the document is saved"""
+        self._reserved = element
+
+    def write(self, element: _Element):
+        if element is self._reserved:
+            # the elements after it are kept until it's filled
+            self._target = self._file
+            self._reserved_offset = self._file.tell()
+            return
+        self._target.write(self._serialize(element))
+
+    def _serialize(self, element: _Element) -> bytes:
+        # in the body, namespaces of the element are reconciled with the document's as when it's saved
+        body = self._document.element.body
+        body.append(element)
+        xml = etree.tostring(element, encoding="UTF-8")
+        body.remove(element)
+        end = xml.index(b">")
+        start_tag = xml[:end]
+        for declaration in self._declarations:
+            start_tag = start_tag.replace(declaration, b"")
+        return start_tag + xml[end:]
+
+    def _write_document_part(self, file: IO[bytes]):
+        head, tail = serialize_part_xml(self._document.element).rsplit(b"</w:body>", 1)
+        file.write(head)
+        self._file.seek(0)
+        if self._reserved_offset is not None:
+            _copy(self._file, file, self._reserved_offset)
+            file.write(self._serialize(self._reserved))
+        shutil.copyfileobj(self._file, file, _COPY_BUFFER_SIZE)
+        file.write(b"</w:body>" + tail)
+
+    def save(self, file: str | IO[bytes]):
+        """Saves the document with the written body as package_writer.save does"""
+        package = self._document.part.package
+        parts = list(package.iter_parts())
+        for part in parts:
+            part.before_marshal()
+
+        with PackageZip(file, self._compression_level, self._reproducible) as package_zip:
+            package_zip.write(CONTENT_TYPES_URI.membername, _ContentTypesItem.from_parts(parts).blob)
+            package_zip.write(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+            for part in parts:
+                if part is self._document.part:
+                    with package_zip.open(part.partname.membername) as part_file:
+                        self._write_document_part(part_file)
+                else:
+                    package_zip.write(part.partname.membername, part.blob, cache=True)
+                if len(part.rels):
+                    package_zip.write(part.partname.rels_uri.membername, part.rels.xml)
+
+    def end(self):
+        """Finishes the document written to the file given to start"""
+        if self._reserved_offset is not None:
+            self._part_file.write(self._serialize(self._reserved))
+            self._file.seek(0)
+            shutil.copyfileobj(self._file, self._part_file, _COPY_BUFFER_SIZE)
+        self._part_file.write(b"</w:body>" + self._tail)
+        self._part_file.close()
+
+        package = self._document.part.package
+        parts = list(package.iter_parts())
+        for part in parts:
+            if part.partname not in self._written and part is not self._document.part:
+                part.before_marshal()
+                self._package_zip.write(part.partname.membername, part.blob, cache=True)
+            if len(part.rels):
+                self._package_zip.write(part.partname.rels_uri.membername, part.rels.xml)
+        self._package_zip.write(CONTENT_TYPES_URI.membername, _ContentTypesItem.from_parts(parts).blob)
+        self._package_zip.write(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+        self._package_zip.close()
+        self._package_zip = None
+
+    def close(self):
+        """Closes the temporary file, and the output of start if it isn't finished, e.g. writing to it failed"""
+        self._file.close()
+        if self._package_zip is not None:
+            # the output is broken then, so it's only released
+            if self._part_file is not None:
+                with suppress(OSError):
+                    self._part_file.close()
+            with suppress(OSError):
+                self._package_zip.close()
+            self._package_zip = None
+
+
+def _copy(source: IO[bytes], target: IO[bytes], length: int):
+    while length > 0:
+        chunk = source.read(min(length, _COPY_BUFFER_SIZE))
+        target.write(chunk)
+        length -= len(chunk)
+
+
+def render_streaming(document: Document, renderables: Iterable[Renderable], writer: BodyWriter,
+                     file: str | IO[bytes] = None):
+    """Renders the renderables as Renderer and TocProcessor do, writing the rendered elements to the writer.
+
+    Renderables should be a generator, so every renderable may be freed after it's rendered.
+    If the file is set, the document is written to it while it's rendered (see BodyWriter.start).
+    """
+    if file is not None:
+        # the section properties referencing the footer are written before the body
+        add_page_numbering(document)
+        writer.start(file)
+
+    renderer = Renderer(document, page_numbering=False, writer=writer)
+    toc: ToC | None = None
+    headings: list[HeadingRecord] = []
+
+    for renderable in renderables:
+        if isinstance(renderable, ToC) and toc is None:
+            toc = renderable
+            writer.reserve(toc.docx_paragraph._p)
+        renderer.render(renderable)
+        if toc is not None and isinstance(renderable, Heading):
+            headings.append(HeadingRecord.from_heading(renderable))
+
+    renderer.finish()
+    if file is None:
+        # after the relationships of the renderables as by Renderer
+        add_page_numbering(document)
+
+    if toc is not None:
+        TocProcessor.fill(toc, headings)
+
+    if file is not None:
+        writer.end()
@@ -0,0 +1,147 @@
+import os
+from collections import OrderedDict
+from copy import deepcopy
+from dataclasses import dataclass
+from threading import Lock
+from weakref import WeakKeyDictionary
+
+import docx
+from docx.document import Document
+from docx.opc.package import OpcPackage
+from docx.opc.part import Part, XmlPart
+from docx.oxml.ns import qn
+from docx.shared import Cm, Length, Twips
+
+# distance from the bottom of the page to the end of the text, the footer with page numbers is below it
+BOTTOM_MARGIN = Cm(1.86)  # todo: detect from the footer
+
+# Word's default left and right cell margin
+_DEFAULT_CELL_MARGIN = Twips(108)
+
+
+@dataclass(frozen=True)
+class TemplateProfile:
+    """Page geometry of a template, read once instead of by every renderable"""
+    page_width: Length
+    page_height: Length
+    left_margin: Length
+    right_margin: Length
+    top_margin: Length
+    bottom_margin: Length
+    cell_left_margin: Length
+    cell_right_margin: Length
+
+    @property
+    def text_width(self) -> Length:
+        return Length(self.page_width - self.left_margin - self.right_margin)
+
+    @property
+    def text_height(self) -> Length:
+        return Length(self.page_height - self.top_margin - self.bottom_margin)
+
+    @property
+    def table_width(self) -> Length:
+        """Width of a table which cells' text is aligned with the text of the page"""
+        return Length(self.text_width + self.cell_left_margin + self.cell_right_margin)
+
+    @classmethod
+    def from_document(cls, document: Document) -> "TemplateProfile":
+        section = document.sections[0]
+
+        # todo: style inheritance
+        cell_margins = document.styles["Normal Table"].element.find(f"{qn('w:tblPr')}/{qn('w:tblCellMar')}")
+
+        def cell_margin(side: str) -> Length:
+            margin = cell_margins.find(qn(f"w:{side}")) if cell_margins is not None else None
+            return Twips(int(margin.get(qn("w:w")))) if margin is not None else _DEFAULT_CELL_MARGIN
+
+        return cls(section.page_width, section.page_height, section.left_margin, section.right_margin,
+                   section.top_margin, BOTTOM_MARGIN, cell_margin("left"), cell_margin("right"))
+
+
+_profiles: "WeakKeyDictionary[Part, TemplateProfile]" = WeakKeyDictionary()
+
+
+def get_template_profile(document: Document) -> TemplateProfile:
+    """Returns the document's profile, documents from template_cache share the profile of their template"""
+    profile = _profiles.get(document.part)
+    if profile is None:
+        profile = _profiles[document.part] = TemplateProfile.from_document(document)
+    return profile
+
+
+def _clone_package(package: OpcPackage) -> OpcPackage:
+    """Returns an independent copy of the package.
+
+    Xml parts get copies of their parsed trees instead of being parsed again,
+    binary parts (images, fonts) share the immutable blob.
+    """
+    clone = type(package)()
+    parts = {}
+    for part in package.iter_parts():
+        if isinstance(part, XmlPart):
+            parts[part] = type(part)(part.partname, part.content_type, deepcopy(part.element), clone)
+        else:
+            parts[part] = type(part).load(part.partname, part.content_type, part.blob, clone)
+
+    for source, target in [(package, clone), *parts.items()]:
+        for rel in source.rels.values():
+            target.load_rel(rel.reltype, rel.target_ref if rel.is_external else parts[rel.target_part],
+                            rel.rId, rel.is_external)
+
+    for part in parts.values():
+        part.after_unmarshal()
+    clone.after_unmarshal()
+    return clone
+
+
+class TemplateCache:
+    """Keeps parsed templates with cleared body and hands out their copies.
+
+    Templates are identified by path, size and modification time, so an
+    edited template is parsed again. Thread-safe.
+    """
+
+    def __init__(self, maxsize: int = 8):
+        self._maxsize = maxsize
+        self._templates: OrderedDict[tuple, Document] = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def key(template_path: str | None) -> tuple:
+        if template_path is None:
+            return None,
+        stat = os.stat(template_path)
+        return os.path.abspath(template_path), stat.st_size, stat.st_mtime_ns
+
+    def _pristine(self, template_path: str | None) -> Document:
+        key = self.key(template_path)
+        with self._lock:
+            document = self._templates.get(key)
+            if document is not None:
+                self._templates.move_to_end(key)
+                return document
+
+        document = docx.Document(template_path)
+        document._body.clear_content()
+
+        with self._lock:
+            self._templates[key] = document
+            if len(self._templates) > self._maxsize:
+                self._templates.popitem(last=False)
+        return document
+
+    def get(self, template_path: str | None) -> Document:
+        """Returns a new document of the template with empty body"""
+        pristine = self._pristine(template_path)
+        # copying reads the pristine trees only, so it needs no lock
+        document = _clone_package(pristine.part.package).main_document_part.document
+        _profiles[document.part] = get_template_profile(pristine)
+        return document
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+
+template_cache = TemplateCache()
@@ -1,8 +1,24 @@
+from collections.abc import Iterable
+from dataclasses import dataclass
+
 from md2gost.renderable import Renderable
 from md2gost.renderable.heading import Heading
 from md2gost.renderable.toc import ToC
 
 
+@dataclass(frozen=True)
+class HeadingRecord:
+    """Rendered heading as the table of contents needs it"""
+    level: int
+    text: str
+    page: int
+    numbered: bool
+
+    @classmethod
+    def from_heading(cls, heading: Heading) -> "HeadingRecord":
+        return cls(heading.level, heading.text, heading.rendered_page, heading.is_numbered)
+
+
 class TocProcessor:
     def process(self, renderables: list[Renderable]):
         renderables_iter = iter(renderables)
@@ -14,8 +30,12 @@ class TocProcessor:
                 break
 
         if toc:
-            for renderable in renderables_iter:
-                if isinstance(renderable, Heading):
-                    toc.add_item(renderable.level, renderable.text, renderable.rendered_page, renderable.is_numbered)
+            self.fill(toc, (HeadingRecord.from_heading(renderable)
+                            for renderable in renderables_iter if isinstance(renderable, Heading)))
+
+    @staticmethod
+    def fill(toc: ToC, headings: Iterable[HeadingRecord]):
+        for heading in headings:
+            toc.add_item(heading.level, heading.text, heading.page, heading.numbered)
 
-            toc.fill()
+        toc.fill()
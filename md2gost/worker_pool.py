@@ -0,0 +1,50 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from threading import Lock
+
+
+class WorkerPool:
+    """Process pools shared by all conversions, a pool is started on the first use.
+
+    A pool is kept per number of workers, so a conversion asking for another
+    size never shuts down a pool that other conversions are using.
+
+    The pool of worker processes breaks if they can't be started, e.g. the
+    main module starts a conversion on import without the
+    __name__ == "__main__" guard. Then the callers discard it (see discard)
+    and do the work in this process. Thread-safe.
+    """
+
+    def __init__(self):
+        self._pools: dict[int, ProcessPoolExecutor] = {}
+        self._disabled = False
+        self._lock = Lock()
+
+    @property
+    def disabled(self) -> bool:
+        return self._disabled
+
+    def get(self, workers: int) -> ProcessPoolExecutor | None:
+        """Returns the pool of the number of workers, None if pools are disabled"""
+        with self._lock:
+            if self._disabled:
+                return None
+            pool = self._pools.get(workers)
+            if pool is None:
+                # spawn, because forking a multithreaded process (e.g. a web server) may deadlock
+                pool = self._pools[workers] = ProcessPoolExecutor(workers, mp_context=get_context("spawn"))
+            return pool
+
+    def started(self) -> int | None:
+        """Returns the number of workers of the largest running pool, None if none is running or pools are disabled"""
+        with self._lock:
+            return None if self._disabled or not self._pools else max(self._pools)
+
+    def discard(self, pool: ProcessPoolExecutor, disable: bool = False):
+        """Shuts the broken pool down, a new one is started by the next get unless pools are disabled"""
+        with self._lock:
+            for workers, kept in list(self._pools.items()):
+                if kept is pool:
+                    del self._pools[workers]
+            self._disabled = self._disabled or disable
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -1,6 +1,6 @@
 import os
 import requests
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
 import io
 
@@ -41,6 +41,22 @@ def health():
     return jsonify({'status': 'healthy', 'service': 'api-service'}), 200
 
 
+def conditional_headers():
+    """If-None-Match of the client, so docx-service may answer 304 for an unchanged document"""
+    if_none_match = request.headers.get('If-None-Match')
+    return {'If-None-Match': if_none_match} if if_none_match else {}
+
+
+def forward_etag(upstream, response):
+    if 'ETag' in upstream.headers:
+        response.headers['ETag'] = upstream.headers['ETag']
+    return response
+
+
+def not_modified(upstream):
+    return forward_etag(upstream, Response(status=304))
+
+
 @app.route('/api/convert', methods=['POST'])
 def convert():
     try:
@@ -67,16 +83,20 @@ def convert():
         response = requests.post(
             f'{DOCX_SERVICE_URL}/api/convert',
             json=request_data,
+            headers=conditional_headers(),
             timeout=300
         )
         response.raise_for_status()
+        if response.status_code == 304:
+            return not_modified(response)
         
-        return send_file(
+        result = send_file(
             io.BytesIO(response.content),
             mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
             as_attachment=True,
             download_name='document.docx'
         )
+        return forward_etag(response, result)
     except requests.exceptions.RequestException as e:
         app.logger.error(f"Error calling docx-service: {e}")
         return jsonify({'error': str(e)}), 500
@@ -111,11 +131,14 @@ def preview():
         response = requests.post(
             f'{DOCX_SERVICE_URL}/api/preview',
             json=request_data,
+            headers=conditional_headers(),
             timeout=300
         )
         response.raise_for_status()
+        if response.status_code == 304:
+            return not_modified(response)
         
-        return jsonify(response.json())
+        return forward_etag(response, jsonify(response.json()))
     except requests.exceptions.RequestException as e:
         app.logger.error(f"Error calling docx-service: {e}")
         return jsonify({'error': str(e)}), 500
@@ -1,8 +1,11 @@
 import os
 import tempfile
 import io
+import queue
+import threading
+from collections import OrderedDict
 import requests
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
 import sys
 
@@ -10,7 +13,10 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(os.path.dirname(current_dir))
 sys.path.insert(0, parent_dir)
 
+from md2gost.context import ConversionContext
 from md2gost.converter import Converter
+from md2gost.incremental import IncrementalConverter
+from md2gost.package_writer import STORED, etag as package_etag, save as save_package
 
 app = Flask(__name__)
 CORS(app)
@@ -82,37 +88,149 @@ def docx_to_pdf(docx_path):
         raise Exception(f"PDF conversion error: {str(e)}")
 
 
-def download_session_images(session_id, working_dir):
-    if not session_id:
-        return
+class ChunkStream(io.RawIOBase):
+    """Write-only stream passing written bytes to the response generator"""
 
-    list_response = requests.get(
-        f'{FILE_SERVICE_URL}/api/session/{session_id}/images',
-        timeout=10
-    )
-    list_response.raise_for_status()
-    images = list_response.json().get('images', [])
-    if not images:
-        app.logger.info(f"No images found for session {session_id}")
-        return
+    def __init__(self):
+        self.chunks = queue.Queue(maxsize=64)
+        # set when the response is closed, e.g. the client disconnected
+        self.cancelled = threading.Event()
 
-    copied_count = 0
-    for image in images:
-        filename = image.get('filename')
-        if not filename:
-            continue
-        image_url = image.get('url', f'/api/images/{session_id}/{filename}')
-        if image_url.startswith('/'):
-            image_url = f'{FILE_SERVICE_URL}{image_url}'
-        image_response = requests.get(image_url, timeout=30)
-        image_response.raise_for_status()
+    def writable(self):
+        return True
 
-        dst_path = os.path.join(working_dir, filename)
-        with open(dst_path, 'wb') as dst_file:
-            dst_file.write(image_response.content)
-        copied_count += 1
+    def write(self, b):
+        self.put(bytes(b))
+        return len(b)
 
-    app.logger.info(f"Downloaded {copied_count} images for session {session_id}")
+    def put(self, item):
+        """Waits for room in the queue, raises BrokenPipeError if the response is closed meanwhile"""
+        while not self.cancelled.is_set():
+            try:
+                self.chunks.put(item, timeout=1)
+                return
+            except queue.Full:
+                pass
+        raise BrokenPipeError('The response is closed')
+
+
+def stream_conversion(markdown_content, context):
+    """Converts in a thread, yielding the docx while it's written"""
+    stream = ChunkStream()
+    done = object()
+
+    def convert():
+        try:
+            converter = Converter.from_text(markdown_content, TEMPLATE_PATH, context=context, streaming=True)
+            set_core_properties(converter.document)
+            # the writer is closed if the conversion is aborted by a closed response
+            converter.convert(stream)
+            stream.put(done)
+        except BrokenPipeError:
+            app.logger.info("Streaming conversion cancelled, the response is closed")
+        except Exception as e:
+            app.logger.error(f"Streaming conversion error: {e}")
+            try:
+                stream.put(e)
+            except BrokenPipeError:
+                pass
+
+    threading.Thread(target=convert, daemon=True).start()
+    try:
+        while (chunk := stream.chunks.get()) is not done:
+            if isinstance(chunk, Exception):
+                # the response is already started, so it's only cut off
+                raise chunk
+            yield chunk
+    finally:
+        # stops the conversion if the generator is closed before the end
+        stream.cancelled.set()
+
+
+def set_core_properties(doc):
+    # the same on every replica, so equal documents have equal ETags
+    doc.core_properties.author = "md2gost"
+    doc.core_properties.comments = "Created with md2gost web service"
+
+
+class SessionConverters:
+    """Incremental converters of the recently edited sessions, so a new version
+    of a session's document only renders the blocks the edit affects"""
+
+    def __init__(self, maxsize=32):
+        self._maxsize = maxsize
+        # session id: converter and the lock of its conversions, a converter isn't thread-safe
+        self._converters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def convert(self, session_id, markdown_content, context):
+        with self._lock:
+            entry = self._converters.get(session_id)
+            if entry is None:
+                entry = self._converters[session_id] = IncrementalConverter(TEMPLATE_PATH), threading.Lock()
+                if len(self._converters) > self._maxsize:
+                    self._converters.popitem(last=False)
+            else:
+                self._converters.move_to_end(session_id)
+        converter, lock = entry
+        with lock:
+            return converter.convert(markdown_content, context)
+
+
+session_converters = SessionConverters()
+
+
+def convert_document(markdown_content, session_id, context):
+    """Returns the converted document, a session's one is converted from its previous version"""
+    if session_id:
+        return session_converters.convert(session_id, markdown_content, context)
+    converter = Converter.from_text(markdown_content, TEMPLATE_PATH, context=context, cache_chapters=True)
+    converter.convert()
+    return converter.document
+
+
+def document_bytes(doc, compression_level=None):
+    """Returns the reproducible docx of the document"""
+    set_core_properties(doc)
+    output = io.BytesIO()
+    save_package(doc, output, compression_level, reproducible=True)
+    return output.getvalue()
+
+
+def session_image_resolver(session_id):
+    """Returns the image resolver of the session's uploads, images are fetched
+    from the file service when the document refers to them"""
+    urls = {}
+    if session_id:
+        list_response = requests.get(
+            f'{FILE_SERVICE_URL}/api/session/{session_id}/images',
+            timeout=10
+        )
+        list_response.raise_for_status()
+        for image in list_response.json().get('images', []):
+            filename = image.get('filename')
+            if not filename:
+                continue
+            image_url = image.get('url', f'/api/images/{session_id}/{filename}')
+            if image_url.startswith('/'):
+                image_url = f'{FILE_SERVICE_URL}{image_url}'
+            urls[filename] = image_url
+        app.logger.info(f"Found {len(urls)} images for session {session_id}")
+
+    # the image is read for the chapter's fingerprint and then for the document
+    fetched = {}
+
+    def resolve(path):
+        url = urls.get(os.path.normpath(path))
+        if url is None:
+            return None
+        if url not in fetched:
+            image_response = requests.get(url, timeout=30)
+            image_response.raise_for_status()
+            fetched[url] = image_response.content
+        return fetched[url]
+
+    return resolve
 
 
 @app.route('/health', methods=['GET'])
@@ -127,62 +245,41 @@ def convert():
         markdown_content = data.get('markdown', '')
         syntax_highlighting = data.get('syntax_highlighting', True)
         session_id = data.get('session_id')
+        # send the document with chunked transfer while it's converted
+        stream = data.get('stream', False)
         
         app.logger.warning(f"Convert request received: session_id={session_id}, markdown_length={len(markdown_content)}, data_keys={list(data.keys()) if data else []}")
         
         if not markdown_content:
             return jsonify({'error': 'Markdown content is required'}), 400
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False, encoding='utf-8') as md_file:
-            md_file.write(markdown_content)
-            md_file_path = md_file.name
+        # uploaded session images are fetched while converting, nothing is written to disk
+        context = ConversionContext(syntax_highlighting=bool(syntax_highlighting),
+                                    image_resolver=session_image_resolver(session_id))
         
-        with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as docx_file:
-            docx_file_path = docx_file.name
-        
-        try:
-            working_dir = os.path.dirname(md_file_path)
-            os.environ['WORKING_DIR'] = working_dir
-            if syntax_highlighting:
-                os.environ['SYNTAX_HIGHLIGHTING'] = '1'
-            else:
-                os.environ.pop('SYNTAX_HIGHLIGHTING', None)
-            
-            # Pull uploaded session images into converter working directory.
-            download_session_images(session_id, working_dir)
-            
-            converter = Converter(md_file_path, docx_file_path, TEMPLATE_PATH, debug=False)
-            converter.convert()
-            
-            doc = converter.document
-            from getpass import getuser
-            try:
-                doc.core_properties.author = getuser()
-            except:
-                doc.core_properties.author = "md2gost"
-            doc.core_properties.comments = "Created with md2gost web service"
-            
-            doc.save(docx_file_path)
-            
-            with open(docx_file_path, 'rb') as f:
-                output = io.BytesIO(f.read())
-            output.seek(0)
-            
-            response = send_file(
-                output,
+        if stream:
+            return Response(
+                stream_conversion(markdown_content, context),
                 mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                as_attachment=True,
-                download_name='document.docx'
+                headers={'Content-Disposition': 'attachment; filename=document.docx'}
             )
-            response.headers['Content-Disposition'] = 'attachment; filename=document.docx'
+        
+        docx_data = document_bytes(convert_document(markdown_content, session_id, context))
+        etag = package_etag(docx_data)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
             return response
-        finally:
-            try:
-                os.unlink(md_file_path)
-                if os.path.exists(docx_file_path):
-                    os.unlink(docx_file_path)
-            except:
-                pass
+        
+        response = send_file(
+            io.BytesIO(docx_data),
+            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            as_attachment=True,
+            download_name='document.docx'
+        )
+        response.headers['Content-Disposition'] = 'attachment; filename=document.docx'
+        response.set_etag(etag)
+        return response
                 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -201,47 +298,35 @@ def preview():
         if not markdown_content:
             return jsonify({'error': 'Markdown content is required'}), 400
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False, encoding='utf-8') as md_file:
-            md_file.write(markdown_content)
-            md_file_path = md_file.name
+        context = ConversionContext(syntax_highlighting=bool(syntax_highlighting),
+                                    image_resolver=session_image_resolver(session_id))
+        
+        # the docx is only read by LibreOffice, so it isn't compressed
+        docx_data = document_bytes(convert_document(markdown_content, session_id, context), STORED)
+        
+        # the pdf of the same docx differs only in metadata, so the tag is weak
+        # and an unchanged document isn't converted by LibreOffice again
+        etag = package_etag(docx_data)
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            return response
         
+        # LibreOffice reads the document from a file
         with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as docx_file:
+            docx_file.write(docx_data)
             docx_file_path = docx_file.name
-        
         try:
-            working_dir = os.path.dirname(md_file_path)
-            os.environ['WORKING_DIR'] = working_dir
-            if syntax_highlighting:
-                os.environ['SYNTAX_HIGHLIGHTING'] = '1'
-            else:
-                os.environ.pop('SYNTAX_HIGHLIGHTING', None)
-            
-            # Pull uploaded session images into converter working directory.
-            download_session_images(session_id, working_dir)
-            
-            converter = Converter(md_file_path, docx_file_path, TEMPLATE_PATH, debug=False)
-            converter.convert()
-            
-            doc = converter.document
-            from getpass import getuser
-            try:
-                doc.core_properties.author = getuser()
-            except:
-                doc.core_properties.author = "md2gost"
-            doc.core_properties.comments = "Created with md2gost web service"
-            
-            doc.save(docx_file_path)
-            
             pdf_base64 = docx_to_pdf(docx_file_path)
-            
-            return jsonify({'pdf': pdf_base64})
         finally:
             try:
-                os.unlink(md_file_path)
-                if os.path.exists(docx_file_path):
-                    os.unlink(docx_file_path)
+                os.unlink(docx_file_path)
             except:
                 pass
+        
+        response = jsonify({'pdf': pdf_base64})
+        response.set_etag(etag, weak=True)
+        return response
                 
     except Exception as e:
         import traceback
@@ -10,6 +10,7 @@ setup(
         "docxcompose>=1.4.0",
         "freetype-py>=2.4.0",
         "pillow>=10.0.0",
+        "numpy>=1.25.1",
         "matplotlib>=3.7.2",
         "requests>=2.31.0",
         "latex2mathml>=3.76.0",
@@ -0,0 +1,128 @@
+import os
+import unittest
+from unittest import mock
+
+from docx.opc.constants import RELATIONSHIP_TYPE
+from lxml import etree
+
+from md2gost import chapters
+from md2gost.converter import Converter
+
+_TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "..", "md2gost", "Template.docx")
+
+_CHAPTER = """
+# Chapter {i}
+
+## Section
+
+{text}
+
+%table{i} Table
+
+| Name | Value |
+|------|-------|
+| a    | 1     |
+| b    | 2     |
+
+%listing{i} Listing
+
+```python
+{code}
+```
+
+$$
+x^{i} + y = {i}
+$$
+"""
+
+
+def _markdown(chapters: int) -> str:
+    text = "The contractor shall deliver the works in accordance with the schedule. " * 40
+    code = "\n".join(f"print({j})" for j in range(30))
+    return "# *CONTENTS\n\n[TOC]\n" + "".join(_CHAPTER.format(i=i, text=text, code=code) for i in range(chapters))
+
+
+def _convert(text: str, workers: int, cache_chapters: bool = False) -> Converter:
+    converter = Converter.from_text(text, _TEMPLATE_PATH, equation_workers=1, workers=workers,
+                                    cache_chapters=cache_chapters)
+    converter.convert()
+    return converter
+
+
+class TestParallelChapters(unittest.TestCase):
+
+    def test_same_as_serial(self):
+        # more than 9 chapters, so the numbers are longer than the provisional ones
+        text = _markdown(12)
+        serial = _convert(text, 1)
+        parallel = _convert(text, 2)
+
+        self.assertEqual(etree.tostring(serial.document.element.body),
+                         etree.tostring(parallel.document.element.body))
+        self.assertIn("Листинг 12 - Listing", "\n".join(paragraph.text for paragraph in parallel.document.paragraphs))
+
+    def test_single_chapter(self):
+        text = _markdown(1)
+        self.assertEqual(etree.tostring(_convert(text, 1).document.element.body),
+                         etree.tostring(_convert(text, 2).document.element.body))
+
+    def test_leading_blank_lines(self):
+        text = "\n\n# A\n\ntext\n\n# B\n\ntext"
+        self.assertEqual(2, len(_convert(text, 1).parser.chapters()))
+        self.assertEqual(etree.tostring(_convert(text, 1).document.element.body),
+                         etree.tostring(_convert(text, 2).document.element.body))
+
+    def test_chapters(self):
+        converter = _convert(_markdown(3), 1)
+        chapters = converter.parser.chapters()
+        self.assertEqual(4, len(chapters))
+        self.assertTrue(all(chapter[0].level == 1 for chapter in chapters))
+
+
+class TestChapterCache(unittest.TestCase):
+    def setUp(self):
+        chapters.chapter_cache.clear()
+        self.addCleanup(chapters.chapter_cache.clear)
+
+    def _convert_cached(self, text: str) -> tuple[Converter, int]:
+        with mock.patch.object(chapters, "_layout_chapter", wraps=chapters._layout_chapter) as layout_chapter:
+            converter = _convert(text, 1, True)
+        return converter, layout_chapter.call_count
+
+    def test_unchanged_chapters_are_reused(self):
+        text = _markdown(5)
+        first, _ = self._convert_cached(text)
+
+        second, laid_out = self._convert_cached(text)
+        self.assertEqual(0, laid_out)
+        self.assertEqual(etree.tostring(first.document.element.body), etree.tostring(second.document.element.body))
+
+    def test_changed_chapter(self):
+        self._convert_cached(_markdown(5))
+
+        # a longer chapter moves the following chapters to other pages
+        text = _markdown(5).replace("# Chapter 2\n", "# Chapter 2\n\n" + "Inserted paragraph.\n\n" * 60)
+        converter, laid_out = self._convert_cached(text)
+
+        self.assertEqual(1, laid_out)
+        self.assertEqual(etree.tostring(_convert(text, 1).document.element.body),
+                         etree.tostring(converter.document.element.body))
+
+    def test_leading_blank_lines(self):
+        text = "\n# A\n\ntext\n\n# B\n\ntext"
+        self.assertEqual(etree.tostring(_convert(text, 1).document.element.body),
+                         etree.tostring(self._convert_cached(text)[0].document.element.body))
+
+    def test_bounded_by_size(self):
+        def layout(image: bytes) -> chapters._ChapterLayout:
+            return chapters._ChapterLayout([b"<w:p/>"], None, (1, 0), {}, [], [], None,
+                                           {"rId1": (False, RELATIONSHIP_TYPE.IMAGE, image, "image.png")})
+
+        cache = chapters.ChapterCache(maxsize=2048)
+        cache.put(b"a", layout(bytes(1000)))
+        cache.put(b"b", layout(bytes(1000)))
+        cache.put(b"c", layout(bytes(1000)))
+
+        self.assertIsNone(cache.get(b"a"))
+        self.assertIsNotNone(cache.get(b"b"))
+        self.assertIsNotNone(cache.get(b"c"))
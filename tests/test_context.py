@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from unittest import mock
+
+from md2gost.context import ConversionContext
+from md2gost.converter import Converter
+
+from .test_chapters import _TEMPLATE_PATH, _markdown
+
+_IMAGE_PATH = os.path.join(os.path.dirname(__file__), "..", "examples", "img.png")
+
+
+def _convert(text: str, context: ConversionContext, **kwargs) -> bytes:
+    converter = Converter.from_text(text, _TEMPLATE_PATH, context=context, equation_workers=1, reproducible=True,
+                                    **kwargs)
+    converter.convert()
+    return converter.to_bytes()
+
+
+class TestConversionContext(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        shutil.copy(_IMAGE_PATH, os.path.join(self._directory, "img.png"))
+        self.addCleanup(shutil.rmtree, self._directory)
+
+    def test_concurrent_same_as_serial(self):
+        text = _markdown(2) + "\n![](img.png)\n"
+        contexts = [ConversionContext(self._directory, False), ConversionContext(self._directory, True),
+                    ConversionContext(os.path.join(self._directory, "empty"), True)]
+        jobs = [(text if i % 2 else text.replace("the works", f"the works {i}"), contexts[i % len(contexts)])
+                for i in range(24)]
+
+        expected = [_convert(text, context) for text, context in jobs]
+        with ThreadPoolExecutor(8) as executor:
+            actual = list(executor.map(lambda job: _convert(*job), jobs))
+
+        for i, (expected_docx, actual_docx) in enumerate(zip(expected, actual)):
+            self.assertEqual(expected_docx, actual_docx, i)
+        # highlighting and the working directory of the contexts are applied
+        self.assertNotEqual(expected[1], expected[3])
+        self.assertNotEqual(expected[1], expected[5])
+
+    def test_image_resolver(self):
+        with open(_IMAGE_PATH, "rb") as f:
+            image = f.read()
+        requested = []
+
+        def resolve(path: str) -> bytes | None:
+            requested.append(path)
+            return image if path == "uploaded.png" else None
+
+        docx = zipfile.ZipFile(BytesIO(_convert("![](uploaded.png)\n\n![](missing.png)\n",
+                                                ConversionContext(image_resolver=resolve))))
+        self.assertEqual(["uploaded.png", "missing.png"], requested)
+        self.assertEqual([image], [docx.read(name) for name in docx.namelist() if name.startswith("word/media/")])
+
+    def test_environment_is_not_read(self):
+        with mock.patch.dict(os.environ, {"WORKING_DIR": self._directory}):
+            docx = zipfile.ZipFile(BytesIO(_convert("![](img.png)\n",
+                                                    ConversionContext(os.path.join(self._directory, "empty")))))
+        self.assertFalse([name for name in docx.namelist() if name.startswith("word/media/")])
+
+
+class TestFromText(unittest.TestCase):
+    def test_same_as_file(self):
+        text = _markdown(2) + "\n![](img.png)\n"
+        with open(_IMAGE_PATH, "rb") as f:
+            image = f.read()
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, "input.md")
+            with open(input_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            expected_converter = Converter(input_path, None, _TEMPLATE_PATH, equation_workers=1, reproducible=True,
+                                           context=ConversionContext(os.path.dirname(_IMAGE_PATH)))
+            expected_converter.convert()
+        expected = expected_converter.to_bytes()
+
+        converter = Converter.from_text(text, _TEMPLATE_PATH, lambda path: image if path == "img.png" else None,
+                                        equation_workers=1, reproducible=True)
+        converter.convert()
+        self.assertEqual(expected, converter.to_bytes())
+
+    def test_streaming(self):
+        text = _markdown(2)
+        converter = Converter.from_text(text, _TEMPLATE_PATH, equation_workers=1, streaming=True,
+                                        reproducible=True)
+        output = BytesIO()
+        converter.convert(output)
+        # the streamed parts are written in another order
+        expected, actual = (zipfile.ZipFile(BytesIO(data)) for data in (_convert(text, ConversionContext()),
+                                                                         output.getvalue()))
+        self.assertEqual(sorted(expected.namelist()), sorted(actual.namelist()))
+        for name in expected.namelist():
+            self.assertEqual(expected.read(name), actual.read(name), name)
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from md2gost.renderable import find_font as find_font_module
+from md2gost.renderable.find_font import FontIndex, _fontconfig_stamp, find_font
+
+FC_LIST = """/usr/share/fonts/LiberationSerif-Regular.ttf: Liberation Serif:style=Regular
+/usr/share/fonts/LiberationSerif-Bold.ttf: Liberation Serif:style=Bold
+/usr/share/fonts/LiberationSerif-BoldItalic.ttf: Liberation Serif:style=Bold Italic
+/usr/share/fonts/DejaVuSansMono.ttf: DejaVu Sans Mono:style=Book
+/usr/share/fonts/Times.ttf: Times New Roman,Times New Roman Cyr:style=Regular,Normal
+"""
+
+
+class TestFontIndex(unittest.TestCase):
+    def setUp(self):
+        self._index = FontIndex.from_fc_list(FC_LIST)
+
+    def test_find(self):
+        self.assertEqual("/usr/share/fonts/Times.ttf", self._index.find("Times New Roman", False, False))
+
+    def test_find_fallback(self):
+        self.assertEqual("/usr/share/fonts/LiberationSerif-Bold.ttf", self._index.find("Times New Roman", True, False))
+        self.assertEqual("/usr/share/fonts/DejaVuSansMono.ttf", self._index.find("Courier New", False, False))
+
+    def test_find_any_style(self):
+        self.assertEqual("/usr/share/fonts/DejaVuSansMono.ttf", self._index.find("Courier New", True, True))
+
+    def test_not_found(self):
+        self.assertRaises(ValueError, self._index.find, "Comic Sans MS", False, False)
+
+    def test_fingerprint(self):
+        self.assertEqual(self._index.fingerprint, FontIndex.from_fc_list(FC_LIST).fingerprint)
+        self.assertNotEqual(self._index.fingerprint, FontIndex.from_fc_list(FC_LIST.split("\n", 1)[1]).fingerprint)
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "fonts.json")
+            FontIndex.from_fc_list(FC_LIST, _fontconfig_stamp()).save(path)
+            index = FontIndex.load(path)
+        self.assertEqual("/usr/share/fonts/LiberationSerif-BoldItalic.ttf", index.find("Times New Roman", True, True))
+
+    def test_load_outdated(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "fonts.json")
+            FontIndex.from_fc_list(FC_LIST, {"/var/cache/fontconfig": 0.0}).save(path)
+            self.assertIsNone(FontIndex.load(path))
+
+
+class TestFindFont(unittest.TestCase):
+    def setUp(self):
+        find_font.cache_clear()
+        self.addCleanup(find_font.cache_clear)
+        # a stored index without the fonts installed after it was built
+        for name, value in (("_font_index", FontIndex.from_fc_list(FC_LIST.splitlines()[-1])),
+                            ("_font_index_built", False)):
+            patcher = mock.patch.object(find_font_module, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(FontIndex, "save")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @unittest.skipUnless(find_font_module.platform == "linux", "fc-list is used on linux")
+    def test_rebuilt_on_miss(self):
+        with mock.patch.object(FontIndex, "build", return_value=FontIndex.from_fc_list(FC_LIST)) as build:
+            self.assertEqual("/usr/share/fonts/DejaVuSansMono.ttf", find_font("Courier New", False, False))
+            self.assertRaises(ValueError, find_font, "Comic Sans MS", False, False)
+        # the built index isn't outdated
+        build.assert_called_once()
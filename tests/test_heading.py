@@ -31,7 +31,7 @@ class TestHeadingNumberingSpace(unittest.TestCase):
             heading.is_numbered,
             "Заголовок без * должен быть нумерованным",
         )
-        para_text = heading._docx_paragraph.text
+        para_text = heading.docx_paragraph.text
         self.assertTrue(
             para_text.startswith(" "),
             f"Текст нумерованного заголовка должен начинаться с пробела (между номером и текстом), "
@@ -47,7 +47,7 @@ class TestHeadingNumberingSpace(unittest.TestCase):
         self.assertIsInstance(renderables[0], Heading)
         heading = renderables[0]
         self.assertFalse(heading.is_numbered, "Заголовок с * не должен быть нумерованным")
-        para_text = heading._docx_paragraph.text.strip()
+        para_text = heading.docx_paragraph.text.strip()
         self.assertTrue(
             para_text.startswith("Центрированный"),
             f"Текст ненумерованного заголовка не должен начинаться с пробела: {repr(para_text[:50])}",
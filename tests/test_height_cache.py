@@ -0,0 +1,77 @@
+import unittest
+
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml import OxmlElement
+from docx.shared import Cm, Pt
+
+from md2gost.renderable.height_cache import HeightCache, height_cache
+from md2gost.renderable.paragraph_sizer import ParagraphSizer, ParagraphSizerResult
+
+from . import _create_test_document
+
+
+class TestHeightCache(unittest.TestCase):
+    def setUp(self):
+        self._cache = HeightCache(maxsize=2)
+
+    def test_hit(self):
+        self._cache.get("a", lambda: ParagraphSizerResult(0, 1, 10, 1, 0))
+        result = self._cache.get("a", lambda: self.fail("must be cached"))
+        self.assertEqual(1, result.lines)
+        self.assertEqual((1, 1, 2, 1), tuple(self._cache.info()))
+
+    def test_returns_copies(self):
+        self._cache.get("a", lambda: ParagraphSizerResult(5, 1, 10, 1, 0)).before = 0
+        self.assertEqual(5, self._cache.get("a", lambda: None).before)
+
+    def test_eviction(self):
+        for key in "abc":
+            self._cache.get(key, lambda: ParagraphSizerResult(0, 1, 10, 1, 0))
+        self._cache.get("a", lambda: ParagraphSizerResult(0, 2, 10, 1, 0))
+        self.assertEqual(2, self._cache.get("a", lambda: None).lines)
+        self.assertEqual(2, self._cache.info().currsize)
+
+
+class TestCalculateHeightKey(unittest.TestCase):
+    """Paragraphs that are sized differently mustn't share a cached result"""
+
+    def setUp(self):
+        height_cache.clear()
+        self.addCleanup(height_cache.clear)
+        self._document, _, self._max_width = _create_test_document()
+        # the text wraps to several lines, so a wider font takes more of them
+        self._text = "The quick brown fox jumps over the lazy dog. " * 20
+
+    def _height(self, paragraph, previous=None, max_width=None) -> ParagraphSizerResult:
+        return ParagraphSizer(paragraph, previous, max_width or self._max_width).calculate_height()
+
+    def test_previous_style(self):
+        normal = self._document.styles["Normal"]
+        normal.element.get_or_add_pPr().append(OxmlElement("w:contextualSpacing"))
+        normal.paragraph_format.space_before = Pt(12)
+        other = self._document.styles.add_style("Other", WD_STYLE_TYPE.PARAGRAPH)
+        other.paragraph_format.space_after = Cm(0.35)
+
+        same_style = self._document.add_paragraph("previous")
+        other_style = self._document.add_paragraph("previous", "Other")
+        paragraph = self._document.add_paragraph("text")
+        self.assertNotEqual(self._height(paragraph, same_style), self._height(paragraph, other_style))
+
+    def test_previous_space_after(self):
+        spaced = self._document.add_paragraph("previous")
+        not_spaced = self._document.add_paragraph("previous")
+        not_spaced.paragraph_format.space_after = 0
+        paragraph = self._document.add_paragraph("text")
+        paragraph.paragraph_format.space_before = Pt(24)
+        self.assertNotEqual(self._height(paragraph, spaced), self._height(paragraph, not_spaced))
+
+    def test_run_formatting(self):
+        regular = self._document.add_paragraph(self._text)
+        bold = self._document.add_paragraph()
+        bold.add_run(self._text).bold = True
+        self.assertNotEqual(self._height(regular).lines, self._height(bold).lines)
+
+    def test_max_width(self):
+        paragraph = self._document.add_paragraph(self._text)
+        self.assertNotEqual(self._height(paragraph).lines,
+                            self._height(paragraph, max_width=self._max_width // 2).lines)
@@ -0,0 +1,79 @@
+import os
+import unittest
+
+from lxml import etree
+
+from md2gost.context import ConversionContext
+from md2gost.converter import Converter
+from md2gost.incremental import IncrementalConverter
+
+from .test_chapters import _TEMPLATE_PATH, _convert, _markdown
+
+_IMAGE_PATH = os.path.join(os.path.dirname(__file__), "..", "examples", "img.png")
+
+
+class TestIncrementalConverter(unittest.TestCase):
+    def setUp(self):
+        self._converter = IncrementalConverter(_TEMPLATE_PATH, equation_workers=1)
+        self._text = _markdown(4)
+        self._converter.convert(self._text)
+
+    def _assert_same_as_converter(self, text: str):
+        document = self._converter.convert(text)
+        self.assertEqual(etree.tostring(_convert(text, 1).document.element.body),
+                         etree.tostring(document.element.body))
+
+    def test_unchanged(self):
+        self._assert_same_as_converter(self._text)
+        self.assertEqual(0, self._converter.rendered_blocks)
+
+    def test_converges(self):
+        # the paragraph is as long as the original one, so the layout after it doesn't change
+        text = self._text.replace("the works", "the goods", 1)
+        self._assert_same_as_converter(text)
+        self.assertEqual(1, self._converter.rendered_blocks)
+
+    def test_inserted_paragraph(self):
+        text = self._text.replace("## Section\n", "## Section\n\nInserted paragraph.\n", 2)
+        self._assert_same_as_converter(text)
+
+        # the following blocks are moved, but every chapter starts on a new page
+        self.assertLess(self._converter.rendered_blocks, 20)
+
+    def test_numbering_changes(self):
+        text = self._text.replace("# Chapter 1\n", "# Chapter 1\n\n%extra Extra\n\n| a |\n|---|\n| 1 |\n", 1)
+        self._assert_same_as_converter(text)
+        self._assert_same_as_converter(self._text)
+
+    def test_removed_chapter(self):
+        start, end = self._text.index("# Chapter 1\n"), self._text.index("# Chapter 2\n")
+        self._assert_same_as_converter(self._text[:start] + self._text[end:])
+        self._assert_same_as_converter(self._text)
+
+    def test_image_resolver_of_conversion(self):
+        with open(_IMAGE_PATH, "rb") as f:
+            image = f.read()
+        text = self._text + "\n![](img.png)\n"
+        self._converter.convert(text, ConversionContext(image_resolver=lambda path: image))
+
+        # a new resolver of the same images
+        document = self._converter.convert(text, ConversionContext(image_resolver=lambda path: image))
+        self.assertEqual(0, self._converter.rendered_blocks)
+        self.assertEqual(1, len([rel for rel in document.part.rels.values() if rel.reltype.endswith("/image")]))
+
+        # the image has changed
+        self._converter.convert(text, ConversionContext(image_resolver=lambda path: image + b"\0"))
+        self.assertEqual(1, self._converter.rendered_blocks)
+
+    def test_edited_before_image(self):
+        # images of the reused blocks are related again, pictures rendered after them have to be the same
+        context = ConversionContext(os.path.dirname(_IMAGE_PATH))
+        converter = IncrementalConverter(_TEMPLATE_PATH, equation_workers=1, context=context)
+        text = self._text.replace("## Section\n", "## Section\n\n![](img.png)\n")
+        converter.convert(text)
+
+        text = text.replace("# Chapter 2\n", "# Chapter 2\n\nInserted paragraph.\n", 1)
+        document = converter.convert(text)
+        expected = Converter.from_text(text, _TEMPLATE_PATH, context=context, equation_workers=1)
+        expected.convert()
+        self.assertEqual(etree.tostring(expected.document.element.body), etree.tostring(document.element.body))
@@ -0,0 +1,75 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from lxml import etree
+
+from md2gost.latex_math import latex_to_omml, _latex_to_omml, convert_equations
+from md2gost.worker_pool import WorkerPool
+
+
+class TestLatexToOmml(unittest.TestCase):
+    def test_returns_copies(self):
+        first = latex_to_omml(r"\frac{a}{b}")
+        second = latex_to_omml(r"\frac{a}{b}")
+        self.assertIsNot(first, second)
+        self.assertEqual(etree.tostring(first), etree.tostring(second))
+
+        etree.SubElement(first, "changed")
+        self.assertEqual(etree.tostring(second), etree.tostring(latex_to_omml(r"\frac{a}{b}")))
+
+    def test_cached(self):
+        _latex_to_omml.cache_clear()
+        latex_to_omml("x^2")
+        latex_to_omml("x^2")
+        self.assertEqual(1, _latex_to_omml.cache_info().hits)
+
+    def test_threads(self):
+        formulas = [f"\\sqrt{{x_{i}}} + \\frac{{{i}}}{{2}}" for i in range(50)]
+        expected = [etree.tostring(latex_to_omml(formula)) for formula in formulas]
+        _latex_to_omml.cache_clear()
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(lambda formula: etree.tostring(latex_to_omml(formula)), formulas))
+        self.assertEqual(expected, results)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            latex_to_omml(r"\frac{")
+
+
+class TestConvertEquations(unittest.TestCase):
+    _FORMULAS = [f"x_{{{i}}}^2 + \\frac{{1}}{{{i}}}" for i in range(20)]
+
+    def test_serial(self):
+        result = convert_equations(self._FORMULAS + self._FORMULAS[:5] + [r"\frac{"], workers=1)
+        self.assertEqual(self._FORMULAS, list(result))
+        self.assertEqual(etree.tostring(latex_to_omml(self._FORMULAS[3])), result[self._FORMULAS[3]])
+
+    def test_pool(self):
+        with self.assertNoLogs(level="WARNING"):
+            self.assertEqual(convert_equations(self._FORMULAS, workers=1),
+                             convert_equations(self._FORMULAS, workers=2))
+
+    def test_pool_is_not_started_by_default(self):
+        pool = WorkerPool()
+        with mock.patch("md2gost.latex_math._pool", pool), mock.patch("md2gost.latex_math.EQUATION_WORKERS", None):
+            self.assertEqual(convert_equations(self._FORMULAS, workers=1), convert_equations(self._FORMULAS))
+        self.assertIsNone(pool.started())
+
+    def test_running_pool_is_used_by_default(self):
+        pool = WorkerPool()
+        executor = pool.get(2)
+        self.addCleanup(executor.shutdown)
+        with mock.patch("md2gost.latex_math._pool", pool), mock.patch("md2gost.latex_math.EQUATION_WORKERS", None), \
+                mock.patch.object(executor, "map", wraps=executor.map) as pool_map:
+            self.assertEqual(convert_equations(self._FORMULAS, workers=1), convert_equations(self._FORMULAS))
+        pool_map.assert_called_once()
+
+    def test_pool_shut_down(self):
+        # another conversion has found the pool broken and shut it down
+        pool = WorkerPool()
+        pool.get(2).shutdown()
+        with mock.patch("md2gost.latex_math._pool", pool), self.assertLogs(level="WARNING"):
+            self.assertEqual(convert_equations(self._FORMULAS, workers=1),
+                             convert_equations(self._FORMULAS, workers=2))
+        self.assertTrue(pool.disabled)
@@ -8,7 +8,7 @@ from md2gost.layout_tracker import LayoutState, LayoutTracker
 class TestLayoutState(unittest.TestCase):
     def setUp(self):
         self._state = LayoutState(Mm(297), Mm(210))
-        self._state._current_height += Mm(400)
+        self._state.add_height(Mm(400))
 
     def test_max_height(self):
         self.assertEqual(Mm(297), self._state.max_height)
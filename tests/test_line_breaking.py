@@ -0,0 +1,65 @@
+import unittest
+from unittest import mock
+
+from docx.shared import Cm
+
+from md2gost.renderable import line_breaking
+from md2gost.renderable.paragraph_sizer import ParagraphSizer
+
+from . import _create_test_document
+
+_TEXT = ("The contractor shall deliver the works in accordance with the schedule set out in Appendix 3, "
+         "and any deviation from the schedule shall be agreed upon by both parties in writing. ") * 20
+_LONG_WORD = "verylongword" * 20
+
+
+@unittest.skipUnless(line_breaking.vectorized_line_breaking_available(), "numpy is not installed")
+class TestVectorizedLineBreaking(unittest.TestCase):
+    def setUp(self):
+        self._document, self._max_height, self._max_width = _create_test_document()
+
+    def _assert_same_lines(self, paragraph, first_line_indent, is_mono=False):
+        ps = ParagraphSizer(paragraph, None, self._max_width)
+        args = (paragraph.runs, self._max_width, paragraph.style.font, first_line_indent, is_mono)
+        with mock.patch.object(line_breaking, "VECTORIZED_MIN_LENGTH", 10**9):
+            expected = ps.count_lines(*args)
+        with mock.patch.object(line_breaking, "VECTORIZED_MIN_LENGTH", 0):
+            self.assertEqual(expected, ps.count_lines(*args))
+        return expected
+
+    def test_long_paragraph(self):
+        paragraph = self._document.add_paragraph()
+        paragraph.add_run(_TEXT)
+        self.assertGreater(self._assert_same_lines(paragraph, Cm(1.25)), 30)
+
+    def test_without_first_line_indent(self):
+        paragraph = self._document.add_paragraph()
+        paragraph.add_run(_TEXT)
+        self._assert_same_lines(paragraph, 0)
+
+    def test_multiple_runs(self):
+        paragraph = self._document.add_paragraph()
+        paragraph.add_run(_TEXT[:1000])
+        paragraph.add_run(_TEXT[1000:1500]).bold = True
+        paragraph.add_run(_TEXT[1500:]).italic = True
+        self._assert_same_lines(paragraph, Cm(1.25))
+
+    def test_long_word_first(self):
+        paragraph = self._document.add_paragraph()
+        paragraph.add_run(_LONG_WORD + " " + _TEXT)
+        self._assert_same_lines(paragraph, Cm(1.25))
+
+    def test_long_word_after_spaces(self):
+        paragraph = self._document.add_paragraph()
+        paragraph.add_run("  " + _LONG_WORD + " " + _TEXT)
+        self._assert_same_lines(paragraph, Cm(1.25))
+
+    def test_long_word_inside(self):
+        paragraph = self._document.add_paragraph()
+        paragraph.add_run(_TEXT + _LONG_WORD + "  " + _TEXT)
+        self._assert_same_lines(paragraph, Cm(1.25))
+
+    def test_courier(self):
+        paragraph = self._document.add_paragraph(style="Code")
+        paragraph.add_run(_TEXT + _LONG_WORD)
+        self._assert_same_lines(paragraph, 0, True)
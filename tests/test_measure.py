@@ -0,0 +1,91 @@
+import unittest
+from unittest import mock
+
+from docx.shared import Pt
+
+from md2gost.layout_tracker import LayoutState
+from md2gost.renderable.caption import CaptionInfo
+from md2gost.renderable.heading import Heading
+from md2gost.renderable.listing import Listing
+from md2gost.renderable.paragraph import Paragraph
+from md2gost.renderable.table import Table
+from md2gost.renderer import Renderer
+
+from . import _create_test_document
+
+
+class TestMeasure(unittest.TestCase):
+    def setUp(self):
+        self._document, self._max_height, self._max_width = _create_test_document()
+
+    def _state(self, remaining):
+        layout_state = LayoutState(self._max_height, self._max_width)
+        layout_state.add_height(self._max_height - remaining)
+        return layout_state
+
+    def _assert_measured_as_rendered(self, renderable, layout_state):
+        measured = list(renderable.measure(None, layout_state))
+        rendered = list(renderable.render(None, layout_state))
+        self.assertEqual([info.height for info in rendered], [info.height for info in measured])
+        return measured, rendered
+
+    def test_table(self):
+        table = Table(self._document._body, 10, 2, CaptionInfo(None, "caption"))
+        for row in range(10):
+            table.add_paragraph_to_cell(row, 0).add_run(f"row {row}")
+        table.set_number(1)
+
+        measured, rendered = self._assert_measured_as_rendered(table, self._state(Pt(120)))
+        self.assertGreater(len(rendered), 3)
+        # tables are only built by render
+        self.assertIsNone(measured[1].docx_element)
+        self.assertIsNotNone(rendered[1].docx_element)
+
+    def test_listing(self):
+        listing = Listing(self._document._body, "", CaptionInfo(None, "caption"))
+        listing.set_text("\n".join(f"line {i}" for i in range(100)))
+        listing.set_number(1)
+
+        measured, rendered = self._assert_measured_as_rendered(listing, self._state(Pt(300)))
+        self.assertGreater(len(rendered), 3)
+        self.assertIsNone(measured[1].docx_element)
+
+    def test_measure_changes_nothing(self):
+        heading = Heading(self._document._body, 2, True)
+        heading.add_run("heading")
+        layout_state = self._state(Pt(20))
+
+        info = next(heading.measure(None, layout_state))
+
+        self.assertEqual(Pt(20), layout_state.remaining_page_height)
+        self.assertFalse(heading.page_break_before)
+        self.assertEqual(info, next(heading.render(None, layout_state)))
+        self.assertTrue(heading.page_break_before)
+
+
+class TestRenderer(unittest.TestCase):
+    def test_renders_once(self):
+        document, _, _ = _create_test_document()
+        renderer = Renderer(document)
+        paragraphs = [Paragraph(document._body) for _ in range(100)]
+        for paragraph in paragraphs:
+            paragraph.add_run("text " * 50)
+
+        with mock.patch.object(Paragraph, "render", autospec=True, side_effect=Paragraph.render) as render:
+            renderer.process(paragraphs)
+
+        self.assertEqual(len(paragraphs), render.call_count)
+        self.assertGreater(renderer._layout_tracker.current_state.page, 1)
+
+    def test_laid_out_once(self):
+        document, _, _ = _create_test_document()
+        renderer = Renderer(document)
+        paragraphs = [Paragraph(document._body) for _ in range(100)]
+        for paragraph in paragraphs:
+            paragraph.add_run("text " * 50)
+
+        # nothing waits for the next page, so the first blocks aren't measured before they're rendered
+        with mock.patch.object(Paragraph, "measure", autospec=True, side_effect=Paragraph.measure) as measure:
+            renderer.process(paragraphs)
+
+        measure.assert_not_called()
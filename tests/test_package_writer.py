@@ -0,0 +1,85 @@
+import os
+import tempfile
+import time
+import unittest
+import zipfile
+from io import BytesIO
+from unittest.mock import patch
+
+from md2gost.converter import Converter
+from md2gost.package_writer import REPRODUCIBLE_DATE_TIME, STORED, compressed_parts, save
+from md2gost.template import template_cache
+
+from .test_chapters import _TEMPLATE_PATH, _markdown
+
+
+class TestPackageWriter(unittest.TestCase):
+    def setUp(self):
+        compressed_parts.clear()
+        self._document = template_cache.get(_TEMPLATE_PATH)
+        self._document.add_paragraph("Paragraph")
+
+    def _save(self, compression_level: int = None, reproducible: bool = False) -> zipfile.ZipFile:
+        file = BytesIO()
+        save(self._document, file, compression_level, reproducible)
+        return zipfile.ZipFile(file)
+
+    def test_same_as_document_save(self):
+        file = BytesIO()
+        self._document.save(file)
+        expected = zipfile.ZipFile(file)
+        # the second time the parts of the template are copied compressed
+        for _ in range(2):
+            actual = self._save()
+            self.assertIsNone(actual.testzip())
+            self.assertEqual(expected.namelist(), actual.namelist())
+            for expected_info, actual_info in zip(expected.infolist(), actual.infolist()):
+                self.assertEqual((expected_info.CRC, expected_info.compress_size),
+                                 (actual_info.CRC, actual_info.compress_size), expected_info.filename)
+
+    def test_changed_part_is_compressed_again(self):
+        self._save()
+        self._document.styles["Normal"].font.name = "Arial"
+        actual = self._save()
+        self.assertIsNone(actual.testzip())
+        self.assertIn(b"Arial", actual.read("word/styles.xml"))
+
+    def test_stored(self):
+        actual = self._save(STORED)
+        self.assertIsNone(actual.testzip())
+        self.assertEqual({zipfile.ZIP_STORED}, {info.compress_type for info in actual.infolist()})
+
+    def test_reproducible(self):
+        first = self._save(reproducible=True).fp.getvalue()
+        with patch("time.time", return_value=time.time() + 3600):
+            second = self._save(reproducible=True)
+        self.assertEqual(first, second.fp.getvalue())
+        self.assertEqual({REPRODUCIBLE_DATE_TIME}, {info.date_time for info in second.infolist()})
+
+    def test_without_zipfile_internals(self):
+        expected = self._save(reproducible=True).fp.getvalue()
+        with patch("md2gost.package_writer._ZIP_FILE_INTERNALS", ("_lock", "_missing")), \
+                patch.object(compressed_parts, "get") as get:
+            actual = self._save(reproducible=True)
+        get.assert_not_called()
+        self.assertIsNone(actual.testzip())
+        self.assertEqual(expected, actual.fp.getvalue())
+
+
+class TestConverterETag(unittest.TestCase):
+    def _etag(self, text: str, streaming: bool = False) -> str:
+        with tempfile.TemporaryDirectory() as directory:
+            input_path, output_path = os.path.join(directory, "input.md"), os.path.join(directory, "output.docx")
+            with open(input_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            converter = Converter(input_path, output_path, _TEMPLATE_PATH, equation_workers=1,
+                                  streaming=streaming, reproducible=True)
+            converter.convert()
+            return converter.save(output_path)
+
+    def test_etag(self):
+        text = _markdown(2)
+        etag = self._etag(text)
+        self.assertEqual(etag, self._etag(text))
+        self.assertEqual(etag, self._etag(text, streaming=True))
+        self.assertNotEqual(etag, self._etag(text.replace("the works", "the goods", 1)))
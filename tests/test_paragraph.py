@@ -1,10 +1,30 @@
+import os
 import unittest
 
+import docx
+from docx.oxml.ns import qn
+from docx.shared import RGBColor
+from docx.text.paragraph import Paragraph as DocxParagraph
+from docx.text.run import Run as DocxRun
+from lxml import etree
+
 from md2gost.layout_tracker import LayoutTracker
 from md2gost.renderable.paragraph import Paragraph
+from md2gost.renderable.paragraph_sizer import ParagraphSizer
+from md2gost.util import create_element
 
 from . import _create_test_document, _EMUS_PER_PX
 
+_TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "..", "md2gost", "Template.docx")
+
+_RUN_CONTENT_TEXT = {qn("w:tab"): "\t", qn("w:br"): "\n", qn("w:noBreakHyphen"): "-"}
+
+
+def _runs_text(p) -> str:
+    """Text of the w:r elements of the paragraph element, including the runs of links"""
+    return "".join(child.text if child.tag == qn("w:t") else _RUN_CONTENT_TEXT.get(child.tag, "")
+                   for r in p.iter(qn("w:r")) for child in r)
+
 
 class TestParagraph(unittest.TestCase):
     def setUp(self) -> None:
@@ -19,3 +39,61 @@ class TestParagraph(unittest.TestCase):
 
         self.assertAlmostEqual(45.5, info.height / _EMUS_PER_PX, delta=1/3)
 
+
+    def test_runs_are_built_on_render(self):
+        paragraph = Paragraph(self._document._body)
+        layout_tracker = LayoutTracker(self._max_height, self._max_width)
+        text = "well-known words " * 20
+        paragraph.add_run(text, is_bold=True)
+
+        measured = list(paragraph.measure(None, layout_tracker.current_state))[0]
+        self.assertEqual(0, len(paragraph._docx_paragraph._p.r_lst))
+        rendered = list(paragraph.render(None, layout_tracker.current_state))[0]
+        self.assertEqual(1, len(paragraph._docx_paragraph._p.r_lst))
+        self.assertEqual(text, paragraph.text)
+        self.assertEqual(text, _runs_text(rendered.docx_element._p))
+
+        # sized the same as the built paragraph
+        sizer = ParagraphSizer(rendered.docx_element, None, self._max_width)
+        self.assertEqual(sizer.calculate_height().full, measured.height)
+
+
+class TestInlineRuns(unittest.TestCase):
+    def setUp(self) -> None:
+        self._document = docx.Document(_TEMPLATE_PATH)
+
+    def test_runs_are_coalesced(self):
+        paragraph = Paragraph(self._document._body)
+        paragraph.add_run("plain ")
+        paragraph.add_run("text\t")
+        paragraph.add_run("-bold-", is_bold=True, is_italic=False)
+        paragraph.add_run("text", is_bold=True, is_italic=False)
+        paragraph.add_run("red struck", color=RGBColor.from_string("FF0000"), strike_through=True)
+        link = paragraph.add_link("https://example.com")
+        link.add_run("a-", is_italic=True)
+        link.add_run("link", is_italic=True)
+
+        expected = DocxParagraph(create_element("w:p"), self._document._body)
+        expected.style = "Normal"
+        expected.add_run("plain text\t")
+        run = expected.add_run()
+        run.bold, run.italic = True, False
+        for text in ("", "bold", "text"):
+            if text:
+                run._r.add_t(text)
+            run._r.append(create_element("w:noBreakHyphen"))
+        run._r.remove(run._r[-1])
+        run = expected.add_run("red struck")
+        run.font.color.rgb, run.font.strike = RGBColor.from_string("FF0000"), True
+        hyperlink = create_element("w:hyperlink", {"r:id": link.link_runs.r_id})
+        run = DocxRun(create_element("w:r"), expected)
+        run.style, run.italic = "Hyperlink", True
+        run._r.add_t("a")
+        run._r.append(create_element("w:noBreakHyphen"))
+        run._r.add_t("link")
+        hyperlink.append(run._element)
+        expected._p.append(hyperlink)
+
+        self.assertEqual(etree.tostring(expected._p), etree.tostring(paragraph.docx_paragraph._p))
+        self.assertEqual("plain text\t-bold-textred strucka-link", paragraph.text)
+        self.assertEqual(paragraph.text, _runs_text(paragraph.docx_paragraph._p))
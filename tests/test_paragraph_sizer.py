@@ -3,7 +3,8 @@ import unittest
 import docx
 from docx import Document
 
-from md2gost.renderable.paragraph_sizer import Font, ParagraphSizer
+from md2gost.renderable.paragraph_sizer import Font, ParagraphSizer, get_font, font_registry_info, \
+    calculate_mono_heights
 from md2gost.renderable.listing import LISTING_OFFSET
 from docx.shared import Pt, Mm, Cm
 
@@ -37,6 +38,23 @@ class TestFont(unittest.case.TestCase):
         font = Font("Times New Roman", True, True, 14)
         self.assertAlmostEqual(38.5, font.get_text_width("hello") / _EMUS_PER_PX, delta=delta)
 
+    def test_get_word_width(self):
+        for bold, italic in ((False, False), (True, False), (False, True)):
+            font = Font("Times New Roman", bold, italic, 14)
+            for word in ("hello", "in", "Электроэнцефалографический", "AVATAR", "jump", "(x)."):
+                self.assertAlmostEqual(font.get_text_width(word) / _EMUS_PER_PX,
+                                       font.get_word_width(word) / _EMUS_PER_PX, delta=3)
+
+    def test_get_word_width_mono(self):
+        font = Font("Courier New", False, False, 12)
+        self.assertEqual(font.get_text_width("hello"), font.get_word_width("hello"))
+
+    def test_get_font_is_shared(self):
+        font = get_font("Times New Roman", False, False, 14)
+        hits = font_registry_info().hits
+        self.assertIs(font, get_font("Times New Roman", None, False, 14))
+        self.assertEqual(hits + 1, font_registry_info().hits)
+
     def test_get_line_height_times(self):
         font = Font("Times New Roman", False, False, 14)
         self.assertAlmostEqual(21.4, font.get_line_height() / _EMUS_PER_PX, delta=delta)
@@ -288,3 +306,26 @@ class TestParagraphSizer(unittest.TestCase):
     #     ps = ParagraphSizer(paragraph, None, self._max_width - LISTING_OFFSET)
     # 
     #     self.assertEqual(3, ps.count_lines(paragraph.runs, self._max_width - LISTING_OFFSET, paragraph.style.font, 0, True))
+
+
+class TestCalculateMonoHeights(unittest.case.TestCase):
+    def setUp(self) -> None:
+        self._document, self._max_height, self._max_width = _create_test_document()
+
+    def test_same_as_paragraph_sizer(self):
+        lines = ["def render(self):", "", "    return x", "    " + "very_long_name " * 10, "# " + "-" * 40,
+                 "        y = 1"]
+        paragraphs = []
+        for line in lines:
+            paragraph = self._document.add_paragraph(style="Code")
+            paragraph.add_run(line)
+            paragraphs.append(paragraph)
+        paragraphs[2].runs[0].bold = True
+        paragraphs.append(self._document.add_paragraph("not a listing line"))
+
+        max_width = self._max_width - LISTING_OFFSET
+        expected = [ParagraphSizer(paragraph, paragraphs[i - 1] if i else None, max_width).calculate_height()
+                    for i, paragraph in enumerate(paragraphs)]
+
+        self.assertEqual(expected, calculate_mono_heights(paragraphs, max_width))
+        self.assertGreater(expected[3].lines, 1)
@@ -0,0 +1,45 @@
+import unittest
+
+from docx.shared import Pt
+
+from md2gost.renderable.resolved_style import get_style_resolver
+
+from . import _create_test_document
+
+
+class TestStyleResolver(unittest.TestCase):
+    def setUp(self):
+        self._document, self._max_height, self._max_width = _create_test_document()
+        self._resolver = get_style_resolver(self._document.part)
+
+    def test_font(self):
+        font = self._resolver.font(self._document.add_paragraph(style="Code"))
+        self.assertEqual("Courier New", font.name)
+        self.assertEqual(Pt(12), font.size)
+
+    def test_paragraph_format(self):
+        paragraph_format = self._resolver.paragraph_format(self._document.add_paragraph(style="Normal"))
+        normal = self._document.styles["Normal"].paragraph_format
+        self.assertEqual(normal.first_line_indent, paragraph_format.first_line_indent)
+        self.assertEqual(normal.space_after, paragraph_format.space_after)
+        self.assertEqual(1.5, paragraph_format.line_spacing)
+
+    def test_direct_formatting(self):
+        paragraph = self._document.add_paragraph(style="Normal")
+        paragraph.paragraph_format.space_after = 0
+        self.assertEqual(0, self._resolver.paragraph_format(paragraph).space_after)
+
+    def test_cached(self):
+        first = self._document.add_paragraph(style="Normal")
+        second = self._document.add_paragraph(style="Normal")
+        self.assertIs(self._resolver.paragraph_format(first), self._resolver.paragraph_format(second))
+        self.assertIs(self._resolver, get_style_resolver(self._document.part))
+
+    def test_run_font(self):
+        paragraph = self._document.add_paragraph(style="Normal")
+        run = paragraph.add_run("text")
+        run.bold = True
+        font = self._resolver.run_font(self._resolver.font(paragraph), run)
+        self.assertEqual("Times New Roman", font.name)
+        self.assertTrue(font.bold)
+        self.assertIsNone(font.italic)
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from md2gost.renderable.sizing_store import SizingStore
+
+
+class TestSizingStore(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._directory.name, "sizing.sqlite")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_shared_between_stores(self):
+        key = SizingStore.key(b"styles", b"paragraph", 1000)
+        SizingStore(self._path).put(key, 3)
+        self.assertEqual(3, SizingStore(self._path).get(key))
+
+    def test_miss(self):
+        self.assertIsNone(SizingStore(self._path).get(SizingStore.key(b"styles", b"paragraph", 1000)))
+
+    def test_key_depends_on_width(self):
+        self.assertNotEqual(SizingStore.key(b"s", b"p", 1000), SizingStore.key(b"s", b"p", 1001))
+
+    def test_key_depends_on_line_breaking_and_fonts(self):
+        key = SizingStore.key(b"s", b"p", 1000)
+        with mock.patch("md2gost.renderable.sizing_store.LINE_COUNT_VERSION", 2):
+            self.assertNotEqual(key, SizingStore.key(b"s", b"p", 1000))
+        with mock.patch("md2gost.renderable.sizing_store.font_index_fingerprint", return_value=b"other fonts"):
+            self.assertNotEqual(key, SizingStore.key(b"s", b"p", 1000))
+        self.assertEqual(key, SizingStore.key(b"s", b"p", 1000))
+
+    def test_evicts_oldest(self):
+        store = SizingStore(self._path, max_entries=10)
+        store._EVICT_EVERY = 5
+        for i in range(20):
+            store.put(SizingStore.key(b"s", b"p", i), i)
+        self.assertIsNone(store.get(SizingStore.key(b"s", b"p", 0)))
+        self.assertEqual(19, store.get(SizingStore.key(b"s", b"p", 19)))
+
+    def test_evicts_every_n_puts_concurrently(self):
+        store = SizingStore(self._path)
+        store._EVICT_EVERY = 5
+        with mock.patch.object(store, "_evict") as evict, ThreadPoolExecutor(8) as executor:
+            list(executor.map(lambda i: store.put(SizingStore.key(b"s", b"p", i), i), range(400)))
+        self.assertEqual(80, evict.call_count)
+
+    def test_unavailable(self):
+        open(self._path, "w").close()
+        store = SizingStore(os.path.join(self._path, "invalid.sqlite"))
+        store.put(b"key", 1)
+        self.assertIsNone(store.get(b"key"))
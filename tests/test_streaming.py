@@ -0,0 +1,90 @@
+import gc
+import unittest
+import zipfile
+from io import BytesIO, RawIOBase
+from test import support
+
+import docx
+from lxml import etree
+
+from md2gost.converter import Converter
+
+from .test_chapters import _TEMPLATE_PATH, _markdown
+
+
+class TestStreaming(unittest.TestCase):
+    def _docx(self, text: str, streaming: bool) -> bytes:
+        converter = Converter.from_text(text, _TEMPLATE_PATH, equation_workers=1, streaming=streaming)
+        converter.convert()
+        return converter.to_bytes()
+
+    def test_same_as_in_memory(self):
+        text = _markdown(3)
+        expected, actual = (zipfile.ZipFile(BytesIO(self._docx(text, streaming))) for streaming in (False, True))
+        self.assertEqual(expected.namelist(), actual.namelist())
+        for name in expected.namelist():
+            self.assertEqual(expected.read(name), actual.read(name), name)
+
+    def test_toc_is_filled(self):
+        document = docx.Document(BytesIO(self._docx(_markdown(3), True)))
+        self.assertIn("Chapter 2\t", document.paragraphs[1].text)
+
+    def test_body_is_not_kept(self):
+        converter = Converter.from_text(_markdown(3), _TEMPLATE_PATH, equation_workers=1, streaming=True)
+        converter.convert()
+        # only the section properties
+        self.assertEqual(1, len(converter.document.element.body))
+        converter.to_bytes()
+
+    def _assert_written_while_converting(self, text: str):
+        converter = Converter.from_text(text, _TEMPLATE_PATH, equation_workers=1, streaming=True)
+        output = BytesIO()
+        converter.convert(output)
+
+        expected, actual = zipfile.ZipFile(BytesIO(self._docx(text, False))), zipfile.ZipFile(output)
+        self.assertEqual(sorted(expected.namelist()), sorted(actual.namelist()))
+        # the footer is related before the rendered elements, so only relationship ids may differ
+        for name in expected.namelist():
+            if name not in ("word/document.xml", "word/_rels/document.xml.rels"):
+                self.assertEqual(expected.read(name), actual.read(name), name)
+        self.assertEqual(_resolve_ids(expected), _resolve_ids(actual))
+
+    def test_written_while_converting(self):
+        self._assert_written_while_converting(_markdown(3))
+
+    def test_written_while_converting_without_toc(self):
+        # nothing is kept until the end
+        self._assert_written_while_converting(_markdown(3).replace("[TOC]", ""))
+
+    def test_broken_output_is_released(self):
+        class BrokenOutput(RawIOBase):
+            """The client disconnects after a few chunks"""
+            written = 0
+
+            def writable(self):
+                return True
+
+            def write(self, b):
+                self.written += 1
+                if self.written > 3:
+                    raise BrokenPipeError
+                return len(b)
+
+        converter = Converter.from_text(_markdown(3), _TEMPLATE_PATH, equation_workers=1, streaming=True)
+        with self.assertRaises(BrokenPipeError):
+            converter.convert(BrokenOutput())
+        # the zip file doesn't write its end when it's collected
+        with support.catch_unraisable_exception() as unraisable:
+            del converter
+            gc.collect()
+            self.assertIsNone(unraisable.unraisable)
+
+
+def _resolve_ids(docx_file: zipfile.ZipFile) -> bytes:
+    """document.xml with the relationship ids replaced with their targets"""
+    rels = etree.fromstring(docx_file.read("word/_rels/document.xml.rels"))
+    xml = docx_file.read("word/document.xml")
+    # longer ids first, so rId1 doesn't replace the start of rId10
+    for rel in sorted(rels, key=lambda rel: -len(rel.get("Id"))):
+        xml = xml.replace(f'"{rel.get("Id")}"'.encode(), f'"{rel.get("Target")}"'.encode())
+    return xml
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import docx
+from docx.shared import Twips
+
+from md2gost.template import TemplateCache, TemplateProfile, BOTTOM_MARGIN, get_template_profile
+
+_TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "..", "md2gost", "Template.docx")
+
+
+class TestTemplateCache(unittest.TestCase):
+    def setUp(self):
+        self._cache = TemplateCache()
+
+    def test_same_as_parsed(self):
+        expected = docx.Document(_TEMPLATE_PATH)
+        expected._body.clear_content()
+        document = self._cache.get(_TEMPLATE_PATH)
+
+        expected_parts = list(expected.part.package.iter_parts())
+        parts = list(document.part.package.iter_parts())
+        self.assertEqual([part.partname for part in expected_parts], [part.partname for part in parts])
+        for expected_part, part in zip(expected_parts, parts):
+            self.assertIs(type(expected_part), type(part))
+            self.assertEqual(expected_part.blob, part.blob)
+            self.assertEqual(sorted(expected_part.rels), sorted(part.rels))
+
+    def test_copies_are_independent(self):
+        first = self._cache.get(_TEMPLATE_PATH)
+        first.add_paragraph("text")
+        first.styles["Normal"].font.size = None
+
+        second = self._cache.get(_TEMPLATE_PATH)
+        self.assertEqual(0, len(second.paragraphs))
+        self.assertIsNotNone(second.styles["Normal"].font.size)
+
+    def test_changed_template_is_reloaded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "template.docx")
+            shutil.copy(_TEMPLATE_PATH, path)
+            self._cache.get(path)
+
+            document = docx.Document(path)
+            document.sections[0].left_margin = 0
+            document.save(path)
+            os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+
+            self.assertEqual(0, self._cache.get(path).sections[0].left_margin)
+
+
+class TestTemplateProfile(unittest.TestCase):
+    def test_from_document(self):
+        document = docx.Document(_TEMPLATE_PATH)
+        section = document.sections[0]
+        profile = TemplateProfile.from_document(document)
+
+        self.assertEqual(section.page_width - section.left_margin - section.right_margin, profile.text_width)
+        self.assertEqual(section.page_height - section.top_margin - BOTTOM_MARGIN, profile.text_height)
+        left_margin = Twips(int(document.styles["Normal Table"].element.xpath(
+            "w:tblPr/w:tblCellMar/w:left/@w:w")[0]))
+        self.assertEqual(left_margin, profile.cell_left_margin)
+        self.assertEqual(profile.text_width + profile.cell_left_margin + profile.cell_right_margin,
+                         profile.table_width)
+
+    def test_shared_by_template_copies(self):
+        cache = TemplateCache()
+        self.assertIs(get_template_profile(cache.get(_TEMPLATE_PATH)),
+                      get_template_profile(cache.get(_TEMPLATE_PATH)))
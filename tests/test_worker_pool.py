@@ -0,0 +1,47 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from md2gost.worker_pool import WorkerPool
+
+
+class TestWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self._pool = WorkerPool()
+
+    def _get(self, workers: int):
+        pool = self._pool.get(workers)
+        if pool is not None:
+            self.addCleanup(pool.shutdown, wait=False, cancel_futures=True)
+        return pool
+
+    def test_reused(self):
+        pool = self._get(2)
+        self.assertIs(pool, self._get(2))
+
+    def test_pool_per_size(self):
+        # a conversion with another number of workers doesn't shut down the pool in use
+        pool = self._get(2)
+        self.assertIsNot(pool, self._get(3))
+        self.assertEqual(4, pool.submit(abs, -4).result())
+
+    def test_started(self):
+        self.assertIsNone(self._pool.started())
+        self._get(2)
+        self._get(3)
+        self.assertEqual(3, self._pool.started())
+
+    def test_discard(self):
+        pool = self._get(2)
+        self._pool.discard(pool)
+        self.assertIsNot(pool, self._get(2))
+        self.assertFalse(self._pool.disabled)
+
+    def test_disable(self):
+        self._pool.discard(self._get(2), disable=True)
+        self.assertTrue(self._pool.disabled)
+        self.assertIsNone(self._pool.get(2))
+
+    def test_concurrent_get(self):
+        with ThreadPoolExecutor(8) as executor:
+            pools = list(executor.map(lambda i: self._get(2 + i % 2), range(32)))
+        self.assertEqual(2, len(set(map(id, pools))))